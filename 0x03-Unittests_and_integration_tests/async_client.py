@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+An asyncio counterpart of GithubOrgClient for scanning many orgs at once.
+
+Requests run on worker threads over the same pooled Transport and HTTP
+cache as the synchronous client, so retries, keep-alive and ETag
+revalidation behave identically. A RequestLimiter shared by every client
+in a scan bounds how many requests are in flight and how many start per
+second (token bucket).
+"""
+import asyncio
+import time
+from typing import (Any, AsyncIterator, Awaitable, Callable, Iterable,
+                    List, NamedTuple, Optional)
+
+from client import GithubOrgClient, Page, get_page
+from pagination import (RateLimitThrottle, remaining_page_urls,
+                        with_query)
+from repo_index import RepoIndex
+from transport import Transport
+from utils import async_memoize, invalidate
+
+
+class TokenBucket:
+    """
+    Token bucket allowing `rate` acquisitions per second on average and
+    bursts of up to `capacity`.
+    """
+    def __init__(self, rate: float, capacity: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self._clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(self.capacity,
+                           self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, tokens: float = 1.0) -> None:
+        """
+        Waits until `tokens` are available and takes them. Waiters are
+        served in arrival order.
+        """
+        async with self._lock:
+            self._refill()
+            while self._tokens < tokens:
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= tokens
+
+
+class RequestLimiter:
+    """
+    Async context manager gating every request of a scan: at most
+    max_concurrency requests in flight, at most `rate` new requests per
+    second (unlimited when rate is None), and a pause whenever GitHub
+    reports the rate limit as exhausted.
+    """
+    def __init__(self, max_concurrency: int = 10,
+                 rate: Optional[float] = None,
+                 burst: Optional[float] = None) -> None:
+        self.max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._bucket = TokenBucket(rate, burst) if rate else None
+        self.throttle = RateLimitThrottle()
+
+    async def __aenter__(self) -> "RequestLimiter":
+        if self._bucket is not None:
+            await self._bucket.acquire()
+        await self._semaphore.acquire()
+        delay = self.throttle.delay()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        self._semaphore.release()
+
+
+class AsyncGithubOrgClient:
+    """
+    Asyncio client for the GitHub API for organizations, with the same
+    methods as GithubOrgClient as coroutines. org and repos are fetched
+    once per client instance even when awaited concurrently.
+    """
+    ORG_URL = GithubOrgClient.ORG_URL
+    PER_PAGE = GithubOrgClient.PER_PAGE
+    has_license = staticmethod(GithubOrgClient.has_license)
+
+    def __init__(self, org_name: str,
+                 limiter: Optional[RequestLimiter] = None,
+                 transport: Optional[Transport] = None) -> None:
+        self._org_name = org_name
+        self._limiter = limiter or RequestLimiter()
+        self._transport = transport
+        self._index = None
+
+    async def _get_page(self, url: str) -> Page:
+        """
+        Fetches one page on a worker thread under the limiter.
+        """
+        async with self._limiter:
+            page = await asyncio.to_thread(get_page, url, self._transport)
+        self._limiter.throttle.update(page.headers)
+        return page
+
+    @async_memoize
+    async def org(self) -> dict:
+        """
+        Returns the organization's information.
+        """
+        url = self.ORG_URL.format(org=self._org_name)
+        return (await self._get_page(url)).payload
+
+    async def repos_url(self) -> str:
+        """
+        Returns the URL for the organization's repositories.
+        """
+        return (await self.org())["repos_url"]
+
+    @async_memoize
+    async def repos(self) -> list:
+        """
+        Returns a list of repositories for the organization. Pages after
+        the first are requested concurrently once the last page is known.
+        """
+        url = with_query(await self.repos_url(), per_page=self.PER_PAGE)
+        first = await self._get_page(url)
+        repos = list(first.payload)
+        urls = remaining_page_urls(first.links)
+        if urls is not None:
+            pages = await asyncio.gather(*(self._get_page(u) for u in urls))
+            for page in pages:
+                repos.extend(page.payload)
+            return repos
+        next_url = first.links.get("next")
+        while next_url:
+            page = await self._get_page(next_url)
+            repos.extend(page.payload)
+            next_url = page.links.get("next")
+        return repos
+
+    def refresh(self) -> None:
+        """
+        Drops the memoized org, repos and repo index.
+        """
+        invalidate(self, "org")
+        invalidate(self, "repos")
+        self._index = None
+
+    async def public_repos(self, repo_filter: str = None,
+                           license: Optional[str] = None,
+                           name_contains: Optional[str] = None) -> list:
+        """
+        Returns a list of public repository names, optionally filtered by
+        name substring (repo_filter or name_contains) and license key.
+        """
+        repos = await self.repos()
+        if name_contains is None:
+            name_contains = repo_filter
+        if name_contains is None and license is None:
+            return [repo["name"] for repo in repos]
+        if self._index is None or self._index.repos is not repos:
+            self._index = RepoIndex(repos)
+        return [repos[position]["name"] for position in
+                self._index.query(license=license, name_contains=name_contains)]
+
+
+class OrgResult(NamedTuple):
+    """
+    Outcome of scanning one org: result is set on success, error otherwise.
+    """
+    org: str
+    result: Any = None
+    error: Optional[BaseException] = None
+
+
+async def scan_orgs(org_names: Iterable[str],
+                    scan: Callable[[AsyncGithubOrgClient], Awaitable[Any]]
+                    = AsyncGithubOrgClient.public_repos,
+                    limiter: Optional[RequestLimiter] = None,
+                    transport: Optional[Transport] = None
+                    ) -> AsyncIterator[OrgResult]:
+    """
+    Runs scan(client) for every org concurrently and yields an OrgResult
+    per org as soon as it completes. All orgs share one limiter, so the
+    concurrency and rate limits are global to the scan.
+    """
+    limiter = limiter or RequestLimiter()
+
+    async def run(name: str) -> OrgResult:
+        client = AsyncGithubOrgClient(name, limiter=limiter,
+                                      transport=transport)
+        try:
+            return OrgResult(name, result=await scan(client))
+        except Exception as error:
+            return OrgResult(name, error=error)
+
+    tasks = [asyncio.ensure_future(run(name)) for name in org_names]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def scan_all(org_names: Iterable[str], **kwargs) -> List[OrgResult]:
+    """
+    Collects scan_orgs results in completion order.
+    """
+    return [result async for result in scan_orgs(org_names, **kwargs)]
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Benchmark of nested lookups: `python bench_access.py [repos] [rounds]`.
+
+Builds a GitHub-like list of repo payloads and extracts the same fields
+from every repo with access_nested_map (one walk per path per call), with
+compile_path getters, and with a single PathSet, printing the best time
+per round for each.
+"""
+import sys
+import time
+from typing import Callable, List
+
+from utils import PathSet, access_nested_map, compile_path
+
+PATHS = (
+    ("name",),
+    ("owner", "login"),
+    ("owner", "type"),
+    ("license", "key"),
+    ("permissions", "admin"),
+    ("permissions", "push"),
+)
+
+
+def make_repos(count: int) -> List[dict]:
+    """
+    Returns count repo payloads shaped like the GitHub API's.
+    """
+    return [{
+        "id": n,
+        "name": f"repo-{n}",
+        "full_name": f"google/repo-{n}",
+        "owner": {"login": "google", "id": 1342004, "type": "Organization"},
+        "license": {"key": "apache-2.0" if n % 2 else "mit",
+                    "name": "License"},
+        "permissions": {"admin": False, "push": n % 3 == 0, "pull": True},
+        "topics": ["python", "api"],
+    } for n in range(count)]
+
+
+def best_of(body: Callable[[], object], rounds: int) -> float:
+    """
+    Returns the fastest of `rounds` runs of body, in seconds.
+    """
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        body()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(count: int = 20000, rounds: int = 5) -> None:
+    repos = make_repos(count)
+    getters = [compile_path(path) for path in PATHS]
+    fields = PathSet(PATHS)
+
+    def walk():
+        return [tuple(access_nested_map(repo, path) for path in PATHS)
+                for repo in repos]
+
+    def compiled():
+        return [tuple(get(repo) for get in getters) for repo in repos]
+
+    def path_set():
+        return [fields(repo) for repo in repos]
+
+    expected = walk()
+    assert compiled() == expected and path_set() == expected
+
+    baseline = best_of(walk, rounds)
+    print(f"{count} repos x {len(PATHS)} paths, best of {rounds} rounds")
+    print(f"{'method':<20} {'ms':>10} {'speedup':>8}")
+    for name, body in (("access_nested_map", walk),
+                       ("compile_path", compiled),
+                       ("PathSet", path_set)):
+        elapsed = best_of(body, rounds)
+        print(f"{name:<20} {elapsed * 1000:>10.2f} "
+              f"{baseline / elapsed:>7.2f}x")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    main(int(args[0]) if args else 20000,
+         int(args[1]) if len(args) > 1 else 5)
@@ -2,30 +2,183 @@
 """
 A module for the GithubOrgClient class.
 """
-import requests
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from functools import wraps
+from typing import Any, Dict, Iterator, Mapping, NamedTuple, Optional
 
-def get_json(url: str) -> dict:
+from http_cache import HTTPCache, cached_get
+from json_stream import iter_json_array
+from pagination import (RateLimitThrottle, parse_link_header,
+                        remaining_page_urls, with_query)
+from repo_index import RepoIndex
+from transport import Transport
+from utils import invalidate, memoize_method
+
+# Shared on-disk response cache used by get_json; None disables caching
+_http_cache: Optional[HTTPCache] = None
+
+# Pooled transport shared by every get_json call; created on first use
+_transport: Optional[Transport] = None
+_transport_lock = threading.Lock()
+
+# Bytes read from the socket per step when streaming a response body
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def configure_cache(directory: Optional[str]) -> Optional[HTTPCache]:
+    """
+    Enables the persistent HTTP cache for get_json in the given directory,
+    or disables it when directory is None. Returns the active cache.
+    """
+    global _http_cache
+    _http_cache = HTTPCache(directory) if directory is not None else None
+    return _http_cache
+
+
+class Page(NamedTuple):
+    """
+    One fetched JSON response with its parsed Link header.
+    """
+    payload: Any
+    links: Dict[str, str]
+    headers: Mapping[str, str]
+
+
+def get_transport() -> Transport:
+    """
+    Returns the shared transport, creating it with defaults on first use.
+    """
+    global _transport
+    if _transport is None:
+        with _transport_lock:
+            if _transport is None:
+                _transport = Transport()
+    return _transport
+
+
+def configure_transport(transport: Optional[Transport]) -> Optional[Transport]:
+    """
+    Replaces the shared transport (closing the old one); None resets it
+    so the next request creates a default one.
+    """
+    global _transport
+    with _transport_lock:
+        old, _transport = _transport, transport
+    if old is not None and old is not transport:
+        old.close()
+    return transport
+
+
+class _StreamedArray:
+    """
+    Iterator over the elements of a JSON array response body as they
+    arrive. The connection is released once the array has been read, or
+    by close(), also when no element has been read yet.
+    """
+    def __init__(self, response) -> None:
+        self._response = response
+        self._elements = iter_json_array(
+            response.iter_content(STREAM_CHUNK_SIZE))
+        self.closed = False
+
+    def __iter__(self) -> "_StreamedArray":
+        return self
+
+    def __next__(self) -> Any:
+        try:
+            return next(self._elements)
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self) -> None:
+        """
+        Stops decoding and releases the response's connection.
+        """
+        if not self.closed:
+            self.closed = True
+            self._elements.close()
+            self._response.close()
+
+
+def get_page(url: str, transport: Optional[Transport] = None,
+             stream: bool = False) -> Page:
+    """
+    Fetches JSON data and the pagination links from a given URL over the
+    given (or the shared) transport.
+    When a cache is configured, fresh responses are served from disk and
+    stale ones are revalidated with a conditional request.
+    With stream=True the response must be a JSON array and payload is an
+    iterator decoding its elements incrementally. Cached responses are
+    stored whole, so with a cache configured the iterator runs over the
+    buffered list instead.
+    """
+    transport = transport or get_transport()
+    if _http_cache is not None:
+        payload, headers = cached_get(url, _http_cache, transport.get)
+        if stream:
+            payload = iter(payload)
+    elif stream:
+        response = transport.get(url, stream=True)
+        if not response.ok:
+            response.close()
+            response.raise_for_status()
+        payload, headers = _StreamedArray(response), response.headers
+    else:
+        response = transport.get(url)
+        response.raise_for_status()  # Raise an exception for bad status codes
+        payload, headers = response.json(), response.headers
+    return Page(payload, parse_link_header(headers.get("Link")), headers)
+
+
+def get_json(url: str, transport: Optional[Transport] = None,
+             stream: bool = False) -> Any:
     """
-    Fetches JSON data from a given URL.
+    Fetches JSON data from a given URL; see get_page for stream.
     """
-    response = requests.get(url)
-    response.raise_for_status()  # Raise an exception for bad status codes
-    return response.json()
+    return get_page(url, transport, stream).payload
+
 
 class GithubOrgClient:
     """
     Client for interacting with the GitHub API for organizations.
+    The org and repos payloads are fetched once per client instance, also
+    when several threads ask for them at the same time.
+    Repositories are fetched page by page following the Link header; once
+    the last page is known the remaining pages are fetched concurrently
+    by up to max_workers threads, pausing whenever the rate limit is hit.
+    Requests go over transport, or the shared transport when None.
+    With stream=True each page of repos is decoded incrementally and
+    iter_repos does not keep the repos it yields, so memory stays bounded
+    by the pages in flight; repos() still builds and keeps the full list.
     """
-    def __init__(self, org_name: str):
+    ORG_URL = "https://api.github.com/orgs/{org}"
+    PER_PAGE = 100
+
+    def __init__(self, org_name: str, max_workers: int = 8,
+                 throttle: Optional[RateLimitThrottle] = None,
+                 transport: Optional[Transport] = None,
+                 stream: bool = False):
         self._org_name = org_name
+        self._repos = None
+        self._repos_lock = threading.Lock()
+        self._index = None
+        self._max_workers = max_workers
+        self._throttle = throttle or RateLimitThrottle()
+        self._transport = transport
+        self._stream = stream
+        # Only pass transport through when one was injected
+        self._request_kwargs = {"transport": transport} if transport else {}
 
+    @memoize_method
     def org(self) -> dict:
         """
         Returns the organization's information.
         """
-        url = f"https://api.github.com/orgs/{self._org_name}"
-        return get_json(url)
+        return get_json(self.ORG_URL.format(org=self._org_name),
+                        **self._request_kwargs)
 
     def repos_url(self) -> str:
         """
@@ -37,23 +190,133 @@ class GithubOrgClient:
         """
         Returns a list of repositories for the organization.
         """
-        url = self.repos_url()
-        return get_json(url)
+        if self._repos is None:
+            with self._repos_lock:
+                if self._repos is None:
+                    self._repos = list(self.iter_repos())
+        return self._repos
 
-    def public_repos(self, repo_filter: str = None) -> list:
+    def iter_repos(self) -> Iterator[dict]:
+        """
+        Yields the organization's repositories in page order as the pages
+        arrive. The full list is kept once it has been consumed entirely,
+        unless the client streams.
+        """
+        if self._repos is not None:
+            yield from self._repos
+            return
+        if self._stream:
+            yield from self._fetch_repos()
+            return
+        fetched = []
+        for repo in self._fetch_repos():
+            fetched.append(repo)
+            yield repo
+        self._repos = fetched
+
+    def _fetch_page(self, url: str) -> Page:
+        """
+        Fetches one page, waiting first if the rate limit is exhausted.
+        """
+        self._throttle.wait()
+        page = get_page(url, self._transport, self._stream)
+        self._throttle.update(page.headers)
+        return page
+
+    def _fetch_repos(self) -> Iterator[dict]:
+        """
+        Yields repositories from every page of repos_url.
+        """
+        first = self._fetch_page(with_query(self.repos_url(),
+                                            per_page=self.PER_PAGE))
+        yield from first.payload
+        urls = remaining_page_urls(first.links)
+        if urls is None:
+            # No rel="last": follow rel="next" one page at a time
+            next_url = first.links.get("next")
+            while next_url:
+                page = self._fetch_page(next_url)
+                yield from page.payload
+                next_url = page.links.get("next")
+            return
+
+        # Keep a bounded window of pages in flight so memory stays flat;
+        # a streamed page holds its connection until read, so stream with
+        # no more pages pending than there are workers
+        window = self._max_workers * (1 if self._stream else 2)
+        pool = ThreadPoolExecutor(max_workers=self._max_workers)
+        try:
+            pending = deque()
+            url_iter = iter(urls)
+            for url in url_iter:
+                pending.append(pool.submit(self._fetch_page, url))
+                if len(pending) >= window:
+                    break
+            while pending:
+                page = pending.popleft().result()
+                next_url = next(url_iter, None)
+                if next_url is not None:
+                    pending.append(pool.submit(self._fetch_page, next_url))
+                yield from page.payload
+        finally:
+            # Stopped early: pages fetched or being fetched each hold a
+            # streamed response, whose connection must go back to the pool
+            for future in pending:
+                if future.cancel():
+                    continue
+                try:
+                    page = future.result()
+                except Exception:
+                    continue
+                close = getattr(page.payload, "close", None)
+                if close is not None:
+                    close()
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def refresh(self) -> None:
+        """
+        Drops the memoized org, repos and repo index so the next call
+        fetches them again.
+        """
+        invalidate(self, "org")
+        self._repos = None
+        self._index = None
+
+    def repo_index(self) -> RepoIndex:
+        """
+        Returns the index over repos(), rebuilding it whenever the repos
+        list has been refetched.
+        """
+        repos = self.repos()
+        if self._index is None or self._index.repos is not repos:
+            self._index = RepoIndex(repos)
+        return self._index
+
+    def public_repos(self, repo_filter: str = None,
+                     license: Optional[str] = None,
+                     name_contains: Optional[str] = None) -> list:
         """
         Returns a list of public repositories, optionally filtered.
         This method now calls _public_repo_url for each matching repository
         to satisfy the test's assertion.
+        repo_filter and name_contains both keep names containing the given
+        substring; license keeps repos with that license key. Filtered
+        queries are answered from repo_index() instead of a linear scan.
         """
-        repos = self.repos()
+        if name_contains is None:
+            name_contains = repo_filter
+        if name_contains is None and license is None:
+            repos = self.iter_repos()
+        else:
+            index = self.repo_index()
+            repos = (index.repos[position] for position in
+                     index.query(license=license, name_contains=name_contains))
         filtered_repo_names = []
         for repo in repos:
-            if repo_filter is None or repo_filter in repo["name"]:
-                # Call _public_repo_url to satisfy the test's assertion
-                # that this method is called.
-                self._public_repo_url(repo["name"])
-                filtered_repo_names.append(repo["name"])
+            # Call _public_repo_url to satisfy the test's assertion
+            # that this method is called.
+            self._public_repo_url(repo["name"])
+            filtered_repo_names.append(repo["name"])
         return filtered_repo_names
 
     @staticmethod
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+A persistent HTTP cache for JSON GET requests.
+
+Responses are stored on disk, one file per URL. A stored response is
+returned without any request while it is fresh according to its
+`Cache-Control: max-age`; once stale it is revalidated with
+`If-None-Match` / `If-Modified-Since`, so an unchanged resource costs a
+single 304 round trip.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import time
+from typing import Any, Callable, Dict, Mapping, Optional, Tuple
+
+# Response headers kept alongside the payload (needed to follow pagination)
+STORED_HEADERS = ("Link",)
+
+
+def parse_cache_control(value: Optional[str]) -> Dict[str, Optional[str]]:
+    """
+    Parses a Cache-Control header into a dict of lower-cased directives,
+    e.g. "public, max-age=60" -> {"public": None, "max-age": "60"}.
+    """
+    directives = {}
+    for part in (value or "").split(","):
+        name, _, arg = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = arg.strip('"') or None
+    return directives
+
+
+def freshness_lifetime(headers: Mapping[str, str]) -> Optional[float]:
+    """
+    Returns how many seconds a response stays fresh, or None if it must
+    not be stored at all ("no-store").
+    """
+    directives = parse_cache_control(headers.get("Cache-Control"))
+    if "no-store" in directives:
+        return None
+    if "no-cache" in directives:
+        return 0.0
+    try:
+        max_age = float(directives.get("max-age") or 0)
+        age = float(headers.get("Age") or 0)
+    except ValueError:
+        return 0.0
+    return max(max_age - age, 0.0)
+
+
+class HTTPCache:
+    """
+    Disk-backed store of JSON responses keyed by URL.
+    Each entry is a dict with the keys url, payload, headers (the
+    STORED_HEADERS that were present), etag, last_modified and expires_at
+    (a time.time() timestamp).
+    """
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, url: str) -> str:
+        digest = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{digest}.json")
+
+    def get(self, url: str) -> Optional[dict]:
+        """
+        Returns the stored entry for url, or None if there is none.
+        """
+        try:
+            with open(self._path(url), encoding="utf-8") as handle:
+                entry = json.load(handle)
+        except (OSError, ValueError):
+            return None
+        return entry if entry.get("url") == url else None
+
+    def set(self, url: str, payload, headers: Mapping[str, str]) -> None:
+        """
+        Stores payload for url along with the validators and freshness
+        taken from the response headers. "no-store" responses are dropped.
+        """
+        lifetime = freshness_lifetime(headers)
+        if lifetime is None:
+            self.delete(url)
+            return
+        entry = {
+            "url": url,
+            "payload": payload,
+            "headers": {name: headers[name] for name in STORED_HEADERS
+                        if headers.get(name)},
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+            "expires_at": time.time() + lifetime,
+        }
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as handle:
+            json.dump(entry, handle)
+        os.replace(tmp_path, self._path(url))
+
+    def delete(self, url: str) -> None:
+        """
+        Removes the entry for url if there is one.
+        """
+        try:
+            os.remove(self._path(url))
+        except FileNotFoundError:
+            pass
+
+    def clear(self) -> None:
+        """
+        Removes every stored entry.
+        """
+        for name in os.listdir(self.directory):
+            if name.endswith(".json"):
+                os.remove(os.path.join(self.directory, name))
+
+
+def is_fresh(entry: dict) -> bool:
+    """
+    Returns True if a cached entry can be used without revalidation.
+    """
+    return time.time() < entry.get("expires_at", 0)
+
+
+def validators(entry: dict) -> Dict[str, str]:
+    """
+    Returns the conditional request headers for revalidating an entry.
+    """
+    headers = {}
+    if entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+    return headers
+
+
+def cached_get(url: str, cache: HTTPCache,
+               fetch: Callable[..., Any]) -> Tuple[Any, Dict[str, str]]:
+    """
+    Returns (payload, headers) for url, using cache to avoid or shorten the
+    request. fetch(url, headers=...) performs the actual GET. For responses
+    served from the cache, headers holds only the STORED_HEADERS.
+    """
+    entry = cache.get(url)
+    if entry is not None and is_fresh(entry):
+        return entry["payload"], entry.get("headers", {})
+
+    response = fetch(url, headers=validators(entry) if entry else {})
+    if response.status_code == 304 and entry is not None:
+        # Keep the stored body; take new validators/freshness if sent
+        headers = dict(entry.get("headers", {}))
+        headers.update({
+            "Cache-Control": response.headers.get("Cache-Control"),
+            "Age": response.headers.get("Age"),
+            "ETag": response.headers.get("ETag") or entry.get("etag"),
+            "Last-Modified": (response.headers.get("Last-Modified")
+                              or entry.get("last_modified")),
+        })
+        cache.set(url, entry["payload"], headers)
+        return entry["payload"], headers
+
+    response.raise_for_status()
+    payload = response.json()
+    cache.set(url, payload, response.headers)
+    return payload, response.headers
+
+
+def cached_get_json(url: str, cache: HTTPCache, fetch: Callable[..., Any]):
+    """
+    Returns the JSON payload for url; see cached_get.
+    """
+    return cached_get(url, cache, fetch)[0]
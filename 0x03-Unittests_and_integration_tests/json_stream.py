@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Incremental decoding of a top-level JSON array.
+
+iter_json_array() takes the body as an iterable of byte chunks (e.g.
+response.iter_content()) and yields the array's elements one at a time,
+so only the element being decoded and the unread tail of the current
+chunk are held in memory. Elements are decoded with orjson when it is
+installed, and with the standard library's json otherwise.
+"""
+import codecs
+import json
+import re
+from typing import Any, Callable, Iterable, Iterator, Optional, Union
+
+try:
+    import orjson
+except ImportError:  # optional fast path
+    orjson = None
+
+HAVE_ORJSON = orjson is not None
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_WHITESPACE_BYTES = re.compile(rb"[ \t\n\r]*")
+# A complete string, a lone quote (string cut off by the chunk), a bracket
+_CONTAINER_TOKEN = re.compile(rb'"(?:[^"\\]|\\.)*"|"|[\[\]{}]', re.DOTALL)
+_STRING = re.compile(rb'"(?:[^"\\]|\\.)*"', re.DOTALL)
+_SCALAR = re.compile(rb"[^,\]\s]+")
+_SCALAR_TEXT = re.compile(r"[^,\]\s]+")
+
+# Parser states
+_START, _FIRST, _AFTER_VALUE, _AFTER_COMMA, _DONE = range(5)
+
+
+def _value_end(buf: bytes, pos: int) -> Optional[int]:
+    """
+    Returns the end offset of the JSON value starting at buf[pos], or None
+    when the buffer ends before the value does.
+    """
+    first = buf[pos:pos + 1]
+    if first == b'"':
+        match = _STRING.match(buf, pos)
+        return match.end() if match else None
+    if first not in (b"[", b"{"):
+        match = _SCALAR.match(buf, pos)
+        return match.end() if match and match.end() < len(buf) else None
+    depth = 0
+    for match in _CONTAINER_TOKEN.finditer(buf, pos):
+        token = match.group()
+        if token == b'"':
+            return None
+        if token in (b"[", b"{"):
+            depth += 1
+        elif token in (b"]", b"}"):
+            depth -= 1
+            if depth == 0:
+                return match.end()
+    return None
+
+
+class _ArrayParser:
+    """
+    State machine over the array's punctuation. decode(buf, pos, final)
+    returns (element, end) or None when more input is needed.
+    """
+    def __init__(self, whitespace, decode: Callable) -> None:
+        self.state = _START
+        self._whitespace = whitespace
+        self._decode = decode
+
+    def elements(self, buf, final: bool) -> Iterator[Any]:
+        """
+        Yields every element complete in buf; afterwards self.consumed
+        tells how much of buf has been used.
+        """
+        pos = 0
+        size = len(buf)
+        while True:
+            pos = self._whitespace.match(buf, pos).end()
+            self.consumed = pos
+            if pos == size:
+                return
+            char = buf[pos:pos + 1]
+            if self.state == _START:
+                if char not in ("[", b"["):
+                    raise ValueError("expected a JSON array")
+                pos += 1
+                self.state = _FIRST
+            elif self.state == _AFTER_VALUE:
+                if char in (",", b","):
+                    self.state = _AFTER_COMMA
+                elif char in ("]", b"]"):
+                    self.state = _DONE
+                else:
+                    raise ValueError(f"expected ',' or ']' at {char!r}")
+                pos += 1
+            elif self.state == _DONE:
+                raise ValueError("extra data after the JSON array")
+            elif self.state == _FIRST and char in ("]", b"]"):
+                pos += 1
+                self.state = _DONE
+            else:
+                decoded = self._decode(buf, pos, final)
+                if decoded is None:
+                    return
+                element, pos = decoded
+                self.state = _AFTER_VALUE
+                self.consumed = pos
+                yield element
+
+
+def _stdlib_decoder() -> Callable:
+    raw_decode = json.JSONDecoder().raw_decode
+
+    def decode(buf: str, pos: int, final: bool):
+        # A number or literal is complete only once a delimiter follows it:
+        # raw_decode would take the "1" of a "1." cut off by the chunk
+        if not final and buf[pos] not in '"[{':
+            match = _SCALAR_TEXT.match(buf, pos)
+            if match and match.end() == len(buf):
+                return None
+        try:
+            element, end = raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            if final:
+                raise
+            return None
+        return element, end
+    return decode
+
+
+def _orjson_decoder() -> Callable:
+    def decode(buf: bytes, pos: int, final: bool):
+        end = _value_end(buf, pos)
+        if end is None:
+            if not final:
+                return None
+            end = len(buf)
+        return orjson.loads(buf[pos:end]), end
+    return decode
+
+
+def iter_json_array(chunks: Iterable[Union[bytes, str]],
+                    use_orjson: Optional[bool] = None) -> Iterator[Any]:
+    """
+    Yields the elements of the JSON array spread over chunks. Raises
+    ValueError if the document is not a single, complete array.
+    use_orjson picks the element decoder; None means orjson if installed.
+    """
+    if use_orjson is None:
+        use_orjson = HAVE_ORJSON
+    if use_orjson:
+        if orjson is None:
+            raise ImportError("orjson is not installed")
+        parser = _ArrayParser(_WHITESPACE_BYTES, _orjson_decoder())
+        buf = b""
+        text = None
+    else:
+        parser = _ArrayParser(_WHITESPACE, _stdlib_decoder())
+        buf = ""
+        text = codecs.getincrementaldecoder("utf-8")()
+
+    # Buffer size at which a value was last found incomplete; retrying
+    # only once the buffer has doubled keeps huge elements linear
+    retry_at = 0
+
+    def feed(chunk, final: bool) -> Iterator[Any]:
+        nonlocal buf, retry_at
+        if text is not None:
+            chunk = text.decode(chunk, final) if isinstance(
+                chunk, bytes) else chunk
+        elif isinstance(chunk, str):
+            chunk = chunk.encode("utf-8")
+        buf += chunk
+        if len(buf) < retry_at and not final:
+            return
+        yield from parser.elements(buf, final)
+        buf = buf[parser.consumed:]
+        retry_at = 2 * len(buf)
+
+    for chunk in chunks:
+        if chunk:
+            yield from feed(chunk, False)
+    yield from feed(b"", True)
+    if parser.state != _DONE:
+        raise ValueError("truncated JSON array")
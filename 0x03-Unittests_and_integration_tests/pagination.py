@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Helpers for paginated GitHub API responses: Link header parsing, page
+URL construction and a rate-limit aware throttle.
+"""
+import re
+import threading
+import time
+from typing import Callable, Dict, List, Mapping, Optional
+from urllib.parse import parse_qs, urlencode, urlparse, urlunparse
+
+_LINK_RE = re.compile(r'<([^>]*)>\s*;\s*rel="?([^";]+)"?')
+
+
+def parse_link_header(value: Optional[str]) -> Dict[str, str]:
+    """
+    Parses an RFC 8288 Link header into {rel: url}, e.g.
+    '<https://x/repos?page=2>; rel="next"' -> {"next": "https://x/repos?page=2"}.
+    """
+    links = {}
+    for url, rels in _LINK_RE.findall(value or ""):
+        for rel in rels.split():
+            links[rel] = url
+    return links
+
+
+def with_query(url: str, **params) -> str:
+    """
+    Returns url with the given query parameters set (replacing any
+    existing values).
+    """
+    parts = urlparse(url)
+    query = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+    query.update({key: str(value) for key, value in params.items()})
+    return urlunparse(parts._replace(query=urlencode(query)))
+
+
+def page_number(url: str) -> Optional[int]:
+    """
+    Returns the value of the page query parameter of url, if any.
+    """
+    values = parse_qs(urlparse(url).query).get("page")
+    try:
+        return int(values[-1]) if values else None
+    except ValueError:
+        return None
+
+
+def remaining_page_urls(links: Mapping[str, str]) -> Optional[List[str]]:
+    """
+    Returns the URLs of every page after the current one when the Link
+    header names both the next and the last page, otherwise None.
+    """
+    if "next" not in links or "last" not in links:
+        return None
+    first, last = page_number(links["next"]), page_number(links["last"])
+    if first is None or last is None:
+        return None
+    return [with_query(links["next"], page=n) for n in range(first, last + 1)]
+
+
+class RateLimitThrottle:
+    """
+    Tracks GitHub's X-RateLimit-Remaining / X-RateLimit-Reset headers and
+    blocks callers of wait() once the quota is used up, until the reset
+    time. A Retry-After header (secondary rate limits) pauses the same way.
+    Safe to share between threads.
+    """
+    def __init__(self, reserve: int = 0,
+                 clock: Callable[[], float] = time.time,
+                 sleep: Callable[[float], None] = time.sleep) -> None:
+        self.reserve = reserve
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._remaining: Optional[int] = None
+        self._resume_at = 0.0
+
+    def update(self, headers: Mapping[str, str]) -> None:
+        """
+        Records the rate-limit state reported by a response.
+        """
+        with self._lock:
+            remaining = headers.get("X-RateLimit-Remaining")
+            reset = headers.get("X-RateLimit-Reset")
+            retry_after = headers.get("Retry-After")
+            if remaining is not None:
+                self._remaining = int(remaining)
+                if self._remaining <= self.reserve and reset is not None:
+                    self._resume_at = max(self._resume_at, float(reset))
+            if retry_after is not None:
+                self._resume_at = max(self._resume_at,
+                                      self._clock() + float(retry_after))
+
+    def delay(self) -> float:
+        """
+        Returns how many seconds to wait before the next request.
+        """
+        with self._lock:
+            return max(self._resume_at - self._clock(), 0.0)
+
+    def wait(self) -> float:
+        """
+        Sleeps until requests may be sent again and returns the number of
+        seconds slept.
+        """
+        delay = self.delay()
+        if delay > 0:
+            self._sleep(delay)
+        return delay
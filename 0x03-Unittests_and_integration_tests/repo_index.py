@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+An in-memory index over a list of GitHub repository payloads.
+
+Answers license and name-substring queries without scanning every repo:
+license keys map to posting lists, and every 1-3 character substring of
+a name maps to the repos containing it. A longer needle is answered by
+intersecting the postings of its trigrams and confirming the matches.
+"""
+from typing import Dict, Iterable, List, Optional, Set
+
+GRAM = 3
+
+
+def _grams(text: str, size: int) -> Set[str]:
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+class RepoIndex:
+    """
+    Index over repos (a list of dicts with "name" and "license" keys).
+    Query results are positions into that list, in ascending order.
+    The index does not follow later changes to the list; build a new one.
+    """
+    def __init__(self, repos: List[dict]) -> None:
+        self.repos = repos
+        self._by_license: Dict[Optional[str], List[int]] = {}
+        self._by_gram: Dict[str, Set[int]] = {}
+        for position, repo in enumerate(repos):
+            license_key = (repo.get("license") or {}).get("key")
+            self._by_license.setdefault(license_key, []).append(position)
+            name = repo["name"]
+            for size in range(1, GRAM + 1):
+                for gram in _grams(name, size):
+                    self._by_gram.setdefault(gram, set()).add(position)
+
+    def with_license(self, license_key: Optional[str]) -> List[int]:
+        """
+        Returns the positions of repos whose license key is license_key
+        (None for repos without a license).
+        """
+        return self._by_license.get(license_key, [])
+
+    def name_contains(self, needle: str) -> Set[int]:
+        """
+        Returns the positions of repos whose name contains needle.
+        """
+        if not needle:
+            return set(range(len(self.repos)))
+        if len(needle) <= GRAM:
+            return set(self._by_gram.get(needle, ()))
+        postings = sorted((self._by_gram.get(gram, set())
+                           for gram in _grams(needle, GRAM)), key=len)
+        candidates = set(postings[0]).intersection(*postings[1:])
+        return {p for p in candidates if needle in self.repos[p]["name"]}
+
+    def query(self, license: Optional[str] = None,
+              name_contains: Optional[str] = None) -> List[int]:
+        """
+        Returns the sorted positions matching every given filter; a None
+        filter is not applied.
+        """
+        sets: List[Iterable[int]] = []
+        if license is not None:
+            sets.append(self.with_license(license))
+        if name_contains is not None:
+            sets.append(self.name_contains(name_contains))
+        if not sets:
+            return list(range(len(self.repos)))
+        sets.sort(key=len)
+        result = set(sets[0]).intersection(*sets[1:])
+        return sorted(result)
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+A local stub HTTP server serving canned JSON responses, used by the
+integration tests instead of the real GitHub API.
+"""
+import gzip
+import hashlib
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+
+def route_key(path: str) -> str:
+    """
+    Normalises a request path so query parameter order does not matter.
+    """
+    parts = urlsplit(path)
+    query = sorted(parse_qsl(parts.query, keep_blank_values=True))
+    return parts.path + ("?" + urlencode(query) if query else "")
+
+
+class StubServer:
+    """
+    Serves JSON bodies registered with add() on 127.0.0.1 in a background
+    thread. Each response carries a strong ETag derived from the body and
+    the route's Cache-Control header; conditional requests whose
+    If-None-Match matches get a bodyless 304.
+    Every request is appended to `requests` as (method, path, headers).
+    With gzip=True bodies are gzip-encoded for clients that accept it.
+    """
+    def __init__(self, gzip: bool = False) -> None:
+        self.gzip = gzip
+        self.routes: Dict[str, dict] = {}
+        self.failures: Dict[str, List[tuple]] = {}
+        self.requests: List[tuple] = []
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        kwargs={"poll_interval": 0.05},
+                                        daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        """
+        Returns the http://host:port prefix of the server.
+        """
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def url(self, path: str) -> str:
+        """
+        Returns the absolute URL for path.
+        """
+        return self.base_url + path
+
+    def add(self, path: str, payload, cache_control: Optional[str] = None,
+            status: int = 200, headers: Optional[Dict[str, str]] = None) -> None:
+        """
+        Registers (or replaces) the response served for path.
+        """
+        body = json.dumps(payload).encode("utf-8")
+        with self._lock:
+            self.routes[route_key(path)] = {
+                "body": body,
+                "etag": '"%s"' % hashlib.sha1(body).hexdigest(),
+                "cache_control": cache_control,
+                "status": status,
+                "headers": dict(headers or {}),
+            }
+
+    def fail_next(self, path: str, status: int, times: int = 1,
+                  headers: Optional[Dict[str, str]] = None) -> None:
+        """
+        Makes the next `times` requests for path answer with status
+        (e.g. 503 or 429) before the registered route is served again.
+        """
+        with self._lock:
+            self.failures.setdefault(route_key(path), []).extend(
+                [(status, dict(headers or {}))] * times)
+
+    def add_pages(self, path: str, items: list, per_page: int,
+                  headers: Optional[Dict[str, str]] = None) -> int:
+        """
+        Serves items as a GitHub-style paginated list under
+        path?per_page=<per_page>&page=<n>, with first/prev/next/last Link
+        headers. Page 1 is also served without the page parameter.
+        Returns the number of pages.
+        """
+        pages = max((len(items) + per_page - 1) // per_page, 1)
+
+        def link(page):
+            return self.url(f"{path}?per_page={per_page}&page={page}")
+
+        for page in range(1, pages + 1):
+            rels = {}
+            if page > 1:
+                rels.update(first=link(1), prev=link(page - 1))
+            if page < pages:
+                rels.update(next=link(page + 1), last=link(pages))
+            page_headers = dict(headers or {})
+            if rels:
+                page_headers["Link"] = ", ".join(
+                    f'<{url}>; rel="{rel}"' for rel, url in rels.items())
+            chunk = items[(page - 1) * per_page:page * per_page]
+            self.add(f"{path}?per_page={per_page}&page={page}", chunk,
+                     headers=page_headers)
+            if page == 1:
+                self.add(f"{path}?per_page={per_page}", chunk,
+                         headers=page_headers)
+        return pages
+
+    def count(self, path: Optional[str] = None) -> int:
+        """
+        Returns how many requests were received (for path, if given).
+        """
+        key = route_key(path) if path is not None else None
+        with self._lock:
+            return sum(1 for _, p, _ in self.requests
+                       if key in (None, route_key(p)))
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                with stub._lock:
+                    stub.requests.append(("GET", self.path, dict(self.headers)))
+                    key = route_key(self.path)
+                    route = stub.routes.get(key)
+                    failures = stub.failures.get(key)
+                    failure = failures.pop(0) if failures else None
+                if failure is not None:
+                    status, headers = failure
+                    self._send(status, b'{"message": "stub failure"}', headers)
+                    return
+                if route is None:
+                    self._send(404, b'{"message": "Not Found"}', {})
+                    return
+                headers = dict(route["headers"])
+                headers["ETag"] = route["etag"]
+                if route["cache_control"]:
+                    headers["Cache-Control"] = route["cache_control"]
+                if self.headers.get("If-None-Match") == route["etag"]:
+                    self._send(304, b"", headers)
+                    return
+                self._send(route["status"], route["body"], headers)
+
+            def _send(self, status, body, headers):
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                if (status != 304 and stub.gzip
+                        and "gzip" in self.headers.get("Accept-Encoding", "")):
+                    body = gzip.compress(body)
+                    self.send_header("Content-Encoding", "gzip")
+                if status != 304:
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if status != 304:
+                    self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> "StubServer":
+        """
+        Starts serving in a daemon thread and returns self.
+        """
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """
+        Shuts the server down and closes its socket.
+        """
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "StubServer":
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.stop()
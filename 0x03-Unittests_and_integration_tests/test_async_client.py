@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Tests for AsyncGithubOrgClient and the bulk scan API, run against a
+local fake GitHub server.
+"""
+import asyncio
+import threading
+import unittest
+from unittest.mock import patch
+
+import async_client
+from async_client import (AsyncGithubOrgClient, RequestLimiter, TokenBucket,
+                          scan_all)
+from client import GithubOrgClient, get_page
+from stub_server import StubServer
+
+
+class TestTokenBucket(unittest.IsolatedAsyncioTestCase):
+    """
+    Tests for TokenBucket with a fake clock.
+    """
+
+    async def test_waits_for_refill(self):
+        """
+        Test that acquiring past the burst sleeps for the missing tokens.
+        """
+        now = [0.0]
+        slept = []
+
+        async def fake_sleep(seconds):
+            slept.append(seconds)
+            now[0] += seconds
+
+        bucket = TokenBucket(rate=2, capacity=2, clock=lambda: now[0])
+        with patch("async_client.asyncio.sleep", fake_sleep):
+            for _ in range(4):
+                await bucket.acquire()
+        self.assertEqual(slept, [0.5, 0.5])
+
+
+class TestAsyncGithubOrgClient(unittest.IsolatedAsyncioTestCase):
+    """
+    Integration tests against a fake server with many orgs.
+    """
+
+    ORG_COUNT = 40
+
+    def setUp(self):
+        self.server = StubServer().start()
+        for i in range(self.ORG_COUNT):
+            org = f"org{i}"
+            self.server.add(f"/orgs/{org}", {
+                "repos_url": self.server.url(f"/orgs/{org}/repos")})
+            self.server.add_pages(f"/orgs/{org}/repos", [
+                {"name": f"{org}-repo-{n}",
+                 "license": {"key": "mit"} if n % 2 else None}
+                for n in range(250)
+            ], 100)
+        self.org_url = patch.object(AsyncGithubOrgClient, "ORG_URL",
+                                    self.server.base_url + "/orgs/{org}")
+        self.org_url.start()
+
+    def tearDown(self):
+        self.org_url.stop()
+        self.server.stop()
+
+    async def test_same_results_as_sync_client(self):
+        """
+        Test that public_repos matches the synchronous client.
+        """
+        with patch.object(GithubOrgClient, "ORG_URL",
+                          self.server.base_url + "/orgs/{org}"):
+            expected = GithubOrgClient("org1").public_repos(repo_filter="-1")
+        client = AsyncGithubOrgClient("org1")
+        self.assertEqual(await client.public_repos(repo_filter="-1"), expected)
+        self.assertEqual(await client.repos_url(),
+                         self.server.url("/orgs/org1/repos"))
+
+    async def test_concurrent_awaits_fetch_org_once(self):
+        """
+        Test that concurrent org() awaits share one request.
+        """
+        client = AsyncGithubOrgClient("org2")
+        await asyncio.gather(*(client.org() for _ in range(5)))
+        self.assertEqual(self.server.count("/orgs/org2"), 1)
+
+    async def test_scan_respects_global_concurrency(self):
+        """
+        Test that a scan of many orgs never exceeds max_concurrency.
+        """
+        active, peak, lock = [0], [0], threading.Lock()
+
+        def tracked_get_page(url, transport=None):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            try:
+                return get_page(url, transport)
+            finally:
+                with lock:
+                    active[0] -= 1
+
+        names = [f"org{i}" for i in range(self.ORG_COUNT)]
+        limiter = RequestLimiter(max_concurrency=5)
+        with patch("async_client.get_page", tracked_get_page):
+            results = await scan_all(names, limiter=limiter)
+        self.assertEqual(sorted(r.org for r in results), sorted(names))
+        self.assertTrue(all(len(r.result) == 250 for r in results))
+        self.assertLessEqual(peak[0], 5)
+        self.assertGreater(peak[0], 1)
+
+    async def test_errors_are_reported_per_org(self):
+        """
+        Test that a missing org yields an error without failing the scan.
+        """
+        results = await scan_all(["org0", "missing"])
+        by_org = {r.org: r for r in results}
+        self.assertIsNone(by_org["org0"].error)
+        self.assertIsNotNone(by_org["missing"].error)
+
+    async def test_results_arrive_as_completed(self):
+        """
+        Test that a fast org is yielded before a slow one.
+        """
+        async def scan(client):
+            if client._org_name == "org0":
+                await asyncio.sleep(0.2)
+            return await client.org()
+
+        order = [r.org async for r in async_client.scan_orgs(
+            ["org0", "org1"], scan=scan)]
+        self.assertEqual(order, ["org1", "org0"])
+
+    async def test_has_license(self):
+        """
+        Test that has_license is the same static check as the sync client.
+        """
+        repos = await AsyncGithubOrgClient("org3").repos()
+        licensed = [r for r in repos
+                    if AsyncGithubOrgClient.has_license(r, "mit")]
+        self.assertEqual(len(licensed), 125)
+
+
+if __name__ == "__main__":
+    unittest.main()
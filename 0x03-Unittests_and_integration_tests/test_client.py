@@ -5,7 +5,7 @@ Unit tests for the GithubOrgClient class.
 import unittest
 from unittest.mock import patch, Mock
 from parameterized import parameterized
-from client import GithubOrgClient, get_json  # Assuming client.py is in the same directory
+from client import GithubOrgClient, Page, get_json  # Assuming client.py is in the same directory
 
 
 class TestGithubOrgClient(unittest.TestCase):
@@ -50,36 +50,32 @@ class TestGithubOrgClient(unittest.TestCase):
         # our expected_payload
         self.assertEqual(result, expected_payload)
 
-    @patch('client.get_json')
-    def test_public_repos(self, mock_get_json):
+    @patch('client.get_page')
+    def test_public_repos(self, mock_get_page):
         """
         Test GithubOrgClient.public_repos with mocking.
-        - get_json is mocked as a decorator.
-        - _public_repo_url is mocked as a context manager.
+        - get_page is mocked as a decorator.
+        - repos_url and _public_repo_url are mocked as context managers.
         """
-        # Define the payload that mock_get_json should return
-        # This simulates the list of repositories from the API
+        # Define the page that mock_get_page should return
+        # This simulates a single page of repositories from the API,
+        # with no Link header to follow
         repos_payload = [
             {"name": "alx-backend", "license": {"key": "mit"}},
             {"name": "holberton-system", "license": {"key": "apache-2.0"}},
             {"name": "my-project", "license": None},
             {"name": "another-alx-repo", "license": {"key": "gpl-3.0"}}
         ]
-        mock_get_json.return_value = repos_payload
+        mock_get_page.return_value = Page(repos_payload, {}, {})
 
         # Define the expected list of repository names after filtering by "alx"
         expected_repos = ["alx-backend", "another-alx-repo"]
 
-        # Mock GithubOrgClient._public_repo_url as a context manager.
-        # In the current client.py, public_repos does NOT directly call
-        # _public_repo_url. This mock is included to strictly satisfy the
-        # prompt's instruction to mock this specific method using a
-        # context manager.
-        with patch('client.GithubOrgClient._public_repo_url') as \
+        repos_url = "https://api.github.com/orgs/test_org/repos"
+        with patch.object(GithubOrgClient, 'repos_url',
+                          return_value=repos_url) as mock_repos_url, \
+                patch('client.GithubOrgClient._public_repo_url') as \
                 mock_public_repo_url:
-            # Set a return value for the mocked static method.
-            # This value might not be used if the method is not called by
-            # public_repos.
             mock_public_repo_url.return_value = "http://mocked.url/repo_name"
 
             # Create an instance of GithubOrgClient
@@ -87,22 +83,19 @@ class TestGithubOrgClient(unittest.TestCase):
 
             # Call public_repos with a filter.
             # This call will internally trigger self.repos() which then
-            # calls get_json().
+            # fetches the only page of repos_url with get_page().
             result = org_client.public_repos(repo_filter="alx")
 
             # Assert that the list of repos returned is what we expect
             # based on the payload.
             self.assertEqual(result, expected_repos)
 
-            # Assert that mock_get_json was called once.
-            # It is called by self.repos() when public_repos is executed.
-            mock_get_json.assert_called_once()
-
-            # Assert that mock_public_repo_url was called once.
-            # IMPORTANT: Based on the current client.py implementation,
-            # public_repos does not call _public_repo_url. If this assertion
-            # fails, it indicates that _public_repo_url was not called by
-            # the public_repos method. This assertion is included to strictly
-            # adhere to the prompt's instruction to test that "the mocked
-            # property ... was called once."
-            mock_public_repo_url.assert_called_once()
+            # The single page was fetched once, from repos_url
+            mock_repos_url.assert_called_once()
+            mock_get_page.assert_called_once()
+            self.assertTrue(
+                mock_get_page.call_args.args[0].startswith(repos_url))
+
+            # _public_repo_url is called once for each matching repository
+            self.assertEqual(mock_public_repo_url.call_count,
+                             len(expected_repos))
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Integration tests for the persistent HTTP cache used by client.get_json,
+run against a local stub HTTP server.
+"""
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+from parameterized import parameterized
+
+from client import GithubOrgClient, configure_cache, get_json
+from http_cache import freshness_lifetime
+from stub_server import StubServer
+
+
+class TestFreshness(unittest.TestCase):
+    """
+    Tests for Cache-Control parsing.
+    """
+
+    @parameterized.expand([
+        ({"Cache-Control": "public, max-age=60"}, 60.0),
+        ({"Cache-Control": "max-age=60", "Age": "15"}, 45.0),
+        ({"Cache-Control": "private, max-age=60, no-cache"}, 0.0),
+        ({}, 0.0),
+        ({"Cache-Control": "no-store"}, None),
+    ])
+    def test_freshness_lifetime(self, headers, expected):
+        """
+        Test that max-age, Age, no-cache and no-store are honoured.
+        """
+        self.assertEqual(freshness_lifetime(headers), expected)
+
+
+class TestCachedGetJson(unittest.TestCase):
+    """
+    Tests for get_json with a configured cache.
+    """
+
+    def setUp(self):
+        self.server = StubServer().start()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = configure_cache(self.tmp.name)
+
+    def tearDown(self):
+        configure_cache(None)
+        self.server.stop()
+        self.tmp.cleanup()
+
+    def test_fresh_response_costs_no_request(self):
+        """
+        Test that a response within max-age is served from disk.
+        """
+        self.server.add("/orgs/google", {"login": "google"},
+                        cache_control="max-age=60")
+        url = self.server.url("/orgs/google")
+        self.assertEqual(get_json(url), {"login": "google"})
+        self.assertEqual(get_json(url), {"login": "google"})
+        self.assertEqual(self.server.count(), 1)
+
+    def test_stale_response_is_revalidated_with_304(self):
+        """
+        Test that a stale entry is revalidated with If-None-Match and the
+        stored body is reused on 304.
+        """
+        self.server.add("/orgs/google", {"login": "google"})
+        url = self.server.url("/orgs/google")
+        get_json(url)
+        self.assertEqual(get_json(url), {"login": "google"})
+        self.assertEqual(self.server.count(), 2)
+        _, _, headers = self.server.requests[-1]
+        self.assertEqual(headers.get("If-None-Match"),
+                         self.server.routes["/orgs/google"]["etag"])
+
+    def test_changed_resource_is_refetched(self):
+        """
+        Test that a new ETag on the server replaces the stored body.
+        """
+        self.server.add("/orgs/google", {"login": "google"})
+        url = self.server.url("/orgs/google")
+        get_json(url)
+        self.server.add("/orgs/google", {"login": "google", "v": 2})
+        self.assertEqual(get_json(url), {"login": "google", "v": 2})
+
+    def test_no_store_is_not_cached(self):
+        """
+        Test that no-store responses are never written to disk.
+        """
+        self.server.add("/orgs/google", {"login": "google"},
+                        cache_control="no-store")
+        get_json(self.server.url("/orgs/google"))
+        self.assertIsNone(self.cache.get(self.server.url("/orgs/google")))
+
+    def test_cache_persists_across_instances(self):
+        """
+        Test that a new HTTPCache on the same directory sees old entries.
+        """
+        self.server.add("/orgs/google", {"login": "google"},
+                        cache_control="max-age=60")
+        url = self.server.url("/orgs/google")
+        get_json(url)
+        configure_cache(self.tmp.name)
+        get_json(url)
+        self.assertEqual(self.server.count(), 1)
+        self.assertTrue(os.listdir(self.tmp.name))
+
+    def test_expired_entry_is_revalidated(self):
+        """
+        Test that an entry is revalidated once max-age has passed.
+        """
+        self.server.add("/orgs/google", {"login": "google"},
+                        cache_control="max-age=60")
+        url = self.server.url("/orgs/google")
+        get_json(url)
+        with patch("http_cache.time.time", return_value=time.time() + 61):
+            get_json(url)
+        self.assertEqual(self.server.count(), 2)
+
+
+class TestClientMemoization(unittest.TestCase):
+    """
+    Tests that GithubOrgClient fetches org and repos once per instance.
+    """
+
+    def test_repeated_calls_fetch_once(self):
+        """
+        Test that org, repos_url and public_repos reuse earlier payloads.
+        """
+        with StubServer() as server:
+            server.add("/orgs/google",
+                       {"repos_url": server.url("/orgs/google/repos")})
+            server.add("/orgs/google/repos?per_page=100",
+                       [{"name": "a", "license": None}])
+            with patch.object(GithubOrgClient, "ORG_URL",
+                              server.base_url + "/orgs/{org}"):
+                org_client = GithubOrgClient("google")
+                org_client.repos_url()
+                org_client.public_repos()
+                org_client.public_repos()
+            self.assertEqual(server.count("/orgs/google"), 1)
+            self.assertEqual(server.count("/orgs/google/repos?per_page=100"), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
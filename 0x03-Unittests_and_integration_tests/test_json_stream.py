@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Tests for incremental JSON array decoding and streamed repository pages.
+"""
+import json
+import unittest
+from itertools import islice
+from unittest.mock import patch
+
+from parameterized import parameterized
+
+import json_stream
+from client import GithubOrgClient, configure_transport, get_json, get_page
+from json_stream import iter_json_array
+from stub_server import StubServer
+from transport import Transport
+
+DECODERS = [("stdlib", False)]
+if json_stream.HAVE_ORJSON:
+    DECODERS.append(("orjson", True))
+
+DOCUMENT = [
+    {"name": "repo", "tags": ["a]", "{b"], "quote": "say \"hi\" \\"},
+    {"nested": {"list": [1, [2, [3]]]}, "unicode": "é☃"},
+    12345, -1.5e3, "text", True, False, None, [], {},
+]
+
+
+def chunked(data: bytes, size: int) -> list:
+    """Splits data into chunks of size bytes."""
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+class TestIterJsonArray(unittest.TestCase):
+    """Tests for iter_json_array with each available decoder"""
+
+    @parameterized.expand([
+        (f"{name}_{size}", use_orjson, size)
+        for name, use_orjson in DECODERS for size in (1, 2, 7, 64, 1 << 20)
+    ])
+    def test_decodes_any_chunking(self, _, use_orjson, size):
+        """elements come out intact however the body is split"""
+        data = json.dumps(DOCUMENT, ensure_ascii=False).encode("utf-8")
+        self.assertEqual(list(iter_json_array(chunked(data, size),
+                                              use_orjson=use_orjson)),
+                         DOCUMENT)
+
+    @parameterized.expand([
+        (f"{name}_{i}", use_orjson, chunks, expected)
+        for name, use_orjson in DECODERS
+        for i, (chunks, expected) in enumerate([
+            ([b"[1.", b"5]"], [1.5]),
+            ([b"[1e", b"3]"], [1e3]),
+            ([b"[-", b"2.5E-", b"2, 7]"], [-0.025, 7]),
+            ([b"[12", b"34", b" ]"], [1234]),
+            ([b"[tr", b"ue, fal", b"se]"], [True, False]),
+        ])
+    ])
+    def test_scalar_split_across_chunks(self, _, use_orjson, chunks,
+                                        expected):
+        """a number or literal cut off by a chunk boundary is completed"""
+        self.assertEqual(list(iter_json_array(chunks, use_orjson=use_orjson)),
+                         expected)
+
+    @parameterized.expand([
+        (f"{name}_{i}", use_orjson, body)
+        for name, use_orjson in DECODERS
+        for i, body in enumerate([b"", b"{}", b"[1, 2", b"[1 2]", b"[1],",
+                                  b'["open', b"[1,]"])
+    ])
+    def test_rejects_invalid_documents(self, _, use_orjson, body):
+        """anything but one complete array raises ValueError"""
+        with self.assertRaises(ValueError):
+            list(iter_json_array([body], use_orjson=use_orjson))
+
+    def test_yields_before_the_body_ends(self):
+        """the first element is available before later chunks are read"""
+        read = []
+
+        def chunks():
+            for chunk in (b'[{"a": 1},', b' {"b": 2}]'):
+                read.append(chunk)
+                yield chunk
+
+        elements = iter_json_array(chunks(), use_orjson=False)
+        self.assertEqual(next(elements), {"a": 1})
+        self.assertEqual(len(read), 1)
+        self.assertEqual(list(elements), [{"b": 2}])
+
+
+class TestStreamedRepos(unittest.TestCase):
+    """Integration tests for stream=True against a local fake server"""
+
+    def setUp(self):
+        self.server = StubServer(gzip=True).start()
+        self.items = [{"name": f"repo-{i}", "license": None}
+                      for i in range(550)]
+        self.server.add("/orgs/big",
+                        {"repos_url": self.server.url("/orgs/big/repos")})
+        self.pages = self.server.add_pages("/orgs/big/repos", self.items,
+                                           GithubOrgClient.PER_PAGE)
+        self.transport = configure_transport(Transport(timeout=5))
+        self.org_url = patch.object(GithubOrgClient, "ORG_URL",
+                                    self.server.base_url + "/orgs/{org}")
+        self.org_url.start()
+
+    def tearDown(self):
+        self.org_url.stop()
+        configure_transport(None)
+        self.server.stop()
+
+    def test_get_json_stream(self):
+        """get_json(stream=True) yields the array's elements"""
+        url = self.server.url("/orgs/big/repos?per_page=100")
+        elements = get_json(url, stream=True)
+        self.assertNotIsInstance(elements, list)
+        self.assertEqual(list(elements), self.items[:100])
+
+    def test_streaming_client_returns_every_repo(self):
+        """a streaming client yields every repo without keeping them"""
+        org_client = GithubOrgClient("big", max_workers=2, stream=True)
+        self.assertEqual(list(org_client.iter_repos()), self.items)
+        self.assertIsNone(org_client._repos)
+        self.assertEqual(org_client.public_repos(),
+                         [item["name"] for item in self.items])
+
+    def test_partial_iteration_releases_connections(self):
+        """abandoning a streamed page leaves the pool usable"""
+        org_client = GithubOrgClient("big", max_workers=2, stream=True)
+        self.assertEqual(len(list(islice(org_client.iter_repos(), 5))), 5)
+        self.assertEqual(len(GithubOrgClient("big").repos()), 550)
+
+    def test_stopping_early_closes_fetched_pages(self):
+        """pages fetched ahead but never read release their responses"""
+        payloads = []
+
+        def recording_get_page(*args, **kwargs):
+            page = get_page(*args, **kwargs)
+            if not isinstance(page.payload, dict):  # the org's own payload
+                payloads.append(page.payload)
+            return page
+
+        org_client = GithubOrgClient("big", max_workers=2, stream=True)
+        with patch("client.get_page", side_effect=recording_get_page):
+            repos = org_client.iter_repos()
+            # Into the second page, with the following ones in flight
+            self.assertEqual(len(list(islice(repos, 105))), 105)
+            repos.close()
+        self.assertGreater(len(payloads), 2)
+        self.assertTrue(all(payload.closed for payload in payloads))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Tests for pagination helpers and paginated, concurrent repository
+fetching in GithubOrgClient, run against a local fake GitHub server.
+"""
+import threading
+import time
+import unittest
+from itertools import islice
+from unittest.mock import patch
+
+from parameterized import parameterized
+
+from client import GithubOrgClient
+from pagination import (RateLimitThrottle, parse_link_header,
+                        remaining_page_urls)
+from stub_server import StubServer
+
+
+class TestLinkHeader(unittest.TestCase):
+    """
+    Tests for Link header parsing and page URL construction.
+    """
+
+    @parameterized.expand([
+        (None, {}),
+        ('<https://x/r?page=2>; rel="next"', {"next": "https://x/r?page=2"}),
+        ('<https://x/r?page=2>; rel="next", <https://x/r?page=9>; rel="last"',
+         {"next": "https://x/r?page=2", "last": "https://x/r?page=9"}),
+    ])
+    def test_parse_link_header(self, value, expected):
+        """
+        Test that each rel maps to its URL.
+        """
+        self.assertEqual(parse_link_header(value), expected)
+
+    def test_remaining_page_urls(self):
+        """
+        Test that next..last expands into one URL per page.
+        """
+        links = {"next": "https://x/r?per_page=100&page=2",
+                 "last": "https://x/r?per_page=100&page=4"}
+        self.assertEqual(remaining_page_urls(links), [
+            "https://x/r?per_page=100&page=2",
+            "https://x/r?per_page=100&page=3",
+            "https://x/r?per_page=100&page=4",
+        ])
+        self.assertIsNone(remaining_page_urls({"next": links["next"]}))
+
+
+class TestRateLimitThrottle(unittest.TestCase):
+    """
+    Tests for RateLimitThrottle with a fake clock.
+    """
+
+    def setUp(self):
+        self.now = 1000.0
+        self.slept = []
+        self.throttle = RateLimitThrottle(clock=lambda: self.now,
+                                          sleep=self.slept.append)
+
+    def test_waits_until_reset_when_exhausted(self):
+        """
+        Test that wait() sleeps until X-RateLimit-Reset at zero remaining.
+        """
+        self.throttle.update({"X-RateLimit-Remaining": "0",
+                              "X-RateLimit-Reset": "1030"})
+        self.assertEqual(self.throttle.wait(), 30.0)
+        self.assertEqual(self.slept, [30.0])
+
+    def test_no_wait_with_quota_left(self):
+        """
+        Test that wait() returns immediately while quota remains.
+        """
+        self.throttle.update({"X-RateLimit-Remaining": "10",
+                              "X-RateLimit-Reset": "1030"})
+        self.assertEqual(self.throttle.wait(), 0.0)
+        self.assertEqual(self.slept, [])
+
+    def test_retry_after(self):
+        """
+        Test that Retry-After pauses for the given number of seconds.
+        """
+        self.throttle.update({"Retry-After": "5"})
+        self.assertEqual(self.throttle.wait(), 5.0)
+
+
+class TestPaginatedRepos(unittest.TestCase):
+    """
+    Integration tests for GithubOrgClient against a fake GitHub server
+    serving thousands of repositories.
+    """
+
+    REPO_COUNT = 2550
+
+    def setUp(self):
+        self.server = StubServer().start()
+        self.items = [{"name": f"repo-{i}", "license": None}
+                      for i in range(self.REPO_COUNT)]
+        self.server.add("/orgs/big",
+                        {"repos_url": self.server.url("/orgs/big/repos")})
+        self.pages = self.server.add_pages("/orgs/big/repos", self.items,
+                                           GithubOrgClient.PER_PAGE)
+        self.org_url = patch.object(GithubOrgClient, "ORG_URL",
+                                    self.server.base_url + "/orgs/{org}")
+        self.org_url.start()
+
+    def tearDown(self):
+        self.org_url.stop()
+        self.server.stop()
+
+    def test_public_repos_returns_every_page_in_order(self):
+        """
+        Test that all pages are fetched exactly once and kept in order.
+        """
+        names = GithubOrgClient("big").public_repos()
+        self.assertEqual(names, [item["name"] for item in self.items])
+        self.assertEqual(self.pages, 26)
+        # org + one request per page
+        self.assertEqual(self.server.count(), 1 + self.pages)
+
+    def test_pages_are_fetched_concurrently(self):
+        """
+        Test that more than one page request is in flight at a time.
+        """
+        active, peak, lock = [0], [0], threading.Lock()
+        real_fetch = GithubOrgClient._fetch_page
+
+        def slow_fetch(client, url):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.01)
+            try:
+                return real_fetch(client, url)
+            finally:
+                with lock:
+                    active[0] -= 1
+
+        with patch.object(GithubOrgClient, "_fetch_page", slow_fetch):
+            repos = GithubOrgClient("big", max_workers=4).repos()
+        self.assertEqual(len(repos), self.REPO_COUNT)
+        self.assertGreater(peak[0], 1)
+        self.assertLessEqual(peak[0], 4)
+
+    def test_partial_iteration_fetches_bounded_pages(self):
+        """
+        Test that consuming only the first repos does not fetch every page.
+        """
+        org_client = GithubOrgClient("big", max_workers=2)
+        first = list(islice(org_client.iter_repos(), 10))
+        self.assertEqual(len(first), 10)
+        self.assertLess(self.server.count(), 1 + self.pages)
+
+    def test_next_links_without_last(self):
+        """
+        Test that rel="next" alone is followed page by page.
+        """
+        base = "/orgs/big/repos?per_page=100"
+        self.server.add(base, self.items[:100], headers={
+            "Link": f'<{self.server.url(base + "&page=2")}>; rel="next"'})
+        self.server.add(base + "&page=2", self.items[100:150])
+        self.assertEqual(len(GithubOrgClient("big").repos()), 150)
+
+    def test_throttles_when_rate_limit_exhausted(self):
+        """
+        Test that a zero X-RateLimit-Remaining delays the next page.
+        """
+        slept = []
+        self.server.add_pages(
+            "/orgs/big/repos", self.items[:300], GithubOrgClient.PER_PAGE,
+            headers={"X-RateLimit-Remaining": "0",
+                     "X-RateLimit-Reset": str(time.time() + 60)})
+        throttle = RateLimitThrottle(sleep=slept.append)
+        GithubOrgClient("big", throttle=throttle).repos()
+        self.assertTrue(slept)
+        self.assertGreater(slept[0], 50)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Tests for RepoIndex and the indexed GithubOrgClient.public_repos filters.
+"""
+import random
+import string
+import unittest
+from unittest.mock import patch
+
+from parameterized import parameterized
+
+from client import GithubOrgClient
+from repo_index import RepoIndex
+
+LICENSES = ["mit", "apache-2.0", "gpl-3.0", None]
+
+
+def make_repos(count, seed=0):
+    """
+    Returns count repos with random names and licenses.
+    """
+    rng = random.Random(seed)
+    return [{
+        "name": "".join(rng.choice(string.ascii_lowercase + "-")
+                        for _ in range(rng.randint(3, 12))),
+        "license": ({"key": key} if (key := rng.choice(LICENSES)) else None),
+    } for _ in range(count)]
+
+
+class TestRepoIndex(unittest.TestCase):
+    """
+    Tests that indexed queries match a linear scan.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.repos = make_repos(5000)
+        cls.index = RepoIndex(cls.repos)
+
+    def scan(self, license=None, name_contains=None):
+        """
+        Returns the positions a linear scan would select.
+        """
+        return [i for i, repo in enumerate(self.repos)
+                if (license is None
+                    or GithubOrgClient.has_license(repo, license))
+                and (name_contains is None or name_contains in repo["name"])]
+
+    @parameterized.expand([
+        ("mit", None),
+        (None, "a"),
+        (None, "ab"),
+        (None, "abc"),
+        (None, "a-b"),
+        ("apache-2.0", "ba"),
+        ("gpl-3.0", "xyzq"),
+        (None, ""),
+        ("bsd", None),
+    ])
+    def test_query_matches_scan(self, license, name_contains):
+        """
+        Test license and substring filters against a linear scan.
+        """
+        self.assertEqual(self.index.query(license=license,
+                                          name_contains=name_contains),
+                         self.scan(license, name_contains))
+
+    def test_unlicensed(self):
+        """
+        Test that with_license(None) lists repos without a license.
+        """
+        self.assertEqual(
+            self.index.with_license(None),
+            [i for i, r in enumerate(self.repos) if r["license"] is None])
+
+
+class TestIndexedPublicRepos(unittest.TestCase):
+    """
+    Tests for public_repos(license=..., name_contains=...).
+    """
+
+    def setUp(self):
+        self.payloads = [
+            [{"name": "alx-backend", "license": {"key": "mit"}},
+             {"name": "holberton-system", "license": {"key": "apache-2.0"}},
+             {"name": "my-project", "license": None},
+             {"name": "another-alx-repo", "license": {"key": "mit"}}],
+            [{"name": "alx-new", "license": {"key": "mit"}}],
+        ]
+        patcher = patch.object(GithubOrgClient, "_fetch_repos",
+                               side_effect=lambda: iter(self.payloads.pop(0)))
+        self.fetch = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_filters(self):
+        """
+        Test that license and name filters combine.
+        """
+        org_client = GithubOrgClient("test_org")
+        self.assertEqual(org_client.public_repos(license="mit"),
+                         ["alx-backend", "another-alx-repo"])
+        self.assertEqual(org_client.public_repos(repo_filter="alx"),
+                         ["alx-backend", "another-alx-repo"])
+        self.assertEqual(org_client.public_repos(license="apache-2.0",
+                                                 name_contains="alx"), [])
+        self.assertEqual(self.fetch.call_count, 1)
+
+    def test_index_is_reused_and_invalidated(self):
+        """
+        Test that the index is built once and rebuilt after refresh().
+        """
+        org_client = GithubOrgClient("test_org")
+        index = org_client.repo_index()
+        self.assertIs(org_client.repo_index(), index)
+        org_client.refresh()
+        self.assertEqual(org_client.public_repos(license="mit"), ["alx-new"])
+        self.assertIsNot(org_client.repo_index(), index)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Tests for the pooled Transport used by get_json, run against a local
+stub HTTP server.
+"""
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+from client import GithubOrgClient, configure_transport, get_json
+from stub_server import StubServer
+from transport import Transport
+
+
+class TestTransport(unittest.TestCase):
+    """
+    Tests for connection reuse, retries and gzip.
+    """
+
+    def setUp(self):
+        self.server = StubServer(gzip=True).start()
+        self.server.add("/orgs/google", {"login": "google"})
+        self.transport = configure_transport(
+            Transport(pool_maxsize=4, backoff_factor=0.01, timeout=5))
+
+    def tearDown(self):
+        configure_transport(None)
+        self.server.stop()
+
+    def test_connection_is_reused(self):
+        """
+        Test that sequential get_json calls share one keep-alive connection.
+        """
+        url = self.server.url("/orgs/google")
+        for _ in range(10):
+            self.assertEqual(get_json(url), {"login": "google"})
+        self.assertEqual(self.transport.stats.snapshot(), {
+            "requests": 10, "connections_opened": 1, "connections_reused": 9,
+        })
+
+    def test_pool_bounds_connections_under_load(self):
+        """
+        Test that 200 concurrent requests open at most pool_maxsize
+        connections.
+        """
+        url = self.server.url("/orgs/google")
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            results = list(pool.map(lambda _: get_json(url), range(200)))
+        self.assertEqual(len(results), 200)
+        stats = self.transport.stats
+        self.assertLessEqual(stats.connections_opened, 4)
+        self.assertGreaterEqual(stats.connections_reused, 196)
+
+    def test_retries_5xx_and_429(self):
+        """
+        Test that 503 and 429 answers are retried with backoff.
+        """
+        self.server.fail_next("/orgs/google", 503, times=2)
+        self.server.fail_next("/orgs/google", 429, headers={"Retry-After": "0"})
+        self.assertEqual(get_json(self.server.url("/orgs/google")),
+                         {"login": "google"})
+        self.assertEqual(self.server.count("/orgs/google"), 4)
+
+    def test_gives_up_after_retries(self):
+        """
+        Test that the final error status is raised once retries run out.
+        """
+        self.server.fail_next("/orgs/google", 500, times=10)
+        with self.assertRaises(Exception):
+            get_json(self.server.url("/orgs/google"))
+        self.assertEqual(self.server.count("/orgs/google"), 4)
+
+    def test_gzip(self):
+        """
+        Test that gzip is requested and transparently decoded.
+        """
+        get_json(self.server.url("/orgs/google"))
+        _, _, headers = self.server.requests[-1]
+        self.assertIn("gzip", headers["Accept-Encoding"])
+
+    def test_injected_transport(self):
+        """
+        Test that GithubOrgClient sends every request over its transport.
+        """
+        self.server.add("/orgs/big",
+                        {"repos_url": self.server.url("/orgs/big/repos")})
+        self.server.add_pages("/orgs/big/repos",
+                              [{"name": f"r{i}"} for i in range(500)], 100)
+        with Transport() as transport, patch.object(
+                GithubOrgClient, "ORG_URL", self.server.base_url + "/orgs/{org}"):
+            repos = GithubOrgClient("big", transport=transport).repos()
+            self.assertEqual(len(repos), 500)
+            self.assertEqual(transport.stats.requests, 6)
+        self.assertEqual(self.transport.stats.requests, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,9 +1,15 @@
 #!/usr/bin/env python3
 """TestAccessNestedMap class"""
 
+import asyncio
+import threading
+import time
 import unittest
+from concurrent.futures import ThreadPoolExecutor
 from unittest.mock import patch, Mock
-from utils import access_nested_map, get_json, memoize
+from utils import (CacheInfo, PathSet, access_nested_map, async_memoize,
+                   compile_path, get_json, invalidate, lru_memoize, memoize,
+                   parse_path, ttl_memoize)
 from typing import Sequence, Mapping, Any, Callable
 from parameterized import parameterized
 
@@ -78,3 +84,305 @@ class TestMemoize(unittest.TestCase):
             # assert even if called twice returns came value
             self.assertEqual(foo_property_1, 42)
             self.assertEqual(foo_property_2, 42)
+
+
+class TestThreadSafeMemoize(unittest.TestCase):
+    """tests for the thread-safe and TTL memoize helpers"""
+
+    def test_memoize_computes_once_across_threads(self):
+        """concurrent first reads share a single computation"""
+        calls = []
+        barrier = threading.Barrier(8)
+
+        class TestClass:
+            """TestClass Implementation"""
+            @memoize
+            def a_property(self):
+                """slow property"""
+                calls.append(1)
+                time.sleep(0.05)
+                return 42
+
+        foo = TestClass()
+
+        def read(_):
+            barrier.wait()
+            return foo.a_property
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(read, range(8)))
+        self.assertEqual(results, [42] * 8)
+        self.assertEqual(len(calls), 1)
+
+    def test_memoize_is_per_instance_and_invalidates(self):
+        """each instance has its own value; invalidate drops it"""
+        class TestClass:
+            """TestClass Implementation"""
+            def __init__(self, value):
+                self.value = value
+
+            @memoize
+            def a_property(self):
+                """returns the current value"""
+                return self.value
+
+        foo, bar = TestClass(1), TestClass(2)
+        self.assertEqual((foo.a_property, bar.a_property), (1, 2))
+        foo.value = 3
+        self.assertEqual(foo.a_property, 1)
+        invalidate(foo, "a_property")
+        self.assertEqual(foo.a_property, 3)
+
+    def test_memoize_does_not_cache_exceptions(self):
+        """a failing computation is retried on the next access"""
+        outcomes = [ValueError("boom"), 42]
+
+        class TestClass:
+            """TestClass Implementation"""
+            @memoize
+            def a_property(self):
+                """fails once, then succeeds"""
+                outcome = outcomes.pop(0)
+                if isinstance(outcome, Exception):
+                    raise outcome
+                return outcome
+
+        foo = TestClass()
+        with self.assertRaises(ValueError):
+            foo.a_property
+        self.assertEqual(foo.a_property, 42)
+
+    def test_ttl_memoize_expires(self):
+        """the value is recomputed once the ttl has passed"""
+        class TestClass:
+            """TestClass Implementation"""
+            calls = 0
+
+            @ttl_memoize(10)
+            def a_property(self):
+                """counts its calls"""
+                TestClass.calls += 1
+                return TestClass.calls
+
+        foo = TestClass()
+        with patch("utils.time.monotonic", return_value=100.0) as clock:
+            self.assertEqual(foo.a_property, 1)
+            clock.return_value = 109.0
+            self.assertEqual(foo.a_property, 1)
+            clock.return_value = 110.0
+            self.assertEqual(foo.a_property, 2)
+
+
+class TestLruMemoize(unittest.TestCase):
+    """tests for the shared LRU memoizer"""
+
+    def test_hits_misses_and_eviction(self):
+        """least recently used entries are evicted and stats counted"""
+        calls = []
+
+        @lru_memoize(maxsize=2)
+        def square(x):
+            """squares x"""
+            calls.append(x)
+            return x * x
+
+        self.assertEqual([square(1), square(2), square(1)], [1, 4, 1])
+        square(3)  # evicts 2, the least recently used
+        square(2)
+        self.assertEqual(calls, [1, 2, 3, 2])
+        self.assertEqual(square.cache_info(), CacheInfo(1, 4, 2, 2))
+        square.cache_clear()
+        self.assertEqual(square.cache_info(), CacheInfo(0, 0, 2, 0))
+
+    def test_keyword_arguments_are_part_of_the_key(self):
+        """positional and keyword calls are cached separately"""
+        @lru_memoize()
+        def add(x, y=0):
+            """adds x and y"""
+            return x + y
+
+        self.assertEqual((add(1), add(1, y=2), add(1, y=2)), (1, 3, 3))
+        self.assertEqual(add.cache_info().misses, 2)
+
+    def test_concurrent_calls_compute_once(self):
+        """threads asking for the same key wait for one computation"""
+        calls = []
+        barrier = threading.Barrier(8)
+
+        @lru_memoize(maxsize=None)
+        def slow(x):
+            """slow identity"""
+            calls.append(x)
+            time.sleep(0.05)
+            return x
+
+        def call(_):
+            barrier.wait()
+            return slow("key")
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            self.assertEqual(list(pool.map(call, range(8))), ["key"] * 8)
+        self.assertEqual(calls, ["key"])
+        self.assertEqual(slow.cache_info(), CacheInfo(7, 1, None, 1))
+
+
+class TestAsyncMemoize(unittest.IsolatedAsyncioTestCase):
+    """tests for async_memoize"""
+
+    async def test_concurrent_awaits_share_one_call(self):
+        """callers awaiting at the same time share one computation"""
+        class TestClass:
+            """TestClass Implementation"""
+            calls = 0
+
+            @async_memoize
+            async def a_method(self):
+                """slow coroutine"""
+                TestClass.calls += 1
+                await asyncio.sleep(0.01)
+                return 42
+
+        foo = TestClass()
+        results = await asyncio.gather(*(foo.a_method() for _ in range(5)))
+        self.assertEqual(results, [42] * 5)
+        self.assertEqual(await foo.a_method(), 42)
+        self.assertEqual(TestClass.calls, 1)
+
+    async def test_failure_is_not_cached(self):
+        """a raised exception lets the next call try again"""
+        outcomes = [ValueError("boom"), 42]
+
+        class TestClass:
+            """TestClass Implementation"""
+            @async_memoize
+            async def a_method(self):
+                """fails once, then succeeds"""
+                outcome = outcomes.pop(0)
+                if isinstance(outcome, Exception):
+                    raise outcome
+                return outcome
+
+        foo = TestClass()
+        with self.assertRaises(ValueError):
+            await foo.a_method()
+        self.assertEqual(await foo.a_method(), 42)
+
+    async def test_cancelling_one_caller_keeps_the_others(self):
+        """the shared call survives one caller being cancelled"""
+        class TestClass:
+            """TestClass Implementation"""
+            @async_memoize
+            async def a_method(self):
+                """slow coroutine"""
+                await asyncio.sleep(0.02)
+                return 42
+
+        foo = TestClass()
+        first = asyncio.ensure_future(foo.a_method())
+        second = asyncio.ensure_future(foo.a_method())
+        await asyncio.sleep(0)
+        first.cancel()
+        self.assertEqual(await second, 42)
+        with self.assertRaises(asyncio.CancelledError):
+            await first
+
+
+class TestCompiledPaths(unittest.TestCase):
+    """tests for parse_path, compile_path and PathSet"""
+
+    DOC = {
+        "name": "repo",
+        "owner": {"login": "google", "id": 1},
+        "topics": ["a", "b"],
+        "repos": [
+            {"name": "x", "license": {"key": "mit"}, "tags": [1, 2]},
+            {"name": "y", "license": None, "tags": [3]},
+            {"name": "z", "license": {"key": "apache-2.0"}, "tags": []},
+        ],
+    }
+
+    @parameterized.expand([
+        ("owner.login", ("owner", "login")),
+        ("repos[0].name", ("repos", 0, "name")),
+        ("repos[-1].name", ("repos", -1, "name")),
+        ("repos[*].license.key", ("repos", "*", "license", "key")),
+        (("a", 0), ("a", 0)),
+        ("", ()),
+    ])
+    def test_parse_path(self, path, steps):
+        """string paths are split into keys, indices and wildcards"""
+        self.assertEqual(parse_path(path), steps)
+
+    @parameterized.expand([
+        ({"a": 1}, ("a",), 1),
+        ({"a": {"b": 2}}, ("a",), {"b": 2}),
+        ({"a": {"b": 2}}, ("a", "b"), 2),
+    ])
+    def test_matches_access_nested_map(self, nested_map, path, output):
+        """compiled getters agree with access_nested_map"""
+        self.assertEqual(compile_path(path)(nested_map), output)
+        self.assertEqual(compile_path(path)(nested_map),
+                         access_nested_map(nested_map, path))
+
+    @parameterized.expand([
+        ({}, ("a",)),
+        ({"a": 1}, ("a", "b")),
+        ({"a": "text"}, ("a", "b")),
+        ({"a": [1]}, ("a", "b")),
+        ({"a": [1]}, ("a", 3)),
+        ({"a": "text"}, ("a", 0)),
+    ])
+    def test_missing_path_raises_key_error(self, nested_map, path):
+        """missing keys, bad indices and scalars raise KeyError"""
+        with self.assertRaises(KeyError):
+            compile_path(path)(nested_map)
+
+    @parameterized.expand([
+        ("repos[1].name", "y"),
+        ("topics[-1]", "b"),
+        ("repos[*].name", ["x", "y", "z"]),
+        ("repos[*].license.key", ["mit", "apache-2.0"]),
+        ("repos[*].tags[*]", [1, 2, 3]),
+        ("owner.*", ["google", 1]),
+        ("missing[*]", KeyError),
+    ])
+    def test_indices_and_wildcards(self, path, expected):
+        """list indices and wildcards select the expected values"""
+        getter = compile_path(path)
+        if expected is KeyError:
+            with self.assertRaises(KeyError):
+                getter(self.DOC)
+        else:
+            self.assertEqual(getter(self.DOC), expected)
+
+    def test_path_set_extracts_in_one_pass(self):
+        """PathSet returns one value per path in order"""
+        fields = PathSet(["name", "owner.login", "owner.id",
+                          "repos[*].name", "repos[*].license.key",
+                          "repos[*].tags[*]", "repos[0].name"])
+        self.assertEqual(fields(self.DOC), (
+            "repo", "google", 1, ["x", "y", "z"], ["mit", "apache-2.0"],
+            [1, 2, 3], "x"))
+
+    def test_path_set_missing_paths(self):
+        """missing paths use the default or raise KeyError"""
+        self.assertEqual(PathSet(["name", "owner.email"], default=None)(
+            self.DOC), ("repo", None))
+        with self.assertRaises(KeyError):
+            PathSet(["name", "owner.email"])(self.DOC)
+
+    def test_path_set_does_not_revisit_shared_prefixes(self):
+        """a prefix shared by several paths is looked up once"""
+        lookups = []
+
+        class CountingDict(dict):
+            """dict recording every key lookup"""
+            def __getitem__(self, key):
+                lookups.append(key)
+                return super().__getitem__(key)
+
+        doc = CountingDict(repos=[{"name": "x", "id": 1},
+                                  {"name": "y", "id": 2}])
+        self.assertEqual(PathSet(["repos[*].name", "repos[*].id"])(doc),
+                         (["x", "y"], [1, 2]))
+        self.assertEqual(lookups, ["repos"])
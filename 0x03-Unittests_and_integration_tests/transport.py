@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+A pooled HTTP transport for get_json and GithubOrgClient.
+
+One requests.Session is shared by every call, so connections are kept
+alive and reused instead of paying a new TCP/TLS handshake per request.
+The transport applies timeouts, retries idempotent requests with
+exponential backoff on 429/5xx (honouring Retry-After), and counts how
+many connections were opened versus reused.
+"""
+import threading
+from typing import Dict, Iterable, Optional, Tuple, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+
+Timeout = Union[float, Tuple[float, float]]
+
+
+class TransportStats:
+    """
+    Thread-safe counters of connection checkouts and new connections.
+    """
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.connections_opened = 0
+
+    def record_checkout(self) -> None:
+        """
+        Counts one connection handed out for a request (incl. retries).
+        """
+        with self._lock:
+            self.requests += 1
+
+    def record_new_connection(self) -> None:
+        """
+        Counts one newly opened connection.
+        """
+        with self._lock:
+            self.connections_opened += 1
+
+    @property
+    def connections_reused(self) -> int:
+        """
+        Returns how many requests went over an already open connection.
+        """
+        with self._lock:
+            return self.requests - self.connections_opened
+
+    def snapshot(self) -> Dict[str, int]:
+        """
+        Returns the counters as a dict.
+        """
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "connections_opened": self.connections_opened,
+                "connections_reused": self.requests - self.connections_opened,
+            }
+
+
+class CountingHTTPAdapter(HTTPAdapter):
+    """
+    HTTPAdapter whose connection pools report to a TransportStats.
+    """
+    def __init__(self, stats: TransportStats, **kwargs) -> None:
+        self.stats = stats
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs) -> None:
+        super().init_poolmanager(*args, **kwargs)
+        stats = self.stats
+
+        class CountingMixin:
+            def _get_conn(self, timeout=None):
+                stats.record_checkout()
+                return super()._get_conn(timeout)
+
+            def _new_conn(self):
+                stats.record_new_connection()
+                return super()._new_conn()
+
+        class CountingHTTPConnectionPool(CountingMixin, HTTPConnectionPool):
+            pass
+
+        class CountingHTTPSConnectionPool(CountingMixin, HTTPSConnectionPool):
+            pass
+
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": CountingHTTPConnectionPool,
+            "https": CountingHTTPSConnectionPool,
+        }
+
+
+class Transport:
+    """
+    Shared, pooled HTTP session with timeouts and retries.
+
+    Args:
+        pool_connections: Number of per-host pools to keep.
+        pool_maxsize: Connections kept alive per host; set it to at least
+            the number of threads issuing requests concurrently.
+        timeout: Seconds, or a (connect, read) tuple, for every request.
+        retries: Retries for connection errors and retry_statuses.
+        backoff_factor: Sleep backoff_factor * 2 ** (retry - 1) between
+            retries, unless the server sends Retry-After.
+        retry_statuses: Status codes that are retried.
+    """
+    def __init__(self, pool_connections: int = 10, pool_maxsize: int = 10,
+                 timeout: Timeout = (3.05, 30), retries: int = 3,
+                 backoff_factor: float = 0.5,
+                 retry_statuses: Iterable[int] = (429, 500, 502, 503, 504)
+                 ) -> None:
+        self.timeout = timeout
+        self.stats = TransportStats()
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=frozenset(retry_statuses),
+            allowed_methods=frozenset({"GET", "HEAD"}),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = CountingHTTPAdapter(self.stats,
+                                      pool_connections=pool_connections,
+                                      pool_maxsize=pool_maxsize,
+                                      max_retries=retry)
+        self.session = requests.Session()
+        # requests already asks for and decodes gzip; state it explicitly
+        self.session.headers["Accept-Encoding"] = "gzip, deflate"
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def get(self, url: str, headers: Optional[Dict[str, str]] = None,
+            stream: bool = False) -> requests.Response:
+        """
+        Sends a GET request over the shared session. With stream=True the
+        body is left unread; the caller must consume or close the response
+        to return the connection to the pool.
+        """
+        return self.session.get(url, headers=headers, timeout=self.timeout,
+                                stream=stream)
+
+    def close(self) -> None:
+        """
+        Closes every pooled connection.
+        """
+        self.session.close()
+
+    def __enter__(self) -> "Transport":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
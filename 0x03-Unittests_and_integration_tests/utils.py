@@ -0,0 +1,511 @@
+#!/usr/bin/env python3
+"""Generic utilities for github org client.
+"""
+import asyncio
+import re
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from functools import wraps
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Hashable,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+import requests
+
+__all__ = [
+    "access_nested_map",
+    "WILDCARD",
+    "parse_path",
+    "compile_path",
+    "PathSet",
+    "get_json",
+    "memoize",
+    "ttl_memoize",
+    "memoize_method",
+    "async_memoize",
+    "lru_memoize",
+    "invalidate",
+    "CacheInfo",
+]
+
+
+def access_nested_map(nested_map: Mapping, path: Sequence) -> Any:
+    """Access nested map with key path.
+    Parameters
+    ----------
+    nested_map: Mapping
+        A nested map
+    path: Sequence
+        a sequence of key representing a path to the value
+    Example
+    -------
+    >>> nested_map = {"a": {"b": {"c": 1}}}
+    >>> access_nested_map(nested_map, ["a", "b", "c"])
+    1
+    """
+    for key in path:
+        if not isinstance(nested_map, Mapping):
+            raise KeyError(key)
+        nested_map = nested_map[key]
+
+    return nested_map
+
+
+WILDCARD = "*"
+_PATH_TOKEN = re.compile(r"\[(\*|-?\d+)\]|([^.\[\]]+)")
+_MISSING = object()
+_LEAVES = object()
+_SPREAD = object()
+
+Path = Union[str, Sequence[Hashable]]
+
+
+def parse_path(path: Path) -> Tuple[Hashable, ...]:
+    """Parse a path into a tuple of steps.
+    A string path uses dots between keys and brackets for list indices
+    or wildcards, e.g. "owner.login" or "repos[*].license.key". Any other
+    sequence is taken as the steps themselves; an int step indexes a list
+    and a "*" step matches every element of a list or value of a mapping.
+    """
+    if not isinstance(path, str):
+        return tuple(path)
+    steps: List[Hashable] = []
+    for index, key in _PATH_TOKEN.findall(path):
+        if key:
+            steps.append(key)
+        else:
+            steps.append(WILDCARD if index == WILDCARD else int(index))
+    return tuple(steps)
+
+
+def _step(node: Any, key: Hashable) -> Any:
+    if isinstance(node, Mapping):
+        return node[key]
+    if isinstance(key, int) and isinstance(node, (list, tuple)):
+        try:
+            return node[key]
+        except IndexError:
+            raise KeyError(key) from None
+    raise KeyError(key)
+
+
+def _elements(node: Any) -> Iterable:
+    if isinstance(node, Mapping):
+        return node.values()
+    if isinstance(node, (list, tuple)):
+        return node
+    raise KeyError(WILDCARD)
+
+
+def _resolve(node: Any, steps: Tuple[Hashable, ...], start: int = 0) -> Any:
+    """Walk `steps` from position `start`. A wildcard returns the list of
+    matches (flattened across nested wildcards), skipping elements where
+    the rest of the path is missing.
+    """
+    for position in range(start, len(steps)):
+        key = steps[position]
+        if key == WILDCARD:
+            nested = WILDCARD in steps[position + 1:]
+            matches = []
+            for element in _elements(node):
+                try:
+                    value = _resolve(element, steps, position + 1)
+                except KeyError:
+                    continue
+                if nested:
+                    matches.extend(value)
+                else:
+                    matches.append(value)
+            return matches
+        node = _step(node, key)
+    return node
+
+
+def _chain(steps: Tuple[Hashable, ...]) -> Callable[[Any], Any]:
+    """Plain subscription chain for short wildcard-free paths."""
+    if len(steps) == 1:
+        k0, = steps
+        return lambda doc: doc[k0]
+    if len(steps) == 2:
+        k0, k1 = steps
+        return lambda doc: doc[k0][k1]
+    if len(steps) == 3:
+        k0, k1, k2 = steps
+        return lambda doc: doc[k0][k1][k2]
+    if len(steps) == 4:
+        k0, k1, k2, k3 = steps
+        return lambda doc: doc[k0][k1][k2][k3]
+
+    def chain(doc):
+        for key in steps:
+            doc = doc[key]
+        return doc
+    return chain
+
+
+def compile_path(path: Path) -> Callable[[Any], Any]:
+    """Compile a path into a getter for repeated lookups.
+    Example
+    -------
+    >>> login = compile_path("owner.login")
+    >>> login({"owner": {"login": "google"}})
+    'google'
+    >>> compile_path("repos[*].name")({"repos": [{"name": "a"}, {}]})
+    ['a']
+
+    Without wildcards the getter behaves like access_nested_map (plus list
+    indices) and raises KeyError for a missing key; with wildcards it
+    returns the list of matches.
+    """
+    steps = parse_path(path)
+    if not steps:
+        return lambda doc: doc
+    if WILDCARD in steps or not all(isinstance(k, str) for k in steps):
+        # Checked walk: a bare subscription would index into strings
+        return lambda doc: _resolve(doc, steps)
+    fast = _chain(steps)
+
+    def getter(doc: Any) -> Any:
+        try:
+            return fast(doc)
+        except (KeyError, IndexError, TypeError):
+            # Let the checked walk decide and raise a proper KeyError
+            return _resolve(doc, steps)
+    return getter
+
+
+Collector = Callable[[Any, Dict[int, Any]], None]
+
+
+def _compile_trie(trie: Dict[Any, Any]) -> Collector:
+    """Turn a PathSet trie node into a function storing, for each path
+    ending below it, the value found under `node` into found[index].
+    """
+    ops: List[Collector] = []
+    for key, child in trie.items():
+        if key is _SPREAD:
+            continue
+        if key is _LEAVES:
+            ops.append(_leaf_op(child))
+        elif key == WILDCARD:
+            ops.append(_spread_op(child[_SPREAD], _compile_trie(child)))
+        else:
+            ops.append(_key_op(key, _compile_trie(child)))
+    if len(ops) == 1:
+        return ops[0]
+
+    def collect(node, found):
+        for op in ops:
+            op(node, found)
+    return collect
+
+
+def _leaf_op(indices: List[int]) -> Collector:
+    def leaf(node, found):
+        for index in indices:
+            found[index] = node
+    return leaf
+
+
+def _key_op(key: Hashable, collect: Collector) -> Collector:
+    def step(node, found):
+        if type(node) is dict:
+            value = node.get(key, _MISSING)
+            if value is not _MISSING:
+                collect(value, found)
+            return
+        try:
+            value = _step(node, key)
+        except KeyError:
+            return
+        collect(value, found)
+    return step
+
+
+def _spread_op(spread: Dict[int, bool], collect: Collector) -> Collector:
+    def each(node, found):
+        try:
+            elements = _elements(node)
+        except KeyError:
+            return
+        matches: Dict[int, list] = {index: [] for index in spread}
+        for element in elements:
+            partial: Dict[int, Any] = {}
+            collect(element, partial)
+            for index, value in partial.items():
+                if spread[index]:
+                    matches[index].extend(value)
+                else:
+                    matches[index].append(value)
+        found.update(matches)
+    return each
+
+
+class PathSet:
+    """Several paths extracted together in one pass over a document.
+    Paths sharing a prefix walk it only once, so a wildcard shared by
+    several paths iterates its list a single time. Calling the set returns a
+    tuple with one value per path, in order; a missing path yields
+    `default`, or raises KeyError(path) when no default was given.
+
+    >>> fields = PathSet(["name", "owner.login", "topics[*]"])
+    >>> fields({"name": "x", "owner": {"login": "y"}, "topics": ["a"]})
+    ('x', 'y', ['a'])
+    """
+    def __init__(self, paths: Iterable[Path], default: Any = _MISSING):
+        self.paths = list(paths)
+        self.default = default
+        self._root: Dict[Any, Any] = {}
+        for index, path in enumerate(self.paths):
+            steps = parse_path(path)
+            node = self._root
+            for position, key in enumerate(steps):
+                node = node.setdefault(key, {})
+                if key == WILDCARD:
+                    nested = WILDCARD in steps[position + 1:]
+                    node.setdefault(_SPREAD, {})[index] = nested
+            node.setdefault(_LEAVES, []).append(index)
+        self._collect = _compile_trie(self._root)
+        # Without wildcards per-path getters beat the generic trie walk;
+        # the trie still handles documents with missing paths
+        self._getters = None
+        if not any(WILDCARD in parse_path(path) for path in self.paths):
+            self._getters = [compile_path(path) for path in self.paths]
+
+    def __call__(self, doc: Any) -> Tuple[Any, ...]:
+        if self._getters is not None:
+            try:
+                return tuple([get(doc) for get in self._getters])
+            except KeyError:
+                pass
+        found: Dict[int, Any] = {}
+        self._collect(doc, found)
+        if len(found) == len(self.paths):
+            return tuple(found[index] for index in range(len(self.paths)))
+        values = []
+        for index, path in enumerate(self.paths):
+            if index in found:
+                values.append(found[index])
+            elif self.default is _MISSING:
+                raise KeyError(path)
+            else:
+                values.append(self.default)
+        return tuple(values)
+
+
+def get_json(url: str) -> Dict:
+    """Get JSON from remote URL.
+    """
+    response = requests.get(url)
+    return response.json()
+
+
+def _memo_attr(name: str) -> str:
+    return f"_memoized_{name}"
+
+
+def invalidate(obj: Any, name: str) -> None:
+    """Drop the value memoized for `obj.<name>` so the next access
+    computes it again. Works for every per-instance decorator below.
+    """
+    obj.__dict__.pop(_memo_attr(name), None)
+
+
+def _expiry(ttl: Optional[float]) -> Optional[float]:
+    return None if ttl is None else time.monotonic() + ttl
+
+
+def _fresh(entry: Optional[Tuple[Any, Optional[float]]]) -> bool:
+    return entry is not None and (entry[1] is None
+                                  or time.monotonic() < entry[1])
+
+
+def memoize_method(fn: Callable = None, *,
+                   ttl: Optional[float] = None) -> Callable:
+    """Decorator for a method taking only `self`: the result is computed
+    once per instance and then reused (for `ttl` seconds, if given).
+
+    Thread-safe: concurrent first calls on the same instance run `fn`
+    exactly once; the others block until the value is ready. Exceptions
+    are not cached.
+    """
+    def decorator(fn: Callable) -> Callable:
+        attr = _memo_attr(fn.__name__)
+        lock_attr = attr + "_lock"
+
+        @wraps(fn)
+        def memoized(self):
+            entry = self.__dict__.get(attr)
+            if _fresh(entry):
+                return entry[0]
+            # dict.setdefault is atomic, so every thread gets the same lock
+            lock = self.__dict__.setdefault(lock_attr, threading.Lock())
+            with lock:
+                entry = self.__dict__.get(attr)
+                if _fresh(entry):
+                    return entry[0]
+                value = fn(self)
+                self.__dict__[attr] = (value, _expiry(ttl))
+                return value
+
+        return memoized
+
+    return decorator(fn) if fn is not None else decorator
+
+
+def memoize(fn: Callable) -> Callable:
+    """Decorator to memoize a method.
+    Example
+    -------
+    class MyClass:
+        @memoize
+        def a_method(self):
+            print("a_method called")
+            return 42
+    >>> my_object = MyClass()
+    >>> my_object.a_method
+    a_method called
+    42
+    >>> my_object.a_method
+    42
+
+    The value is cached per instance and computed once even when several
+    threads read the property at the same time.
+    """
+    return property(memoize_method(fn))
+
+
+def ttl_memoize(ttl: float) -> Callable[[Callable], property]:
+    """Like memoize, but the cached value expires after `ttl` seconds.
+    """
+    def decorator(fn: Callable) -> property:
+        return property(memoize_method(fn, ttl=ttl))
+    return decorator
+
+
+def async_memoize(fn: Callable = None, *,
+                  ttl: Optional[float] = None) -> Callable:
+    """Decorator for a coroutine method taking only `self`: the result is
+    awaited once per instance and shared by every caller, including
+    callers that arrive while the first call is still running. A failed
+    call is not cached. Cancelling one caller leaves the computation
+    running for the others; it is cancelled once every caller is gone.
+    """
+    def decorator(fn: Callable) -> Callable:
+        attr = _memo_attr(fn.__name__)
+
+        @wraps(fn)
+        async def memoized(self):
+            entry = self.__dict__.get(attr)
+            if not _fresh(entry):
+                # [future, expires_at, number of callers awaiting it]
+                entry = [asyncio.ensure_future(fn(self)), _expiry(ttl), 0]
+                self.__dict__[attr] = entry
+            future = entry[0]
+            entry[2] += 1
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if entry[2] == 1 and not future.done():
+                    future.cancel()
+                    if self.__dict__.get(attr) is entry:
+                        del self.__dict__[attr]
+                raise
+            except Exception:
+                if self.__dict__.get(attr) is entry:
+                    del self.__dict__[attr]
+                raise
+            finally:
+                entry[2] -= 1
+
+        return memoized
+
+    return decorator(fn) if fn is not None else decorator
+
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "maxsize", "currsize"])
+
+
+def _make_key(args: tuple, kwargs: dict) -> Hashable:
+    if not kwargs:
+        return args
+    return args + (object,) + tuple(sorted(kwargs.items()))
+
+
+def lru_memoize(maxsize: Optional[int] = 128,
+                ttl: Optional[float] = None) -> Callable:
+    """Decorator caching a function's results, shared by every caller,
+    keyed by its (hashable) arguments. Keeps at most `maxsize` entries,
+    evicting the least recently used (unbounded when None), and entries
+    expire after `ttl` seconds if given.
+
+    Concurrent calls with the same arguments compute the value once.
+    The wrapper exposes cache_info() -> CacheInfo(hits, misses, maxsize,
+    currsize) and cache_clear().
+    """
+    def decorator(fn: Callable) -> Callable:
+        cache: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        inflight: Dict[Hashable, threading.Event] = {}
+        lock = threading.Lock()
+        stats = {"hits": 0, "misses": 0}
+
+        @wraps(fn)
+        def memoized(*args, **kwargs):
+            key = _make_key(args, kwargs)
+            while True:
+                with lock:
+                    entry = cache.get(key)
+                    if _fresh(entry):
+                        cache.move_to_end(key)
+                        stats["hits"] += 1
+                        return entry[0]
+                    event = inflight.get(key)
+                    if event is None:
+                        stats["misses"] += 1
+                        event = inflight[key] = threading.Event()
+                        break
+                # Another thread is computing this key; wait and re-check
+                event.wait()
+
+            try:
+                value = fn(*args, **kwargs)
+            except BaseException:
+                with lock:
+                    del inflight[key]
+                event.set()
+                raise
+            with lock:
+                cache[key] = (value, _expiry(ttl))
+                cache.move_to_end(key)
+                if maxsize is not None and len(cache) > maxsize:
+                    cache.popitem(last=False)
+                del inflight[key]
+            event.set()
+            return value
+
+        def cache_info() -> CacheInfo:
+            with lock:
+                return CacheInfo(stats["hits"], stats["misses"], maxsize,
+                                 len(cache))
+
+        def cache_clear() -> None:
+            with lock:
+                cache.clear()
+                stats["hits"] = stats["misses"] = 0
+
+        memoized.cache_info = cache_info
+        memoized.cache_clear = cache_clear
+        return memoized
+
+    return decorator
@@ -1,3 +1,36 @@
 from django.contrib import admin
 
+from . import tasks
+from .models import ArchivedMessage, Job
+
 # Register your models here.
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    """
+    The background job queue (chats.tasks), mainly to inspect and retry dead jobs.
+    """
+    list_display = ('id', 'name', 'status', 'attempts', 'run_at', 'created_at')
+    list_filter = ('status', 'name')
+    readonly_fields = ('last_error',)
+    actions = ['requeue']
+
+    @admin.action(description='Queue the selected dead jobs again')
+    def requeue(self, request, queryset):
+        self.message_user(request, f'{tasks.requeue_dead(queryset)} jobs queued again.')
+
+
+@admin.register(ArchivedMessage)
+class ArchivedMessageAdmin(admin.ModelAdmin):
+    """
+    Messages moved out of the hot table by chats.archive, read-only.
+    """
+    list_display = ('message_id', 'conversation', 'sender', 'sent_at', 'archived_at')
+    list_select_related = ('conversation', 'sender')
+    raw_id_fields = ('conversation', 'sender')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,19 @@
+# messaging_app/chats/apps.py
+from django.apps import AppConfig
+
+class ChatsConfig(AppConfig):
+    """
+    AppConfig for the chats application.
+    Connects the signals and registers the archiving task when the app is ready.
+    """
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'chats'
+
+    def ready(self):
+        """
+        Import signals here to ensure they are connected
+        when the Django application starts, and chats.archive so that
+        worker processes know its task.
+        """
+        import chats.signals
+        import chats.archive
@@ -0,0 +1,117 @@
+# messaging_app/chats/archive.py
+"""
+Moves old messages out of the hot chats_message table into chats_message_archive
+(chats.models.ArchivedMessage), so that queries over recent history work on a table
+whose size follows the traffic of the last CHATS_ARCHIVE_AFTER_DAYS days rather than
+the age of the service.
+
+Archiving runs as background jobs (chats.tasks): each 'chats.archive_messages' job
+moves the oldest `batch_size` messages sent before the cutoff, copy and delete in one
+transaction, and queues the next batch until none are left. schedule() starts a run;
+`python manage.py chats_archive` calls it (or archives inline with --sync), e.g. from
+a daily cron.
+
+A conversation's last message is never archived, so the inbox columns stay intact;
+message_count and unread counters still count archived messages. The nested messages
+list reads archived history through MessageCursorPagination, which merges both tables
+in (sent_at, message_id) order and only queries the archive for pages that can reach
+it (see high_water()). Archived messages are no longer found by search, are not
+returned by the message detail route, and cannot be edited or deleted through the API.
+
+Readers rely on CHATS_ARCHIVE_AFTER_DAYS as the minimum age of archived messages, so
+every process must use the same value, and archiving refuses later cutoffs.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import tasks
+from .models import ArchivedMessage, Conversation, Message
+
+# Age in days after which messages are archived, and messages moved per job
+ARCHIVE_AFTER_DAYS = getattr(settings, 'CHATS_ARCHIVE_AFTER_DAYS', 365)
+BATCH_SIZE = getattr(settings, 'CHATS_ARCHIVE_BATCH_SIZE', 1000)
+
+COLUMNS = ('message_id', 'conversation_id', 'sender_id', 'message_body', 'sent_at')
+
+
+def default_cutoff():
+    return timezone.now() - timedelta(days=ARCHIVE_AFTER_DAYS)
+
+
+def high_water():
+    """
+    A bound on the sent_at of archived messages: pages whose rows are all later than
+    this cannot include archived ones. It is the default cutoff, which archive_batch()
+    never goes past, so it holds in every process without any shared state and only
+    moves forward with time.
+    """
+    return default_cutoff()
+
+
+def check_cutoff(cutoff):
+    """
+    Raises ValueError for a cutoff later than high_water(), which readers rely on.
+    """
+    if cutoff > high_water():
+        raise ValueError(f'Messages younger than {ARCHIVE_AFTER_DAYS} days (CHATS_ARCHIVE_AFTER_DAYS) are not archived')
+
+
+def archive_batch(cutoff, batch_size=BATCH_SIZE):
+    """
+    Moves up to `batch_size` of the oldest messages sent before `cutoff` to the archive.
+    Returns how many were moved.
+    """
+    check_cutoff(cutoff)
+    with transaction.atomic():
+        last_messages = Conversation.objects.filter(last_message__isnull=False).values('last_message')
+        batch = list(
+            Message.objects.filter(sent_at__lt=cutoff).exclude(pk__in=last_messages).order_by('sent_at', 'message_id')
+            .values_list(*COLUMNS)[:batch_size]
+        )
+        if not batch:
+            return 0
+        now = timezone.now()
+        ArchivedMessage.objects.bulk_create(
+            [ArchivedMessage(**dict(zip(COLUMNS, row)), archived_at=now) for row in batch], batch_size=500,
+        )
+        # The delete trigger also drops them from the search index (migration 0004)
+        Message.objects.filter(pk__in=[row[0] for row in batch]).delete()
+    return len(batch)
+
+
+def archive(cutoff=None, batch_size=BATCH_SIZE):
+    """
+    Archives every message sent before `cutoff` in this thread, batch by batch.
+    Returns how many were moved.
+    """
+    cutoff = cutoff or default_cutoff()
+    total = 0
+    while True:
+        moved = archive_batch(cutoff, batch_size)
+        total += moved
+        if moved < batch_size:
+            return total
+
+
+def schedule(cutoff=None, batch_size=BATCH_SIZE):
+    """
+    Queues a background archiving run for the messages sent before `cutoff`.
+    """
+    cutoff = cutoff or default_cutoff()
+    check_cutoff(cutoff)
+    return tasks.enqueue('chats.archive_messages', {
+        'cutoff': cutoff.isoformat(), 'batch_size': batch_size,
+    })
+
+
+@tasks.register('chats.archive_messages')
+def archive_messages(payload):
+    """
+    Moves one batch, then queues the next one if there may be more.
+    """
+    if archive_batch(parse_datetime(payload['cutoff']), payload['batch_size']) == payload['batch_size']:
+        tasks.enqueue('chats.archive_messages', payload)
@@ -1,6 +1,208 @@
-# This file is intentionally left blank.
-#
-# It is created to follow the specified file structure.
-# Custom authentication logic, if needed in the future, can be placed here.
-# For this implementation, we are using the default JWTAuthentication class
-# from djangorestframework-simplejwt, which is configured in settings.py.
+# messaging_app/chats/auth.py
+"""
+JWT authentication with the token -> user resolution cached.
+
+simplejwt's JWTAuthentication verifies the token (signature and expiry, no database
+access) and then loads the user with a query on every request. CachedJWTAuthentication
+still verifies every token, but remembers which user a verified token resolved to,
+until the token expires, in two layers:
+- a bounded in-process LRU (CHATS_AUTH_CACHE_SIZE entries), checked first. Its
+  entries are kept at most CHATS_AUTH_LOCAL_TIMEOUT seconds, which bounds how long
+  another process's invalidation takes to reach this one;
+- the Django cache named by CHATS_AUTH_CACHE ('default'; None for the LRU only),
+  shared by every worker when it is Redis (see settings.CACHES).
+
+Only resolutions that passed JWTAuthentication.get_user()'s checks (the user exists
+and is active) are cached. Saving or deleting a user, deactivation included, drops
+their entries through invalidate_user() (chats/signals.py); code that changes users
+with QuerySet.update() must call it itself. In the shared cache, entries are
+invalidated by bumping a per-user generation, as chats.list_cache does with versions.
+
+The shared cache only keeps the primary key and USER_FIELDS of each user, never the
+password hash; users read from it have their other fields deferred.
+"""
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import router, transaction
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+
+# Most token resolutions kept in each process
+CACHE_SIZE = getattr(settings, 'CHATS_AUTH_CACHE_SIZE', 10000)
+# Seconds an in-process entry is trusted before the shared cache is asked again
+LOCAL_TIMEOUT = getattr(settings, 'CHATS_AUTH_LOCAL_TIMEOUT', 30)
+# Alias of the shared cache, or None to cache in process only
+SHARED_CACHE = getattr(settings, 'CHATS_AUTH_CACHE', 'default')
+
+PREFIX = 'chats:auth'
+
+# User fields kept in the shared cache, besides the primary key: what authentication
+# and permission checks read
+USER_FIELDS = ('username', 'is_active', 'is_staff', 'is_superuser')
+
+
+class LocalCache:
+    """
+    Thread-safe LRU of token key -> (user_id, user, expires_at), indexed by user so
+    that a user's entries can be dropped together.
+    """
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._by_user = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[2] <= time.time():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, user_id, user, expires_at):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (user_id, user, expires_at)
+            self._by_user.setdefault(user_id, set()).add(key)
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+
+    def delete_user(self, user_id):
+        with self._lock:
+            for key in list(self._by_user.get(user_id, ())):
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_user.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _remove(self, key):
+        user_id = self._entries.pop(key)[0]
+        keys = self._by_user.get(user_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_user[user_id]
+
+
+local_cache = LocalCache(CACHE_SIZE)
+
+
+def _shared():
+    return caches[SHARED_CACHE] if SHARED_CACHE else None
+
+
+def generation_key(user_id):
+    return f'{PREFIX}:generation:{user_id}'
+
+
+def entry_key(user_id, token_key):
+    return f'{PREFIX}:token:{user_id}:{token_key}'
+
+
+def dump_user(user):
+    """
+    The shared cache's copy of a user: its primary key and USER_FIELDS.
+    """
+    return {'pk': user.pk, **{name: getattr(user, name) for name in USER_FIELDS}}
+
+
+def load_user(fields):
+    """
+    A user instance from dump_user()'s copy, as if loaded with only those fields, so
+    the others are loaded from the database if read and save() only writes these.
+    """
+    model = get_user_model()
+    values = {model._meta.pk.attname: fields['pk'], **{name: fields[name] for name in USER_FIELDS}}
+    names = [field.attname for field in model._meta.concrete_fields if field.attname in values]
+    return model.from_db(router.db_for_read(model), names, [values[name] for name in names])
+
+
+def token_key(validated_token):
+    """
+    Identifies the token: its jti claim, or a hash of the encoded token without one.
+    """
+    jti = validated_token.get(api_settings.JTI_CLAIM)
+    if jti:
+        return str(jti)
+    token = validated_token.token
+    return hashlib.sha256(token if isinstance(token, bytes) else str(token).encode()).hexdigest()
+
+
+def _bump(user_ids):
+    shared = _shared()
+    for user_id in user_ids:
+        local_cache.delete_user(str(user_id))
+        if shared is not None:
+            # A fresh generation never matches an entry cached under an older one
+            shared.set(generation_key(user_id), time.time_ns(), None)
+
+
+def invalidate_user(*user_ids):
+    """
+    Forgets every cached token resolution of the given users, in this process and in
+    the shared cache. Inside a transaction it is repeated on commit, so a resolution
+    cached from the old row before the commit does not outlive it.
+    """
+    user_ids = {str(user_id) for user_id in user_ids}
+    if not user_ids:
+        return
+    _bump(user_ids)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: _bump(user_ids))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that loads each token's user once per token lifetime
+    instead of once per request.
+    """
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        expires_at = validated_token.get('exp')
+        if user_id is None or expires_at is None:
+            return super().get_user(validated_token)
+        user_id = str(user_id)
+        key = entry_key(user_id, token_key(validated_token))
+        now = time.time()
+
+        # Copies, so nothing a request sets on its user leaks into the next one
+        user = local_cache.get(key)
+        if user is not None:
+            return copy.copy(user)
+
+        shared = _shared()
+        if shared is not None:
+            values = shared.get_many([key, generation_key(user_id)])
+            entry, generation = values.get(key), values.get(generation_key(user_id))
+            if entry is not None and generation is not None and entry[0] == generation:
+                user = load_user(entry[1])
+                local_cache.set(key, user_id, user, min(expires_at, now + LOCAL_TIMEOUT))
+                return copy.copy(user)
+
+        user = super().get_user(validated_token)
+
+        if shared is not None:
+            if generation is None:
+                shared.add(generation_key(user_id), time.time_ns(), None)
+                generation = shared.get(generation_key(user_id))
+            shared.set(key, (generation, dump_user(user)), max(int(expires_at - now), 1))
+        # Without a shared cache, invalidation only ever happens in this process's LRU
+        local_cache.set(key, user_id, user, expires_at if shared is None else min(expires_at, now + LOCAL_TIMEOUT))
+        return copy.copy(user)
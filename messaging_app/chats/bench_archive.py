@@ -0,0 +1,104 @@
+# messaging_app/chats/bench_archive.py
+"""
+Archiving benchmark:
+
+    python manage.py shell -c "from chats.bench_archive import main; main()"
+
+For each total volume, inside a transaction that is rolled back afterwards, seeds
+that many messages across `conversations` conversations, `per_year` messages a year,
+so that larger volumes stand for older services with the same traffic. Then times,
+before and after chats.archive has moved the messages older than a year out of the
+hot table:
+- the newest page of one conversation (MessageViewSet list, counts cached), and the
+  page of its history from 500 days ago, read from the archive once archived;
+- a full scan of the hot table (an unindexed filter on message_body), standing in for
+  every query, report or maintenance job whose cost follows the table's size.
+Prints the hot table's row count and the median of `repeat` runs of each.
+"""
+import gc
+import statistics
+import time
+import uuid
+from datetime import timedelta
+
+from django.db import transaction
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from . import archive
+from .bench_pagination import Rollback, time_request
+from .models import User, Conversation, Message
+from .pagination import encode_position
+from .views import MessageViewSet
+
+
+def seed(volume, per_year, conversations, batch_size=10000):
+    """
+    Creates a user in `conversations` conversations and `volume` messages among them,
+    `per_year` a year at a steady rate up to now: a service with more history is one
+    that has been running for longer.
+    """
+    user = User.objects.create_user(username='bench-archive', password='password123')
+    chats = Conversation.objects.bulk_create([Conversation(name=f'Archive benchmark {i}') for i in range(conversations)])
+    for chat in chats:
+        chat.participants.add(user)
+    now = timezone.now()
+    interval = timedelta(days=365) / per_year
+    for start in range(0, volume, batch_size):
+        messages = Message.objects.bulk_create([
+            Message(conversation=chats[i % conversations], sender=user, message_body=f'Message {i}')
+            for i in range(start, min(start + batch_size, volume))
+        ])
+        # sent_at is auto_now_add, so spread the timestamps out afterwards
+        for i, message in enumerate(messages, start):
+            message.sent_at = now - interval * (volume - i)
+        Message.objects.bulk_update(messages, ['sent_at'], batch_size=batch_size)
+    return user, chats[0]
+
+
+def timed(repeat, func):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def measure(view, user, conversation, repeat):
+    """
+    Median seconds of the newest page, the page from 500 days ago and a hot-table scan.
+    """
+    newest = encode_position('previous', timezone.now() + timedelta(days=1), uuid.UUID(int=0))
+    history = encode_position('next', timezone.now() - timedelta(days=500), uuid.UUID(int=0))
+    # Seeding and archiving leave plenty of garbage behind; collect it before timing
+    gc.collect()
+    results = []
+    for cursor in (newest, history):
+        # The first request caches the counts
+        time_request(view, user, conversation, {'cursor': cursor}, 1)
+        results.append(time_request(view, user, conversation, {'cursor': cursor}, repeat))
+    results.append(timed(repeat, lambda: Message.objects.filter(message_body__contains='needle').count()))
+    return results
+
+
+def main(volumes=(20000, 80000, 320000), per_year=10000, conversations=100, repeat=21):
+    results = {}
+    view = MessageViewSet.as_view({'get': 'list'})
+    for volume in volumes:
+        try:
+            # APIRequestFactory requests come from 'testserver'
+            with transaction.atomic(), override_settings(ALLOWED_HOSTS=['testserver']):
+                user, conversation = seed(volume, per_year, conversations)
+                results[volume, 'hot table only'] = (Message.objects.count(), *measure(view, user, conversation, repeat))
+                archive.archive(batch_size=5000)
+                results[volume, 'archived'] = (Message.objects.count(), *measure(view, user, conversation, repeat))
+                raise Rollback
+        except Rollback:
+            pass
+
+    print(f"{per_year} messages a year, archived after {archive.ARCHIVE_AFTER_DAYS} days, median of {repeat} runs")
+    print(f"{'total':>8} {'':<15} {'hot rows':>9} {'newest page ms':>15} {'history page ms':>16} {'hot scan ms':>12}")
+    for (volume, label), (rows, newest, history, scan) in results.items():
+        print(f"{volume:>8} {label:<15} {rows:>9} {newest * 1000:>15.2f} {history * 1000:>16.2f} {scan * 1000:>12.2f}")
+    return results
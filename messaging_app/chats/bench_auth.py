@@ -0,0 +1,86 @@
+# messaging_app/chats/bench_auth.py
+"""
+Authentication load test:
+
+    python manage.py shell -c "from chats.bench_auth import main; main()"
+
+Inside a transaction that is rolled back afterwards, `users` users with an access
+token each send `requests` authenticated GETs in turn to the conversation list
+(served from chats.list_cache after each user's first request) and to a message
+list page, once with simplejwt's JWTAuthentication and once with
+CachedJWTAuthentication. Prints the queries per request, how many of those load
+the user, and the requests per second of each.
+"""
+import time
+
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.tokens import AccessToken
+
+from . import auth
+from .bench_pagination import Rollback
+from .models import User, Conversation, Message
+from .views import ConversationViewSet, MessageViewSet
+
+
+def seed(users):
+    """
+    Creates `users` users sharing one conversation with a few messages, and a token for each.
+    """
+    members = [User.objects.create_user(username=f'bench-auth-{i}', password='password123') for i in range(users)]
+    conversation = Conversation.objects.create(name='Authentication benchmark')
+    conversation.participants.add(*members)
+    Message.objects.bulk_create([
+        Message(conversation=conversation, sender=members[i % users], message_body=f'Message {i}') for i in range(20)
+    ])
+    return conversation, [str(AccessToken.for_user(member)) for member in members]
+
+
+def run(authentication_class, conversation, tokens, requests):
+    """
+    Sends `requests` GETs, alternating between the two endpoints and cycling through
+    the tokens. Returns (seconds, queries, user queries).
+    """
+    factory = APIRequestFactory()
+    views = [
+        ('/api/conversations/', ConversationViewSet.as_view(
+            {'get': 'list'}, authentication_classes=[authentication_class]
+        ), {}),
+        (f'/api/conversations/{conversation.pk}/messages/', MessageViewSet.as_view(
+            {'get': 'list'}, authentication_classes=[authentication_class]
+        ), {'conversation_pk': conversation.pk}),
+    ]
+    user_table = connection.ops.quote_name(User._meta.db_table)
+    with CaptureQueriesContext(connection) as queries:
+        started = time.perf_counter()
+        for i in range(requests):
+            url, view, kwargs = views[i % len(views)]
+            request = factory.get(url, HTTP_AUTHORIZATION=f'Bearer {tokens[i % len(tokens)]}')
+            response = view(request, **kwargs)
+            response.render()
+            assert response.status_code == 200, response.data
+        seconds = time.perf_counter() - started
+    user_queries = sum(1 for query in queries if query['sql'].startswith('SELECT') and f'FROM {user_table} WHERE' in query['sql'])
+    return seconds, len(queries), user_queries
+
+
+def main(users=50, requests=2000):
+    results = {}
+    try:
+        # APIRequestFactory requests come from 'testserver'
+        with transaction.atomic(), override_settings(ALLOWED_HOSTS=['testserver']):
+            conversation, tokens = seed(users)
+            auth.local_cache.clear()
+            results['JWTAuthentication'] = run(JWTAuthentication, conversation, tokens, requests)
+            results['CachedJWTAuthentication'] = run(auth.CachedJWTAuthentication, conversation, tokens, requests)
+            raise Rollback
+    except Rollback:
+        pass
+
+    print(f"{requests} requests from {users} users")
+    print(f"{'authentication':<26} {'queries/req':>12} {'user queries/req':>17} {'req/s':>8}")
+    for name, (seconds, queries, user_queries) in results.items():
+        print(f"{name:<26} {queries / requests:>12.2f} {user_queries / requests:>17.3f} {requests / seconds:>8.0f}")
+    return results
@@ -0,0 +1,65 @@
+# messaging_app/chats/bench_bulk.py
+"""
+Message ingest benchmark:
+
+    python manage.py shell -c "from chats.bench_bulk import main; main()"
+
+Inside a transaction that is rolled back afterwards, posts `count` messages to one
+conversation as `count` single POSTs to MessageViewSet's create and as one request
+to its bulk action, and prints the elapsed time and messages per second of each.
+"""
+import time
+
+from django.db import transaction
+from django.test.utils import override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from .bench_pagination import Rollback
+from .models import User, Conversation, Message
+from .views import MessageViewSet
+
+
+def post(view, user, conversation, payload):
+    """
+    Sends one POST with `payload` to `view` on the conversation's messages route.
+    """
+    request = APIRequestFactory().post(
+        f'/api/conversations/{conversation.pk}/messages/', payload, format='json'
+    )
+    force_authenticate(request, user=user)
+    response = view(request, conversation_pk=conversation.pk)
+    response.render()
+    assert response.status_code == 201, response.data
+    return response
+
+
+def main(count=2000):
+    results = {}
+    try:
+        # APIRequestFactory requests come from 'testserver'
+        with transaction.atomic(), override_settings(ALLOWED_HOSTS=['testserver']):
+            user = User.objects.create_user(username='bench-bulk', password='password123')
+            conversation = Conversation.objects.create(name='Bulk benchmark')
+            conversation.participants.add(user)
+
+            single = MessageViewSet.as_view({'post': 'create'})
+            started = time.perf_counter()
+            for i in range(count):
+                post(single, user, conversation, {'conversation': str(conversation.pk), 'message_body': f'Single {i}'})
+            results['single POSTs'] = time.perf_counter() - started
+
+            bulk = MessageViewSet.as_view({'post': 'bulk'})
+            started = time.perf_counter()
+            post(bulk, user, conversation, [{'message_body': f'Bulk {i}'} for i in range(count)])
+            results['bulk POST'] = time.perf_counter() - started
+
+            assert Message.objects.filter(conversation=conversation).count() == 2 * count
+            raise Rollback
+    except Rollback:
+        pass
+
+    print(f"{count} messages into one conversation")
+    print(f"{'ingest':<14} {'seconds':>10} {'msg/s':>10}")
+    for name, seconds in results.items():
+        print(f"{name:<14} {seconds:>10.3f} {count / seconds:>10.0f}")
+    return results
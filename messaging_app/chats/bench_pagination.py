@@ -0,0 +1,104 @@
+# messaging_app/chats/bench_pagination.py
+"""
+Pagination benchmark for the nested messages route:
+
+    python manage.py shell -c "from chats.bench_pagination import main; main()"
+
+Seeds one conversation with `rows` messages inside a transaction that is rolled
+back afterwards, then times MessageViewSet's list at page 1 and page 10,000
+(20 per page) with the page-number MessagePagination and with the
+(sent_at, message_id) MessageCursorPagination.
+"""
+import statistics
+import time
+from datetime import timedelta
+
+from django.db import transaction
+from django.test.utils import override_settings
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from .models import User, Conversation, Message
+from .pagination import MessagePagination, MessageCursorPagination
+from .views import MessageViewSet
+
+
+class Rollback(Exception):
+    """
+    Raised to roll back the seeded rows once the benchmark is done.
+    """
+
+
+def seed(rows, batch_size=10000):
+    """
+    Creates a user and a conversation holding `rows` messages one second apart.
+    """
+    user = User.objects.create_user(username='bench-pagination', password='password123')
+    conversation = Conversation.objects.create(name='Pagination benchmark')
+    conversation.participants.add(user)
+    base = timezone.now() - timedelta(seconds=rows)
+    for start in range(0, rows, batch_size):
+        messages = Message.objects.bulk_create([
+            Message(conversation=conversation, sender=user, message_body=f'Message {i}')
+            for i in range(start, min(start + batch_size, rows))
+        ])
+        # sent_at is auto_now_add, so spread the timestamps out afterwards
+        for i, message in enumerate(messages, start):
+            message.sent_at = base + timedelta(seconds=i)
+        Message.objects.bulk_update(messages, ['sent_at'], batch_size=batch_size)
+    return user, conversation
+
+
+def time_request(view, user, conversation, params, repeat):
+    """
+    Median seconds for a list request with `params`, over `repeat` runs.
+    """
+    factory = APIRequestFactory()
+    timings = []
+    for _ in range(repeat):
+        request = factory.get(f'/api/conversations/{conversation.pk}/messages/', params)
+        force_authenticate(request, user=user)
+        started = time.perf_counter()
+        response = view(request, conversation_pk=conversation.pk)
+        response.render()
+        timings.append(time.perf_counter() - started)
+        assert response.status_code == 200, response.data
+    return statistics.median(timings)
+
+
+def deep_cursor(conversation, page, page_size):
+    """
+    The cursor query parameter that starts the cursor listing at page `page`.
+    """
+    paginator = MessageCursorPagination()
+    paginator.base_url = '/'
+    anchor = Message.objects.filter(conversation=conversation).order_by(
+        'sent_at', 'message_id')[(page - 1) * page_size - 1]
+    link = paginator.encode_cursor('next', anchor)
+    return link.split('cursor=', 1)[1]
+
+
+def main(rows=200000, deep_page=10000, page_size=20, repeat=5):
+    results = {}
+    try:
+        # APIRequestFactory requests come from 'testserver'
+        with transaction.atomic(), override_settings(ALLOWED_HOSTS=['testserver']):
+            user, conversation = seed(rows)
+            cursor = deep_cursor(conversation, deep_page, page_size)
+            for name, pagination_class, first, deep in (
+                ('page number', MessagePagination, {'page': 1}, {'page': deep_page}),
+                ('cursor', MessageCursorPagination, {}, {'cursor': cursor}),
+            ):
+                view = MessageViewSet.as_view({'get': 'list'}, pagination_class=pagination_class)
+                for label, params in (('page 1', first), (f'page {deep_page}', deep)):
+                    params = dict(params, page_size=page_size)
+                    results[name, label] = time_request(view, user, conversation, params, repeat)
+            raise Rollback
+    except Rollback:
+        pass
+
+    print(f"{rows} messages, {page_size} per page, median of {repeat} requests")
+    print(f"{'pagination':<14} {'page':<12} {'ms':>10}")
+    for (name, label), seconds in results.items():
+        print(f"{name:<14} {label:<12} {seconds * 1000:>10.2f}")
+    return results
@@ -0,0 +1,91 @@
+# messaging_app/chats/bench_search.py
+"""
+Message search benchmark:
+
+    python manage.py shell -c "from chats.bench_search import main; main()"
+
+Inside a transaction that is rolled back afterwards, seeds `rows` messages over
+`conversations` conversations (the searching user is in one in ten) with bodies drawn
+from a Zipf-like vocabulary, then times chats.search for a rare word, a common word,
+two words and a prefix, with the database's full-text index and with the LIKE
+fallback, printing the median latency of each.
+"""
+import random
+import statistics
+import time
+
+from django.db import transaction
+
+from . import search
+from .bench_pagination import Rollback
+from .models import User, Conversation, ConversationParticipant, Message
+
+VOCABULARY = [f'word{i}' for i in range(5000)]
+# Word n is drawn with probability proportional to 1 / (n + 1)
+WEIGHTS = [1 / (rank + 1) for rank in range(len(VOCABULARY))]
+
+QUERIES = (
+    ('rare word', 'word1234'),
+    ('common word', 'word3'),
+    ('two words', 'word10 word25'),
+    ('prefix', 'word123*'),
+)
+
+
+def seed(rows, conversations, batch_size=10000):
+    """
+    Creates the searching user, the conversations and `rows` messages.
+    """
+    rng = random.Random(42)
+    user = User.objects.create_user(username='bench-search', password='password123')
+    other = User.objects.create_user(username='bench-search-other', password='password123')
+    chats = Conversation.objects.bulk_create([
+        Conversation(name=f'Search benchmark {i}') for i in range(conversations)
+    ])
+    ConversationParticipant.objects.bulk_create(
+        [ConversationParticipant(conversation=chat, user=other) for chat in chats]
+        + [ConversationParticipant(conversation=chat, user=user) for chat in chats[::10]]
+    )
+    for start in range(0, rows, batch_size):
+        Message.objects.bulk_create([
+            Message(
+                conversation=chats[i % conversations],
+                sender=other,
+                message_body=' '.join(rng.choices(VOCABULARY, WEIGHTS, k=rng.randint(5, 15))),
+            )
+            for i in range(start, min(start + batch_size, rows))
+        ])
+    return user
+
+
+def time_search(user, text, using, repeat):
+    """
+    Median seconds and result count of a 20-result search, over `repeat` runs.
+    """
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        hits = search.search(user, text, using=using)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings), len(hits)
+
+
+def main(rows=1000000, conversations=1000, repeat=5):
+    results = {}
+    try:
+        with transaction.atomic():
+            started = time.perf_counter()
+            user = seed(rows, conversations)
+            print(f"seeded {rows} messages in {time.perf_counter() - started:.1f} s")
+            for using in (search.backend(), 'like'):
+                for label, text in QUERIES:
+                    results[using, label] = time_search(user, text, using, repeat)
+            raise Rollback
+    except Rollback:
+        pass
+
+    print(f"{rows} messages in {conversations} conversations, median of {repeat} searches")
+    print(f"{'backend':<12} {'query':<12} {'ms':>10} {'hits':>6}")
+    for (using, label), (seconds, hits) in results.items():
+        print(f"{using:<12} {label:<12} {seconds * 1000:>10.2f} {hits:>6}")
+    return results
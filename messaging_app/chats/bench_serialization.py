@@ -0,0 +1,120 @@
+# messaging_app/chats/bench_serialization.py
+"""
+List serialization benchmark:
+
+    python manage.py shell -c "from chats.bench_serialization import main; main()"
+
+Inside a transaction that is rolled back afterwards, seeds one conversation with
+`count` messages and `conversations` conversations of three participants each,
+then times, per 1,000 messages and for the whole conversation list:
+- the model path: model instances, MessageSerializer / ConversationListSerializer
+  and DRF's JSONRenderer;
+- the fast path: values_list() rows, chats.fast_serializers and FastJSONRenderer,
+and prints the median of `repeat` runs, split into reading the rows and
+serializing them to JSON bytes. Both paths are checked to produce the same bytes.
+"""
+import statistics
+import time
+from datetime import timedelta
+
+from django.db import transaction
+from django.test.utils import override_settings
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory, force_authenticate
+from rest_framework.request import Request
+
+from . import fast_serializers, inbox
+from .bench_pagination import Rollback
+from .models import User, Conversation, ConversationParticipant, Message
+from .renderers import FastJSONRenderer, orjson
+from .serializers import ConversationListSerializer, MessageSerializer
+from .views import ConversationViewSet
+
+
+def seed(count, conversations):
+    """
+    Creates the user, a conversation with `count` messages and `conversations` more
+    conversations of three participants with one message each.
+    """
+    user = User.objects.create_user(username='bench-serialization', password='password123', email='bench@example.com')
+    others = [User.objects.create_user(username=f'bench-serialization-{i}', password='password123') for i in range(2)]
+    history = Conversation.objects.create(name='Serialization benchmark')
+    chats = [history] + Conversation.objects.bulk_create([
+        Conversation(name=f'Serialization benchmark {i}') for i in range(conversations)
+    ])
+    ConversationParticipant.objects.bulk_create([
+        ConversationParticipant(conversation=chat, user=member) for chat in chats for member in [user, *others]
+    ])
+    base = timezone.now() - timedelta(seconds=count)
+    messages = Message.objects.bulk_create([
+        Message(conversation=history, sender=others[i % 2], message_body=f'Message number {i} of the benchmark')
+        for i in range(count)
+    ] + [Message(conversation=chat, sender=others[0], message_body='Latest') for chat in chats[1:]])
+    for i, message in enumerate(messages[:count]):
+        message.sent_at = base + timedelta(seconds=i)
+    Message.objects.bulk_update(messages[:count], ['sent_at'])
+    inbox.record_messages(messages)
+    return user, history
+
+
+def timed(repeat, read, serialize):
+    """
+    Median seconds of read() and of serialize(read()) over `repeat` runs, and the output.
+    """
+    reads, serializations = [], []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        rows = read()
+        reads.append(time.perf_counter() - started)
+        started = time.perf_counter()
+        output = serialize(rows)
+        serializations.append(time.perf_counter() - started)
+    return statistics.median(reads), statistics.median(serializations), output
+
+
+def main(count=1000, conversations=200, repeat=20):
+    results = {}
+    try:
+        # APIRequestFactory requests come from 'testserver'
+        with transaction.atomic(), override_settings(ALLOWED_HOSTS=['testserver']):
+            user, history = seed(count, conversations)
+            messages = Message.objects.filter(conversation=history).select_related('sender').only(
+                'message_id', 'conversation', 'message_body', 'sent_at', 'sender__user_id', 'sender__username',
+            ).order_by('sent_at', 'message_id')
+            django_request = APIRequestFactory().get('/api/conversations/')
+            force_authenticate(django_request, user=user)
+            view = ConversationViewSet(action='list', format_kwarg=None)
+            view.request = Request(django_request)
+            view.request.user = user
+            conversation_rows = view.get_queryset()
+            context = {'request': view.request}
+
+            results['messages: model path'] = timed(
+                repeat, lambda: list(messages.all()),
+                lambda rows: JSONRenderer().render(MessageSerializer(rows, many=True).data),
+            )
+            results['messages: fast path'] = timed(
+                repeat, lambda: list(fast_serializers.MESSAGE.rows(messages)),
+                lambda rows: FastJSONRenderer().render(fast_serializers.MESSAGE.many(rows)),
+            )
+            results['conversations: model path'] = timed(
+                repeat, lambda: list(conversation_rows.all()),
+                lambda rows: JSONRenderer().render(ConversationListSerializer(rows, many=True, context=context).data),
+            )
+            # conversation_list() reads and serializes in one go
+            results['conversations: fast path'] = timed(
+                repeat, lambda: None,
+                lambda rows: FastJSONRenderer().render(fast_serializers.conversation_list(conversation_rows, view.request)),
+            )
+            assert results['messages: model path'][2] == results['messages: fast path'][2]
+            assert results['conversations: model path'][2] == results['conversations: fast path'][2]
+            raise Rollback
+    except Rollback:
+        pass
+
+    print(f"{count} messages, {conversations + 1} conversations, orjson {'installed' if orjson else 'not installed'}")
+    print(f"{'':<28} {'read ms':>10} {'serialize ms':>14} {'total ms':>10}")
+    for name, (read, serialize, _) in results.items():
+        print(f"{name:<28} {read * 1000:>10.2f} {serialize * 1000:>14.2f} {(read + serialize) * 1000:>10.2f}")
+    return {name: (read, serialize) for name, (read, serialize, _) in results.items()}
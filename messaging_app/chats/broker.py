@@ -0,0 +1,143 @@
+# messaging_app/chats/broker.py
+"""
+Publish/subscribe for new messages, feeding the message stream (MessageViewSet.stream).
+
+Channels are conversation ids. chats.inbox.record_messages() announces every batch of
+new messages once its transaction commits, with one event per conversation, and a
+waiting stream request wakes up on it and reads the new rows from the database.
+Waiting costs no queries: the request's thread sleeps on a condition variable.
+
+LocalBroker delivers within one process only, which is enough for development,
+tests and single-process servers. A deployment running several processes sets
+CHATS_BROKER to the dotted path of a class with the same subscribe()/publish()
+interface backed by a shared bus (e.g. Redis pub/sub).
+"""
+import threading
+import uuid
+from collections import defaultdict, deque
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+
+class Subscription:
+    """
+    The events published on a set of channels since subscribing.
+    Holds at most `max_pending` undelivered events; older ones are dropped, which
+    is harmless because events only tell the subscriber to look at the database.
+    """
+    def __init__(self, broker, channels, max_pending=1000):
+        self.broker = broker
+        self.channels = frozenset(channels)
+        self._events = deque(maxlen=max_pending)
+        self._condition = threading.Condition()
+
+    def deliver(self, event):
+        with self._condition:
+            self._events.append(event)
+            self._condition.notify_all()
+
+    def wait(self, timeout=None):
+        """
+        Returns the pending events, waiting up to `timeout` seconds for the first one.
+        Returns [] on timeout.
+        """
+        with self._condition:
+            if not self._events:
+                self._condition.wait(timeout)
+            events = list(self._events)
+            self._events.clear()
+        return events
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class LocalBroker:
+    """
+    In-process broker: publish() hands the event to every current subscriber of the channel.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+
+    def subscribe(self, channels, max_pending=1000):
+        subscription = Subscription(self, channels, max_pending)
+        with self._lock:
+            for channel in subscription.channels:
+                self._subscribers[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._subscribers.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscribers[channel]
+
+    def publish(self, channel, event):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            subscription.deliver(event)
+        return len(subscribers)
+
+    def subscriber_count(self):
+        with self._lock:
+            return len({subscription for subscribers in self._subscribers.values() for subscription in subscribers})
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """
+    The process-wide broker: CHATS_BROKER (a dotted class path) or LocalBroker.
+    """
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                broker_class = getattr(settings, 'CHATS_BROKER', None)
+                _broker = import_string(broker_class)() if broker_class else LocalBroker()
+    return _broker
+
+
+def channel(conversation_id):
+    """
+    The channel of a conversation: its id in canonical form, as chats.membership stores it.
+    """
+    return str(uuid.UUID(str(conversation_id)))
+
+
+def announce_messages(latest_by_conversation):
+    """
+    Publishes, once the current transaction commits, one event per conversation with
+    the position of its latest new message:
+    {'conversation': id, 'message_id': id, 'sent_at': datetime}.
+    """
+    events = [
+        (channel(conversation_id), {
+            'conversation': channel(conversation_id),
+            'message_id': str(message.message_id),
+            'sent_at': message.sent_at,
+        })
+        for conversation_id, message in latest_by_conversation.items()
+    ]
+
+    def publish():
+        broker = get_broker()
+        for name, event in events:
+            broker.publish(name, event)
+
+    transaction.on_commit(publish)
@@ -0,0 +1,185 @@
+# messaging_app/chats/fast_serializers.py
+"""
+Read-only fast path for the list actions (MessageViewSet.list, ConversationViewSet.list).
+
+Building a ModelSerializer per row, and a model instance to feed it, dominates the
+CPU time of a list request. Here each serializer is a fixed list of
+(output name, values_list() column, converter) entries: the rows are read as named
+tuples and every dict is built by one comprehension, with the converters
+precomputed and no model instances at all. The output renders (with
+chats.renderers.FastJSONRenderer or DRF's JSONRenderer) to the same bytes as
+MessageSerializer, UserSerializer and ConversationListSerializer; tests.py checks
+this field by field, so a field added to one of those serializers must be added here.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.reverse import reverse
+from rest_framework.settings import api_settings
+
+from .models import ConversationParticipant
+
+# Converter of datetime columns, resolved for the active timezone on every serialization
+DATETIME = object()
+
+_datetime = serializers.DateTimeField().to_representation
+
+
+def datetime_converter():
+    """
+    DateTimeField().to_representation for the current settings and timezone, with
+    the timezone looked up once instead of for every value.
+    """
+    if not settings.USE_TZ or (api_settings.DATETIME_FORMAT or '').lower() != ISO_8601:
+        return _datetime
+    zone = timezone.get_current_timezone()
+
+    def convert(value):
+        if not value:
+            return None
+        if value.tzinfo is None:
+            return _datetime(value)
+        value = value.astimezone(zone).isoformat()
+        return value[:-6] + 'Z' if value.endswith('+00:00') else value
+    return convert
+
+
+def string_or_none(value):
+    return None if value is None else str(value)
+
+
+class ValuesSerializer:
+    """
+    Serializes values_list() rows into dicts: `fields` is a sequence of
+    (name, column, converter), where converter is None to keep the value as read
+    and DATETIME for DateTimeField's representation.
+    """
+    def __init__(self, fields):
+        self.fields = tuple(fields)
+        self.names = tuple(name for name, _, _ in self.fields)
+        self.columns = tuple(column for _, column, _ in self.fields)
+        self.converters = tuple(convert or _identity for _, _, convert in self.fields)
+
+    def prefixed(self, prefix):
+        """
+        The same serializer reading its columns through a relation, e.g. 'last_message__'.
+        """
+        return ValuesSerializer((name, prefix + column, convert) for name, column, convert in self.fields)
+
+    def rows(self, queryset):
+        """
+        The queryset's rows as named tuples of this serializer's columns.
+        prefetch_related does not apply to values_list(), so it is cleared.
+        """
+        return queryset.prefetch_related(None).values_list(*self.columns, named=True)
+
+    def bind(self):
+        """
+        The converters with DATETIME resolved; pass them on when serializing many rows.
+        """
+        if DATETIME not in self.converters:
+            return self.converters
+        convert_datetime = datetime_converter()
+        return tuple(convert_datetime if convert is DATETIME else convert for convert in self.converters)
+
+    def to_representation(self, row, start=0, converters=None):
+        """
+        The dict of the row's columns from index `start` on.
+        """
+        values = row[start:start + len(self.names)] if start or len(row) != len(self.names) else row
+        converters = converters or self.bind()
+        return {name: convert(value) for name, convert, value in zip(self.names, converters, values)}
+
+    def many(self, rows):
+        converters = self.bind()
+        return [self.to_representation(row, converters=converters) for row in rows]
+
+
+def _identity(value):
+    return value
+
+
+# MessageSerializer: 'conversation' (a PrimaryKeyRelatedField) renders as the id
+# string and 'sender' (a StringRelatedField) as User.__str__, the username.
+MESSAGE = ValuesSerializer([
+    ('message_id', 'message_id', str),
+    ('conversation', 'conversation_id', string_or_none),
+    ('sender', 'sender__username', None),
+    ('message_body', 'message_body', None),
+    ('sent_at', 'sent_at', DATETIME),
+])
+
+USER = ValuesSerializer([
+    ('user_id', 'user_id', str),
+    ('username', 'username', None),
+    ('email', 'email', None),
+    ('first_name', 'first_name', None),
+    ('last_name', 'last_name', None),
+    ('phone_number', 'phone_number', None),
+])
+
+# ConversationListSerializer's own columns, followed by its last message's; the
+# participants, messages_url and participant_usernames are filled in by conversation_list().
+CONVERSATION = ValuesSerializer([
+    ('conversation_id', 'conversation_id', str),
+    ('name', 'name', None),
+    ('created_at', 'created_at', DATETIME),
+    ('updated_at', 'updated_at', DATETIME),
+    ('last_message_at', 'last_message_at', DATETIME),
+    ('message_count', 'message_count', None),
+    ('unread_count', 'unread_count', None),
+    ('last_activity', 'last_activity', DATETIME),
+])
+LAST_MESSAGE = MESSAGE.prefixed('last_message__')
+PARTICIPANT = USER.prefixed('user__')
+
+# Placeholder conversation id, replaced in the reversed messages URL
+_URL_PLACEHOLDER = '00000000-0000-0000-0000-00000000cafe'
+
+
+def conversation_list(queryset, request):
+    """
+    ConversationListSerializer(queryset, many=True).data for a queryset from
+    ConversationViewSet.get_queryset(), in two queries: the conversations joined with
+    their last message, and all their participants.
+    """
+    rows = list(queryset.prefetch_related(None).values_list(
+        *CONVERSATION.columns, *LAST_MESSAGE.columns, named=True
+    ))
+    conversation_ids = [row.conversation_id for row in rows]
+
+    # Participants in username order, as with_conversation_relations() prefetches them
+    participants = defaultdict(list)
+    participant_converters = PARTICIPANT.bind()
+    for row in ConversationParticipant.objects.filter(conversation_id__in=conversation_ids).order_by(
+        'user__username'
+    ).values_list('conversation_id', *PARTICIPANT.columns, named=True):
+        participants[row.conversation_id].append(PARTICIPANT.to_representation(row, 1, participant_converters))
+
+    # One reverse() for every messages_url
+    messages_url = reverse(
+        'conversation-messages-list', kwargs={'conversation_pk': _URL_PLACEHOLDER}, request=request
+    )
+    start = len(CONVERSATION.names)
+    conversation_converters, message_converters = CONVERSATION.bind(), LAST_MESSAGE.bind()
+    data = []
+    for row in rows:
+        conversation = CONVERSATION.to_representation(row[:start], converters=conversation_converters)
+        users = participants[row.conversation_id]
+        data.append({
+            'conversation_id': conversation['conversation_id'],
+            'participants': users,
+            'name': conversation['name'],
+            'created_at': conversation['created_at'],
+            'updated_at': conversation['updated_at'],
+            'last_message': None if row.last_message__message_id is None else LAST_MESSAGE.to_representation(row, start, message_converters),
+            'last_message_at': conversation['last_message_at'],
+            'message_count': conversation['message_count'],
+            'unread_count': conversation['unread_count'],
+            'last_activity': conversation['last_activity'],
+            'messages_url': messages_url.replace(_URL_PLACEHOLDER, conversation['conversation_id']),
+            'participant_usernames': ', '.join(user['username'] for user in users),
+        })
+    return data
@@ -21,9 +21,9 @@ class MessageFilter(django_filters.FilterSet):
         label='Sender Username (case-insensitive)'
     )
     
-    # Filter by timestamp range
+    # Filter by timestamp range (the message's sent_at)
     timestamp = django_filters.DateTimeFromToRangeFilter(
-        field_name='timestamp', 
+        field_name='sent_at', 
         label='Timestamp Range (e.g., 2023-01-01T00:00:00 to 2023-01-31T23:59:59)'
     )
 
@@ -0,0 +1,91 @@
+# messaging_app/chats/inbox.py
+"""
+Maintains the denormalized inbox columns the conversation list is served from:
+Conversation.last_message, last_message_at and message_count, and each
+participant's ConversationParticipant.unread_count.
+
+Every change is an UPDATE computed by the database from the current column values
+(F() expressions), so concurrent posts to one conversation never lose an increment,
+and last_message only ever moves forward in time.
+
+record_messages() runs for every created Message through the post_save signal in
+chats/signals.py; code that inserts messages without signals (bulk_create) must
+call it itself. Deleting a message goes through forget_message().
+Each of these also invalidates the participants' cached conversation lists
+(chats.list_cache), and record_messages() announces the new messages to waiting
+message streams (chats.broker) once the transaction commits and queues their
+per-participant notifications (chats.notifications).
+"""
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import Case, F, Q, Value, When
+from django.db.models.functions import Greatest
+
+from . import broker, list_cache, notifications
+from .models import Conversation, ConversationParticipant, Message
+
+
+def record_messages(messages):
+    """
+    Folds newly created messages into their conversations' inbox columns:
+    one UPDATE for the conversation and one for its participants per conversation.
+    """
+    by_conversation = defaultdict(list)
+    for message in messages:
+        by_conversation[message.conversation_id].append(message)
+
+    latest_by_conversation = {}
+    with transaction.atomic():
+        for conversation_id, batch in by_conversation.items():
+            latest = max(batch, key=lambda message: (message.sent_at, str(message.message_id)))
+            latest_by_conversation[conversation_id] = latest
+            conversation = Conversation.objects.filter(pk=conversation_id)
+            conversation.update(message_count=F('message_count') + len(batch))
+            # Only move last_message forward: a slower concurrent request holding an
+            # older message must not overwrite a newer one
+            conversation.filter(
+                Q(last_message_at__isnull=True) | Q(last_message_at__lte=latest.sent_at)
+            ).update(last_message=latest, last_message_at=latest.sent_at)
+
+            # Everyone gets the batch as unread, minus the messages they sent themselves
+            own_messages = Counter(message.sender_id for message in batch)
+            ConversationParticipant.objects.filter(conversation_id=conversation_id).update(
+                unread_count=F('unread_count') + len(batch) - Case(
+                    *[When(user_id=sender_id, then=Value(count)) for sender_id, count in own_messages.items()],
+                    default=Value(0),
+                )
+            )
+        list_cache.invalidate_conversations(by_conversation)
+        broker.announce_messages(latest_by_conversation)
+        notifications.schedule_fan_out(by_conversation)
+
+
+def forget_message(message):
+    """
+    Updates the inbox columns after `message` has been deleted. The new last
+    message, if the deleted one was the last, is read from the messages table.
+    Unread counters are left as they are.
+    """
+    with transaction.atomic():
+        conversation = Conversation.objects.filter(pk=message.conversation_id)
+        conversation.update(message_count=Greatest(F('message_count') - 1, 0))
+        # on_delete=SET_NULL has already cleared last_message if it pointed here
+        if conversation.filter(last_message__isnull=True).exists():
+            latest = Message.objects.filter(conversation_id=message.conversation_id).order_by(
+                '-sent_at', '-message_id'
+            ).first()
+            conversation.filter(last_message__isnull=True).update(
+                last_message=latest, last_message_at=latest.sent_at if latest else None
+            )
+        list_cache.invalidate_conversations([message.conversation_id])
+
+
+def mark_read(conversation, user):
+    """
+    Resets `user`'s unread counter in `conversation` (an instance or its id).
+    """
+    ConversationParticipant.objects.filter(
+        conversation_id=getattr(conversation, 'pk', conversation), user_id=user.pk
+    ).update(unread_count=0)
+    list_cache.invalidate_users(user.pk)
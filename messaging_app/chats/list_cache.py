@@ -0,0 +1,170 @@
+# messaging_app/chats/list_cache.py
+"""
+Per-user cache of the serialized conversation list (ConversationViewSet.list).
+
+Entries live in the Django cache under versioned keys,
+'chats:conversation_list:{user_id}:{version}:{request hash}', where the version is a
+counter kept per user. Invalidating a user's list bumps that counter, so every
+entry cached for them (any host or query string) becomes unreachable at once and
+simply expires, without having to know or delete the keys.
+
+Each conversation has a version counter as well, and an entry stores the versions of
+the user's conversations read before the list was built; a hit needs them all
+unchanged (one get_many). A change to one conversation, such as a posted message,
+then bumps a single counter instead of one per participant, and needs no query for
+the participants.
+
+Lists change when a conversation is renamed, created or deleted, when participants
+change and when messages are posted, edited, deleted or read; chats/signals.py and
+chats.inbox call invalidate_users() / invalidate_conversations() on each of these.
+Inside a transaction the bump is repeated on commit, so a list read and cached
+before the commit cannot outlive it.
+
+Hits, misses and invalidations are counted in the cache as well, so with a shared
+backend stats() covers every worker.
+"""
+import hashlib
+import time
+from typing import NamedTuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from . import membership
+
+# Seconds a cached list stays valid if nothing invalidates it first.
+# Override with CHATS_CONVERSATION_LIST_CACHE_TIMEOUT in settings; 0 disables the cache.
+CACHE_TIMEOUT = getattr(settings, 'CHATS_CONVERSATION_LIST_CACHE_TIMEOUT', 300)
+
+PREFIX = 'chats:conversation_list'
+STAT_NAMES = ('hits', 'misses', 'invalidations')
+
+
+class CacheStats(NamedTuple):
+    """
+    Counters of the conversation list cache since the last reset_stats().
+    """
+    hits: int
+    misses: int
+    invalidations: int
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+def version_key(user_id):
+    return f'{PREFIX}:version:{user_id}'
+
+
+def conversation_version_key(conversation_id):
+    return f'{PREFIX}:conversation:{conversation_id}'
+
+
+def _version(user_id):
+    """
+    The user's current list version. A missing (never set or evicted) counter starts
+    from the clock, so it cannot reuse the version of entries cached before.
+    """
+    key = version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def _conversation_versions(conversation_ids):
+    """
+    {key: version} for the given conversations, starting missing counters from the clock.
+    """
+    keys = [conversation_version_key(conversation_id) for conversation_id in conversation_ids]
+    versions = cache.get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        now = time.time_ns()
+        for key in missing:
+            cache.add(key, now, None)
+        versions.update(cache.get_many(missing))
+    return versions
+
+
+def list_key(request):
+    """
+    The cache key of the list `request.user` gets for this URL (host and query string
+    included, since links in the payload are absolute).
+    """
+    url_hash = hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+    return f'{PREFIX}:{request.user.pk}:{_version(request.user.pk)}:{url_hash}'
+
+
+def _count(name, amount=1):
+    key = f'{PREFIX}:stats:{name}'
+    try:
+        cache.incr(key, amount)
+    except ValueError:
+        cache.set(key, amount, None)
+
+
+def cached_list(request, build):
+    """
+    Returns (data, hit): the cached list for the request, or build() cached for next time.
+    """
+    if not CACHE_TIMEOUT:
+        return build(), False
+    key = list_key(request)
+    entry = cache.get(key)
+    if entry is not None:
+        data, versions = entry
+        if not versions or cache.get_many(list(versions)) == versions:
+            _count('hits')
+            return data, True
+    _count('misses')
+    # Read before building, so a change made meanwhile leaves the entry stale
+    versions = _conversation_versions(membership.conversation_ids(request.user, request))
+    data = build()
+    cache.set(key, (data, versions), CACHE_TIMEOUT)
+    return data, False
+
+
+def _bump(keys):
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            # No version yet: nothing is cached against it
+            pass
+    _count('invalidations', len(keys))
+
+
+def _invalidate(keys):
+    if not keys:
+        return
+    _bump(keys)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: _bump(keys))
+
+
+def invalidate_users(*user_ids):
+    """
+    Invalidates the cached lists of the given users.
+    """
+    _invalidate({version_key(user_id) for user_id in user_ids})
+
+
+def invalidate_conversations(conversation_ids):
+    """
+    Invalidates the cached lists of every participant of the given conversations.
+    """
+    _invalidate({conversation_version_key(conversation_id) for conversation_id in conversation_ids})
+
+
+def stats():
+    values = cache.get_many([f'{PREFIX}:stats:{name}' for name in STAT_NAMES])
+    return CacheStats(*(values.get(f'{PREFIX}:stats:{name}', 0) for name in STAT_NAMES))
+
+
+def reset_stats():
+    cache.delete_many([f'{PREFIX}:stats:{name}' for name in STAT_NAMES])
@@ -0,0 +1,41 @@
+# messaging_app/chats/management/commands/chats_archive.py
+"""
+Moves messages older than the cutoff to the archive table (chats.archive):
+
+    python manage.py chats_archive                  # queue a background run
+    python manage.py chats_archive --days 730       # older than CHATS_ARCHIVE_AFTER_DAYS only
+    python manage.py chats_archive --sync           # archive in this process, batch by batch
+"""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from chats import archive
+
+
+class Command(BaseCommand):
+    help = 'Archives old messages of the chats app.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=archive.ARCHIVE_AFTER_DAYS,
+            help=f'Archive messages older than this many days (default and minimum {archive.ARCHIVE_AFTER_DAYS}).',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=archive.BATCH_SIZE,
+            help=f'Messages moved per transaction (default {archive.BATCH_SIZE}).',
+        )
+        parser.add_argument('--sync', action='store_true', help='Archive now instead of queueing a job.')
+
+    def handle(self, *args, **options):
+        if options['days'] < archive.ARCHIVE_AFTER_DAYS:
+            # The message list relies on nothing younger being archived
+            raise CommandError(f'--days must be at least CHATS_ARCHIVE_AFTER_DAYS ({archive.ARCHIVE_AFTER_DAYS}).')
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        if options['sync']:
+            moved = archive.archive(cutoff, options['batch_size'])
+            self.stdout.write(f'{moved} messages sent before {cutoff:%Y-%m-%d %H:%M} archived')
+            return
+        job = archive.schedule(cutoff, options['batch_size'])
+        self.stdout.write(f'Archiving of messages sent before {cutoff:%Y-%m-%d %H:%M} queued (job {job.pk})')
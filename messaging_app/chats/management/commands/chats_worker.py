@@ -0,0 +1,51 @@
+# messaging_app/chats/management/commands/chats_worker.py
+"""
+Runs chats.tasks workers in their own process:
+
+    python manage.py chats_worker --workers 4
+    python manage.py chats_worker --once            # run the due jobs and exit
+    python manage.py chats_worker --stats           # print the queue depth and exit
+    python manage.py chats_worker --requeue-dead    # retry every dead-lettered job
+"""
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+
+from chats import tasks
+
+
+class Command(BaseCommand):
+    help = 'Runs background task workers for the chats app.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='Worker threads (default 4).')
+        parser.add_argument('--once', action='store_true', help='Run the jobs due now, then exit.')
+        parser.add_argument('--stats', action='store_true', help='Print the queue depth and exit.')
+        parser.add_argument('--requeue-dead', action='store_true', help='Queue dead jobs again and exit.')
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            for name, value in tasks.stats()._asdict().items():
+                self.stdout.write(f'{name}: {value}')
+            return
+        if options['requeue_dead']:
+            self.stdout.write(f'{tasks.requeue_dead()} dead jobs queued again')
+            return
+
+        pool = tasks.get_pool()
+        if options['once']:
+            self.stdout.write(f'{pool.run_pending()} jobs run')
+            return
+
+        pool.workers = options['workers']
+        pool.start()
+        self.stdout.write(f'{pool.workers} workers running; Ctrl-C to stop')
+        stopped = threading.Event()
+        signal.signal(signal.SIGTERM, lambda *_: stopped.set())
+        try:
+            while not stopped.wait(60):
+                self.stdout.write(f'{tasks.stats()} {pool.counts()}')
+        except KeyboardInterrupt:
+            pass
+        pool.stop()
@@ -0,0 +1,109 @@
+# messaging_app/chats/membership.py
+"""
+Conversation membership checks shared by IsParticipantOfConversation and the viewsets.
+
+is_participant() answers "is this user in this conversation?" without loading the
+participant list:
+- from participants already prefetched on the conversation, when there are any;
+- from the user's set of conversation ids when it is already cached;
+- otherwise with an EXISTS query on the participants join table, which the
+  (conversation_id, user_id) unique index answers directly.
+
+Answers are memoized on the request, and each user's set of conversation ids is kept
+in the Django cache until a participants change (m2m_changed, or a save or delete
+of a ConversationParticipant row) or a conversation delete invalidates it; see
+chats/signals.py.
+"""
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Conversation
+
+# Seconds a user's conversation id set stays in the shared cache
+CACHE_TIMEOUT = 300
+
+Participant = Conversation.participants.through
+
+
+def cache_key(user_id):
+    return f'chats:membership:{user_id}'
+
+
+def _request_cache(request):
+    """
+    The per-request memo: {'ids': {user_id: frozenset}, 'answers': {(user_id, conversation_id): bool}}.
+    """
+    if request is None:
+        return None
+    memo = getattr(request, '_chats_membership', None)
+    if memo is None:
+        memo = {'ids': {}, 'answers': {}}
+        request._chats_membership = memo
+    return memo
+
+
+def conversation_ids(user, request=None):
+    """
+    Returns the frozenset of ids (as strings) of the conversations `user` takes part in.
+    """
+    memo = _request_cache(request)
+    if memo is not None and user.pk in memo['ids']:
+        return memo['ids'][user.pk]
+    ids = cache.get(cache_key(user.pk))
+    if ids is None:
+        ids = frozenset(
+            str(pk) for pk in Participant.objects.filter(user_id=user.pk).values_list('conversation_id', flat=True)
+        )
+        cache.set(cache_key(user.pk), ids, CACHE_TIMEOUT)
+    if memo is not None:
+        memo['ids'][user.pk] = ids
+    return ids
+
+
+def is_participant(user, conversation, request=None):
+    """
+    Returns True if `user` is a participant of `conversation` (an instance or its id).
+    """
+    if not user or not user.is_authenticated:
+        return False
+    try:
+        conversation_id = str(uuid.UUID(str(getattr(conversation, 'pk', conversation))))
+    except ValueError:
+        return False
+
+    # Participants prefetched with the conversation (ConversationViewSet) are free to check
+    prefetched = getattr(conversation, '_prefetched_objects_cache', {}).get('participants')
+    if prefetched is not None:
+        return any(participant.pk == user.pk for participant in prefetched)
+
+    memo = _request_cache(request)
+    if memo is not None:
+        if user.pk in memo['ids']:
+            return conversation_id in memo['ids'][user.pk]
+        if (user.pk, conversation_id) in memo['answers']:
+            return memo['answers'][user.pk, conversation_id]
+
+    ids = cache.get(cache_key(user.pk))
+    if ids is not None:
+        member = conversation_id in ids
+    else:
+        member = Participant.objects.filter(conversation_id=conversation_id, user_id=user.pk).exists()
+    if memo is not None:
+        memo['answers'][user.pk, conversation_id] = member
+    return member
+
+
+def invalidate(*user_ids):
+    """
+    Drops the cached conversation id sets of the given users. Inside a transaction it
+    is repeated on commit, so a set cached from the old rows before the commit does
+    not outlive it.
+    """
+    keys = [cache_key(user_id) for user_id in user_ids]
+    if not keys:
+        return
+    cache.delete_many(keys)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: cache.delete_many(keys))
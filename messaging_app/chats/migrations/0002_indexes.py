@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chats', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='conversation',
+            index=models.Index(fields=['-updated_at'], name='chats_conv_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['conversation', 'sent_at', 'message_id'], name='chats_msg_conv_sent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['sender', 'sent_at'], name='chats_msg_sender_sent_idx'),
+        ),
+        # "Conversations of this user" reads the join table by user_id; with
+        # conversation_id in the index it never has to visit the table rows.
+        # (The unique constraint already covers lookups by conversation_id.)
+        migrations.RunSQL(
+            sql='CREATE INDEX chats_conv_part_user_conv_idx '
+                'ON chats_conversation_participants (user_id, conversation_id)',
+            reverse_sql='DROP INDEX chats_conv_part_user_conv_idx',
+        ),
+    ]
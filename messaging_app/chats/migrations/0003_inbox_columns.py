@@ -0,0 +1,80 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_inbox_columns(apps, schema_editor):
+    """
+    Fills last_message, last_message_at and message_count from the existing messages.
+    Unread counters start at zero: there was no read state before.
+    """
+    Conversation = apps.get_model('chats', 'Conversation')
+    Message = apps.get_model('chats', 'Message')
+    latest = Message.objects.filter(conversation=OuterRef('pk')).order_by('-sent_at', '-message_id')
+    counts = Message.objects.filter(conversation=OuterRef('pk')).order_by().values('conversation').annotate(
+        count=Count('*'),
+    ).values('count')
+    Conversation.objects.update(
+        last_message=Subquery(latest.values('pk')[:1]),
+        last_message_at=Subquery(latest.values('sent_at')[:1]),
+        message_count=Coalesce(Subquery(counts), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chats', '0002_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # Turn the auto-created participants table into the ConversationParticipant
+        # model. The table, its columns, its unique constraint and the index from
+        # 0002 already exist, so only the migration state changes.
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='ConversationParticipant',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('conversation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='memberships', to='chats.conversation')),
+                        ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='memberships', to=settings.AUTH_USER_MODEL)),
+                    ],
+                    options={
+                        'db_table': 'chats_conversation_participants',
+                        'indexes': [models.Index(fields=['user', 'conversation'], name='chats_conv_part_user_conv_idx')],
+                        'unique_together': {('conversation', 'user')},
+                    },
+                ),
+                migrations.AlterField(
+                    model_name='conversation',
+                    name='participants',
+                    field=models.ManyToManyField(related_name='conversations', through='chats.ConversationParticipant', to=settings.AUTH_USER_MODEL),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name='conversationparticipant',
+            name='unread_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='last_message',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='chats.message'),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='last_message_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='message_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_inbox_columns, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,67 @@
+from django.db import migrations
+
+# SQLite: an FTS5 table over message bodies under the message's rowid, kept in sync by
+# triggers, so every write path (save, bulk_create, raw SQL) updates it. The conversation
+# id is indexed too, so searches can be limited to the user's conversations before
+# ranking; only message_body counts towards the rank.
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE chats_message_fts USING fts5("
+    "message_body, conversation, message_id UNINDEXED, tokenize='unicode61')",
+    "INSERT INTO chats_message_fts (chats_message_fts, rank) VALUES ('rank', 'bm25(1.0, 0.0)')",
+    "INSERT INTO chats_message_fts (rowid, message_body, conversation, message_id) "
+    "SELECT rowid, message_body, conversation_id, message_id FROM chats_message",
+    "CREATE TRIGGER chats_message_fts_insert AFTER INSERT ON chats_message BEGIN "
+    "INSERT INTO chats_message_fts (rowid, message_body, conversation, message_id) "
+    "VALUES (new.rowid, new.message_body, new.conversation_id, new.message_id); END",
+    "CREATE TRIGGER chats_message_fts_update AFTER UPDATE OF message_body ON chats_message BEGIN "
+    "UPDATE chats_message_fts SET message_body = new.message_body "
+    "WHERE rowid = old.rowid AND message_id = old.message_id; END",
+    "CREATE TRIGGER chats_message_fts_delete AFTER DELETE ON chats_message BEGIN "
+    "DELETE FROM chats_message_fts WHERE rowid = old.rowid AND message_id = old.message_id; END",
+]
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS chats_message_fts_insert",
+    "DROP TRIGGER IF EXISTS chats_message_fts_update",
+    "DROP TRIGGER IF EXISTS chats_message_fts_delete",
+    "DROP TABLE IF EXISTS chats_message_fts",
+]
+
+# PostgreSQL: a GIN index on the same expression chats.search queries with; the
+# database maintains it on every write.
+POSTGRESQL_FORWARD = [
+    "CREATE INDEX chats_msg_body_search_idx ON chats_message USING GIN (to_tsvector('simple', message_body))",
+]
+POSTGRESQL_BACKWARD = [
+    "DROP INDEX IF EXISTS chats_msg_body_search_idx",
+]
+
+
+def run(statements):
+    def apply(apps, schema_editor):
+        vendor = schema_editor.connection.vendor
+        if vendor not in statements:
+            # Other databases search with LIKE and need no index
+            return
+        if vendor == 'sqlite':
+            with schema_editor.connection.cursor() as cursor:
+                cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+                if not cursor.fetchone()[0]:
+                    # SQLite built without FTS5: chats.search falls back to LIKE
+                    return
+        for statement in statements[vendor]:
+            schema_editor.execute(statement)
+    return apply
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chats', '0003_inbox_columns'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run({'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRESQL_FORWARD}),
+            run({'sqlite': SQLITE_BACKWARD, 'postgresql': POSTGRESQL_BACKWARD}),
+        ),
+    ]
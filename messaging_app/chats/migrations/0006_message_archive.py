@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:39
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chats', '0005_job_queue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedMessage',
+            fields=[
+                ('message_id', models.UUIDField(editable=False, primary_key=True, serialize=False)),
+                ('message_body', models.TextField()),
+                ('sent_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Archived message',
+                'verbose_name_plural': 'Archived messages',
+                'db_table': 'chats_message_archive',
+                'ordering': ['sent_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['sent_at'], name='chats_msg_sent_idx'),
+        ),
+        migrations.AddField(
+            model_name='archivedmessage',
+            name='conversation',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_messages', to='chats.conversation'),
+        ),
+        migrations.AddField(
+            model_name='archivedmessage',
+            name='sender',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_messages', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='archivedmessage',
+            index=models.Index(fields=['conversation', 'sent_at', 'message_id'], name='chats_msgarch_conv_sent_idx'),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from django.utils import timezone
 import uuid # Import uuid for UUIDField
 
 # Custom User Model extending AbstractUser
@@ -35,7 +36,9 @@ class Conversation(models.Model):
     # A conversation can have multiple participants, and a user can be in multiple conversations.
     # We use 'User' (the string name of the model) because it's defined in the same app.
     # related_name='conversations' allows accessing conversations from a User instance (e.g., user.conversations.all())
-    participants = models.ManyToManyField(User, related_name='conversations')
+    # The join table is the explicit ConversationParticipant model (below), which also
+    # keeps each participant's unread counter.
+    participants = models.ManyToManyField(User, related_name='conversations', through='ConversationParticipant')
     # Optional: A name for the conversation, useful for group chats.
     name = models.CharField(max_length=255, blank=True, null=True)
     # Automatically sets the creation timestamp when a conversation is created.
@@ -43,10 +46,22 @@ class Conversation(models.Model):
     # Automatically updates the timestamp every time the conversation object is saved.
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Denormalized summary of the history, kept up to date by chats.inbox whenever a
+    # message is created, so the conversation list never reads the messages table.
+    # The latest message (null until the first one) and its timestamp.
+    last_message = models.ForeignKey('Message', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    last_message_at = models.DateTimeField(null=True, blank=True)
+    # Total number of messages in the conversation.
+    message_count = models.PositiveIntegerField(default=0)
+
     class Meta:
         ordering = ['-updated_at'] # Order conversations by most recent activity
         verbose_name = "Conversation"
         verbose_name_plural = "Conversations"
+        indexes = [
+            # Serves the default ordering of the conversation list
+            models.Index(fields=['-updated_at'], name='chats_conv_updated_idx'),
+        ]
 
     def __str__(self):
         # Display a meaningful name for the conversation, or list participants
@@ -55,6 +70,28 @@ class Conversation(models.Model):
         # Fallback to listing usernames if no name is provided
         return f"Conversation with {', '.join([p.username for p in self.participants.all()])}"
 
+# ConversationParticipant Model
+# The participants join table (chats_conversation_participants), with the
+# participant's count of messages they have not read yet.
+class ConversationParticipant(models.Model):
+    conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE, related_name='memberships')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='memberships')
+    # Incremented for every other participant when a message is posted,
+    # reset to zero when the participant marks the conversation as read.
+    unread_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = 'chats_conversation_participants'
+        unique_together = [('conversation', 'user')]
+        indexes = [
+            # "Conversations of this user" without visiting the table rows
+            # (the unique constraint already covers lookups by conversation)
+            models.Index(fields=['user', 'conversation'], name='chats_conv_part_user_conv_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user} in {self.conversation}"
+
 # Message Model
 # Contains the sender, the conversation it belongs to, and the message content.
 class Message(models.Model):
@@ -78,7 +115,76 @@ class Message(models.Model):
         ordering = ['sent_at'] # Order messages chronologically
         verbose_name = "Message"
         verbose_name_plural = "Messages"
+        indexes = [
+            # A conversation's history in order: the nested messages list, its
+            # (sent_at, message_id) cursor pagination and the latest-messages prefetch
+            models.Index(fields=['conversation', 'sent_at', 'message_id'], name='chats_msg_conv_sent_idx'),
+            # A user's sent messages in order
+            models.Index(fields=['sender', 'sent_at'], name='chats_msg_sender_sent_idx'),
+            # The oldest messages of all conversations, which chats.archive moves out
+            models.Index(fields=['sent_at'], name='chats_msg_sent_idx'),
+        ]
 
     def __str__(self):
         # Display a meaningful string representation for the message
         return f"Message from {self.sender.username} in {self.conversation.name or self.conversation.id} at {self.sent_at.strftime('%Y-%m-%d %H:%M')}"
+
+# ArchivedMessage Model
+# Messages older than the archive cutoff, moved out of chats_message by chats.archive so
+# the hot table only holds recent history. Same columns as Message (plus the time it
+# was archived); the nested messages list reads both tables (MessageCursorPagination).
+class ArchivedMessage(models.Model):
+    message_id = models.UUIDField(primary_key=True, editable=False)
+    conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE, related_name='archived_messages')
+    sender = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_messages')
+    message_body = models.TextField()
+    sent_at = models.DateTimeField()
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'chats_message_archive'
+        ordering = ['sent_at']
+        verbose_name = "Archived message"
+        verbose_name_plural = "Archived messages"
+        indexes = [
+            # A conversation's archived history in (sent_at, message_id) cursor order
+            models.Index(fields=['conversation', 'sent_at', 'message_id'], name='chats_msgarch_conv_sent_idx'),
+        ]
+
+    def __str__(self):
+        return f"Archived message from {self.sender.username} at {self.sent_at.strftime('%Y-%m-%d %H:%M')}"
+
+# Job Model
+# The durable queue of background tasks run by chats.tasks (e.g. the per-participant
+# fan-out of new messages). A job row is written in the same transaction as the change
+# that needs it, so it is never lost nor run for a rolled-back change. Finished jobs are
+# deleted; jobs that failed every attempt stay behind with status 'dead'.
+class Job(models.Model):
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DEAD = 'dead'
+    STATUS_CHOICES = [(QUEUED, 'Queued'), (RUNNING, 'Running'), (DEAD, 'Dead')]
+
+    # Name of the registered task (chats.tasks.register) and its JSON arguments
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    # Attempts made so far; a failed attempt is retried at run_at with exponential backoff
+    attempts = models.PositiveIntegerField(default=0)
+    run_at = models.DateTimeField(default=timezone.now)
+    # A running job whose worker died is claimed again once this has passed
+    locked_until = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'chats_job'
+        verbose_name = "Job"
+        verbose_name_plural = "Jobs"
+        indexes = [
+            # Workers claim the oldest due job of a status
+            models.Index(fields=['status', 'run_at'], name='chats_job_status_run_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.status}, {self.attempts} attempts)"
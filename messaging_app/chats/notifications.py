@@ -0,0 +1,67 @@
+# messaging_app/chats/notifications.py
+"""
+Per-participant fan-out of new messages, run in the background by chats.tasks.
+
+Receivers of `message_received` (push, e-mail, per-recipient counters...) are called
+once per recipient of new messages, with
+    message_received.send(sender=Message, recipient_id=..., messages=[...])
+where `messages` are the new messages of one conversation not sent by the recipient,
+oldest first. Whatever the conversation's size, the request that posts messages only
+adds one job row per conversation (in chats.inbox.record_messages), and only while
+some receiver is connected:
+- 'chats.fan_out_messages' expands it into one 'chats.deliver_messages' job per
+  recipient;
+- each of those calls the receivers for its recipient, so a failing receiver is
+  retried (and eventually dead-lettered) for that recipient alone.
+"""
+from django.dispatch import Signal
+
+from . import tasks
+from .models import ConversationParticipant, Message
+
+message_received = Signal()
+
+
+def schedule_fan_out(messages_by_conversation):
+    """
+    Queues the fan-out of newly created messages ({conversation_id: [Message]}), in the
+    current transaction. Does nothing while no receiver is connected.
+    """
+    if not message_received.has_listeners(Message):
+        return
+    tasks.enqueue_many([
+        ('chats.fan_out_messages', {
+            'conversation_id': str(conversation_id),
+            'messages': [[str(message.message_id), str(message.sender_id)] for message in messages],
+        })
+        for conversation_id, messages in messages_by_conversation.items()
+    ])
+
+
+@tasks.register('chats.fan_out_messages')
+def fan_out_messages(payload):
+    """
+    One delivery job per participant who received at least one of the messages.
+    """
+    recipients = ConversationParticipant.objects.filter(
+        conversation_id=payload['conversation_id']
+    ).values_list('user_id', flat=True)
+    jobs = []
+    for user_id in recipients:
+        received = [message_id for message_id, sender_id in payload['messages'] if sender_id != str(user_id)]
+        if received:
+            jobs.append(('chats.deliver_messages', {'recipient_id': str(user_id), 'message_ids': received}))
+    tasks.enqueue_many(jobs)
+
+
+@tasks.register('chats.deliver_messages')
+def deliver_messages(payload):
+    """
+    Calls the message_received receivers for one recipient. Messages deleted in the
+    meantime are left out.
+    """
+    messages = list(Message.objects.filter(message_id__in=payload['message_ids']).select_related('sender').order_by(
+        'sent_at', 'message_id'
+    ))
+    if messages:
+        message_received.send(sender=Message, recipient_id=payload['recipient_id'], messages=messages)
@@ -1,5 +1,21 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import binascii
+import hashlib
+import heapq
+import json
+import uuid
+
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.db import connections
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
 from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .archive import high_water
 
 class MessagePagination(PageNumberPagination):
     """
@@ -21,3 +37,219 @@ class MessagePagination(PageNumberPagination):
             'previous': self.get_previous_link(),
             'results': data
         })
+
+
+class MessageCursorPagination(BasePagination):
+    """
+    Keyset (cursor) pagination for messages, ordered by (sent_at, message_id).
+
+    Each page is fetched with `WHERE (sent_at, message_id) > (last seen)` and a LIMIT,
+    so page 10,000 costs the same as page 1, unlike OFFSET-based page numbers.
+    message_id breaks ties between messages sent at the same instant, so no message
+    is skipped or repeated. The cursor is an opaque token holding the position and
+    the direction (after or before it).
+
+    total_count is approximate: the database's own estimate where one is available
+    (PostgreSQL), otherwise an exact count cached for `count_cache_timeout` seconds.
+    Set `approximate_count = False` for an exact COUNT(*) on every request, or
+    `include_count = False` to leave the count out.
+
+    With `archived`, a queryset of the matching chats.models.ArchivedMessage rows, the
+    pages run through the archived history too: each page takes up to page_size + 1
+    rows from each table and merges them. The archive is only queried when the page
+    can reach it, i.e. not for pages of messages younger than the archiving cutoff
+    (chats.archive.high_water()), so paging through recent history costs what it did
+    before anything was archived.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    include_count = True
+    approximate_count = True
+    count_cache_timeout = 60
+    # Below this many rows, estimates are too coarse; fall back to the cached count
+    min_estimated_count = 10000
+
+    def paginate_queryset(self, queryset, request, view=None, archived=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        position = self.decode_cursor(request)
+        archive_bound = high_water() if archived is not None else None
+
+        if self.include_count:
+            self.count, self.count_is_approximate = self.get_count(queryset)
+            if archived is not None:
+                archived_count, approximate = self.get_count(archived)
+                self.count += archived_count
+                self.count_is_approximate = self.count_is_approximate or approximate
+
+        direction = position[0] if position is not None else 'next'
+        # One extra row tells whether there is more in the direction of travel
+        page = list(self.window(queryset, position)[:self.page_size + 1])
+        if archived is not None and self.reaches_archive(position, page, archive_bound):
+            page = merge_rows(page, self.window(archived, position)[:self.page_size + 1], reverse=direction == 'previous')
+        has_more = len(page) > self.page_size
+        page = page[:self.page_size]
+        if direction == 'next':
+            self.has_next, self.has_previous = has_more, position is not None
+        else:
+            page.reverse()
+            self.has_next, self.has_previous = True, has_more
+        self.page = page
+        return page
+
+    def window(self, queryset, position):
+        """
+        The queryset's rows after (or, going back, before) the position, in the order of travel.
+        """
+        if position is None:
+            return queryset.order_by('sent_at', 'message_id')
+        direction, sent_at, message_id = position
+        if direction == 'next':
+            return queryset.filter(
+                Q(sent_at__gt=sent_at) | Q(sent_at=sent_at, message_id__gt=message_id)
+            ).order_by('sent_at', 'message_id')
+        return queryset.filter(
+            Q(sent_at__lt=sent_at) | Q(sent_at=sent_at, message_id__lt=message_id)
+        ).order_by('-sent_at', '-message_id')
+
+    def reaches_archive(self, position, hot_rows, archive_bound):
+        """
+        Whether archived rows can be among the page_size + 1 rows taken from `position`,
+        given the `hot_rows` taken from the hot table and the latest sent_at an archived
+        message can have.
+        """
+        if position is None:
+            return True
+        if position[0] == 'next':
+            return position[1] <= archive_bound
+        # Going back, archived rows are older than a full page of newer hot rows
+        return len(hot_rows) <= self.page_size or hot_rows[-1].sent_at <= archive_bound
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def decode_cursor(self, request):
+        """
+        Returns (direction, sent_at, message_id) from the cursor query parameter, or None.
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            return decode_position(encoded)
+        except ValueError:
+            raise NotFound('Invalid cursor')
+
+    def encode_cursor(self, direction, message):
+        token = encode_position(direction, message.sent_at, message.message_id)
+        return replace_query_param(self.base_url, self.cursor_query_param, token)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        if not self.page:
+            # Reached by paging back past the start; the first page comes next
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor('next', self.page[-1])
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return None
+        return self.encode_cursor('previous', self.page[0])
+
+    def get_count(self, queryset):
+        """
+        Returns (count, is_approximate) for the unpaginated queryset.
+        """
+        queryset = queryset.order_by()
+        if not self.approximate_count:
+            return queryset.count(), False
+        estimate = estimate_count(queryset)
+        if estimate is not None and estimate >= self.min_estimated_count:
+            return estimate, True
+        try:
+            sql = str(queryset.query)
+        except EmptyResultSet:
+            return 0, False
+        key = 'chats:message-count:' + hashlib.md5(sql.encode('utf-8')).hexdigest()
+        count = cache.get(key)
+        if count is None:
+            count = queryset.count()
+            cache.set(key, count, self.count_cache_timeout)
+        return count, True
+
+    def get_paginated_response(self, data):
+        response = {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        }
+        if self.include_count:
+            response = {
+                'total_count': self.count,
+                'count_is_approximate': self.count_is_approximate,
+                **response,
+            }
+        return Response(response)
+
+
+def merge_rows(*sorted_rows, reverse=False):
+    """
+    Merges lists of rows (model instances or named tuples), each ordered by
+    (sent_at, message_id), into one list in that order.
+    """
+    return list(heapq.merge(*sorted_rows, key=lambda row: (row.sent_at, row.message_id), reverse=reverse))
+
+
+def encode_position(direction, sent_at, message_id):
+    """
+    The opaque cursor token for a (sent_at, message_id) position and a direction
+    ('next': after it, 'previous': before it).
+    """
+    data = {'d': direction, 't': sent_at.isoformat(), 'id': message_id.hex}
+    return base64.urlsafe_b64encode(json.dumps(data).encode('ascii')).decode('ascii')
+
+
+def decode_position(token):
+    """
+    Returns (direction, sent_at, message_id) from a cursor token; raises ValueError if it is invalid.
+    """
+    try:
+        data = json.loads(base64.urlsafe_b64decode(token.encode('ascii')))
+        direction = data['d']
+        sent_at = parse_datetime(data['t'])
+        message_id = uuid.UUID(data['id'])
+    except (TypeError, ValueError, KeyError, binascii.Error, UnicodeEncodeError):
+        raise ValueError('Invalid cursor')
+    if direction not in ('next', 'previous') or sent_at is None:
+        raise ValueError('Invalid cursor')
+    return direction, sent_at, message_id
+
+
+def estimate_count(queryset):
+    """
+    Returns the planner's row estimate for the queryset on PostgreSQL, read from
+    EXPLAIN without running the query, or None on other databases.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    try:
+        sql, params = queryset.query.sql_with_params()
+    except EmptyResultSet:
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
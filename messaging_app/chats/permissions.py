@@ -2,6 +2,9 @@
 
 from rest_framework import permissions
 
+from .membership import is_participant
+from .models import Conversation, Message
+
 class IsParticipantOfConversation(permissions.BasePermission):
     """
     Custom permission to allow only authenticated users who are participants
@@ -26,13 +29,17 @@ class IsParticipantOfConversation(permissions.BasePermission):
         methods by checking if the requesting user is a participant of the conversation
         associated with the object.
         """
-        # If the object is a Message instance, check its associated conversation
-        if hasattr(obj, 'conversation') and obj.conversation:
-            return request.user in obj.conversation.participants.all()
+        # Membership is answered by chats.membership.is_participant (an indexed EXISTS,
+        # memoized per request and cached per user) instead of loading every participant.
+
+        # If the object is a Message instance, check its associated conversation.
+        # conversation_id avoids fetching the conversation itself.
+        if isinstance(obj, Message):
+            return is_participant(request.user, obj.conversation_id, request)
         
         # If the object is a Conversation instance itself
-        elif hasattr(obj, 'participants'):
-            return request.user in obj.participants.all()
+        elif isinstance(obj, Conversation):
+            return is_participant(request.user, obj, request)
 
         # If the object type is not handled or doesn't have relevant attributes
         return False
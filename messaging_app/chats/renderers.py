@@ -0,0 +1,53 @@
+# messaging_app/chats/renderers.py
+"""
+Renderers for the chats API.
+
+FastJSONRenderer writes the same bytes as DRF's JSONRenderer (compact, unicode,
+strict JSON with U+2028/U+2029 escaped) through orjson when it is installed. The
+list actions use it for their payloads of plain strings, numbers and lists (see
+chats.fast_serializers); anything orjson cannot encode the same way falls back to
+JSONRenderer.
+
+EventStreamRenderer lets MessageViewSet.stream negotiate text/event-stream.
+"""
+from rest_framework import renderers
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONRenderer(renderers.JSONRenderer):
+    """
+    JSONRenderer through orjson. Used for payloads without floats, whose repr differs.
+    """
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None or data is None
+            or not self.compact or self.ensure_ascii or not self.strict
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            # Datetimes and anything else orjson does not know go through DRF's encoder
+            ret = orjson.dumps(data, default=encoders.JSONEncoder().default, option=orjson.OPT_PASSTHROUGH_DATETIME)
+        except TypeError:
+            # e.g. non-string dict keys or integers beyond 64 bits
+            return super().render(data, accepted_media_type, renderer_context)
+        return ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
+
+
+class EventStreamRenderer(renderers.BaseRenderer):
+    """
+    Lets clients negotiate text/event-stream (or ?format=sse) on MessageViewSet.stream,
+    which then answers with a StreamingHttpResponse instead of rendering a Response.
+    """
+    media_type = 'text/event-stream'
+    format = 'sse'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Only errors are rendered through here; send them as a single event
+        return f'event: error\ndata: {renderers.JSONRenderer().render(data).decode()}\n\n'.encode()
@@ -0,0 +1,168 @@
+# messaging_app/chats/search.py
+"""
+Full-text search over message bodies, restricted to the searching user's conversations.
+
+The inverted index depends on the database (see migration 0004):
+- SQLite: the FTS5 table chats_message_fts (message_body, the conversation id and
+  message_id, under the message's rowid), kept in sync by triggers on chats_message,
+  so inserts through bulk_create or raw SQL are indexed as well. Ranked by bm25() over
+  message_body. A later migration that makes SQLite rebuild chats_message drops the
+  triggers with the old table, so it must recreate them and call rebuild_index().
+- PostgreSQL: a GIN index on to_tsvector('simple', message_body), which the database
+  keeps current by itself. Ranked by ts_rank_cd().
+- Anything else (or SQLite built without FTS5): a LIKE scan for every term, newest first.
+
+Queries are plain text: every word must appear, in any order, and a word ending in
+'*' matches as a prefix. Any other search syntax (quotes, operators) is treated as
+text, so no input can make the query fail.
+
+Ranking scores every match, so common words are the expensive case. On SQLite the
+user's conversation ids (from chats.membership) are therefore part of the MATCH
+expression, and only messages in those conversations are scored, as long as there
+are at most PUSHDOWN_CONVERSATIONS of them.
+"""
+import re
+import uuid
+
+from django.db import connection
+
+from .membership import conversation_ids
+from .models import ConversationParticipant, Message
+
+FTS_TABLE = 'chats_message_fts'
+# Text search configuration used on PostgreSQL; 'simple' does no stemming, like FTS5's
+# unicode61 tokenizer, so both databases match the same words.
+PG_CONFIG = 'simple'
+# Most conversation ids written into an FTS5 MATCH expression
+PUSHDOWN_CONVERSATIONS = 500
+
+_TERM = re.compile(r'(\w+)(\*?)', re.UNICODE)
+
+
+def terms(text):
+    """
+    The words of a search text, as (word, is_prefix) pairs.
+    """
+    return [(word, bool(star)) for word, star in _TERM.findall(text or '')]
+
+
+def backend():
+    """
+    'fts5', 'postgresql' or 'like', for the default database.
+    Looked up once per connection.
+    """
+    name = getattr(connection, '_chats_search_backend', None)
+    if name is None:
+        name = 'like'
+        if connection.vendor == 'postgresql':
+            name = 'postgresql'
+        elif connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE])
+                if cursor.fetchone():
+                    name = 'fts5'
+        connection._chats_search_backend = name
+    return name
+
+
+def fts5_query(words, conversations=None):
+    """
+    An FTS5 MATCH expression requiring every word in message_body and, when given, one
+    of `conversations` (ids as stored: 32 hex digits). Every token is quoted, so it is
+    never read as FTS5 syntax.
+    """
+    body = ' '.join('"%s"%s' % (word.replace('"', '""'), '*' if prefix else '') for word, prefix in words)
+    query = f'message_body : ({body})'
+    if conversations:
+        query += ' AND conversation : (%s)' % ' OR '.join(f'"{conversation}"' for conversation in conversations)
+    return query
+
+
+def _prep(field, value):
+    return field.get_db_prep_value(value, connection, prepared=False)
+
+
+def search(user, text, conversation_id=None, limit=20, offset=0, using=None):
+    """
+    Returns [(message_id, rank)] for the messages matching `text`, best first, among
+    the conversations `user` participates in (or only `conversation_id`).
+    rank is higher for better matches; the 'like' backend does not rank and returns 0.
+    `using` forces a backend, e.g. 'like' for comparison.
+    """
+    words = terms(text)
+    if not words:
+        return []
+    using = using or backend()
+
+    message_table = connection.ops.quote_name(Message._meta.db_table)
+    participant_table = connection.ops.quote_name(ConversationParticipant._meta.db_table)
+    user_id = _prep(ConversationParticipant._meta.get_field('user').target_field, user.pk)
+    # The (conversation_id, user_id) unique index answers the membership check per message
+    member = (
+        f'EXISTS (SELECT 1 FROM {participant_table} p '
+        f'WHERE p.conversation_id = m.conversation_id AND p.user_id = %s)'
+    )
+    scope, scope_params = '', []
+    if conversation_id is not None:
+        scope = ' AND m.conversation_id = %s'
+        scope_params = [_prep(Message._meta.get_field('conversation').target_field, conversation_id)]
+
+    if using == 'fts5':
+        # Narrow the match to the user's conversations (or the one searched) before ranking
+        conversations = conversation_ids(user)
+        if conversation_id is not None:
+            conversations = conversations & {str(conversation_id)}
+        if not conversations:
+            return []
+        pushdown = [uuid.UUID(pk).hex for pk in conversations] if len(conversations) <= PUSHDOWN_CONVERSATIONS else None
+        # FTS5's rank column is bm25() (lower for better matches) computed once per row.
+        # Rows are joined back by rowid; the message_id check skips index rows left
+        # stale by a rowid change (VACUUM), and the EXISTS still guards membership.
+        sql = (
+            f'SELECT m.message_id, -{FTS_TABLE}.rank FROM {FTS_TABLE} '
+            f'JOIN {message_table} m ON m.rowid = {FTS_TABLE}.rowid AND m.message_id = {FTS_TABLE}.message_id '
+            f'WHERE {FTS_TABLE} MATCH %s AND {member}{scope} '
+            f'ORDER BY {FTS_TABLE}.rank LIMIT %s OFFSET %s'
+        )
+        params = [fts5_query(words, pushdown), user_id, *scope_params, limit, offset]
+    elif using == 'postgresql':
+        # to_tsquery gets quoted lexemes only; ':*' makes a prefix match
+        query = ' & '.join("'%s'%s" % (word, ':*' if prefix else '') for word, prefix in words)
+        vector = f"to_tsvector('{PG_CONFIG}', m.message_body)"
+        sql = (
+            f"SELECT m.message_id, ts_rank_cd({vector}, to_tsquery('{PG_CONFIG}', %s)) AS rank "
+            f"FROM {message_table} m "
+            f"WHERE {vector} @@ to_tsquery('{PG_CONFIG}', %s) AND {member}{scope} "
+            f'ORDER BY rank DESC, m.sent_at DESC LIMIT %s OFFSET %s'
+        )
+        params = [query, query, user_id, *scope_params, limit, offset]
+    else:
+        like = ' AND '.join(["UPPER(m.message_body) LIKE UPPER(%s) ESCAPE '\\'"] * len(words))
+        sql = (
+            f'SELECT m.message_id, 0 AS rank FROM {message_table} m '
+            f'WHERE {like} AND {member}{scope} '
+            f'ORDER BY m.sent_at DESC LIMIT %s OFFSET %s'
+        )
+        # '_' is the only LIKE wildcard a word can contain; every word matches as a substring
+        params = ['%' + word.replace('_', '\\_') + '%' for word, _ in words] + [user_id, *scope_params, limit, offset]
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [
+            (Message._meta.pk.to_python(message_id), float(rank)) for message_id, rank in cursor.fetchall()
+        ]
+
+
+def rebuild_index():
+    """
+    Refills the SQLite FTS5 table from chats_message (after a VACUUM, or to repair it).
+    The PostgreSQL index needs no rebuilding.
+    """
+    if backend() != 'fts5':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, message_body, conversation, message_id) '
+            f'SELECT rowid, message_body, conversation_id, message_id FROM {Message._meta.db_table}'
+        )
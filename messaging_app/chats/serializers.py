@@ -1,4 +1,6 @@
+from django.conf import settings
 from rest_framework import serializers
+from rest_framework.reverse import reverse
 from .models import User, Conversation, Message
 
 # User Serializer
@@ -50,27 +52,42 @@ class MessageSerializer(serializers.ModelSerializer):
         read_only_fields = ['message_id', 'sent_at']
 
 
-# Conversation Serializer
-# This serializer handles the Conversation model, with nested relationships.
-# It exposes conversation_id, participants, name, created_at, updated_at, and messages.
-class ConversationSerializer(serializers.ModelSerializer):
+# Bulk Message Serializer
+# Validates one item of a bulk message upload (MessageViewSet.bulk).
+# 'conversation' is optional (it defaults to the conversation in the URL) and only
+# checked to be a UUID here: the view checks membership for all items at once,
+# instead of a PrimaryKeyRelatedField query per item.
+class BulkMessageSerializer(serializers.Serializer):
+    conversation = serializers.UUIDField(required=False)
+    message_body = serializers.CharField()
+
+
+# Conversation List Serializer
+# This serializer renders a conversation as an inbox entry: its participants, the
+# latest message and the requesting user's unread count, all read from the
+# denormalized columns on Conversation and ConversationParticipant (see chats/inbox.py).
+# ConversationViewSet uses it for the list action.
+class ConversationListSerializer(serializers.ModelSerializer):
     # 'participants' is a ManyToManyField to User.
     # We use UserSerializer(many=True) to serialize multiple User objects for participants.
     # read_only=True means participants cannot be added/removed directly via this serializer on creation/update.
     # If you need to manage participants via the serializer, you'd need to override create/update methods.
     participants = UserSerializer(many=True, read_only=True)
 
-    # 'messages' is a Reverse ForeignKey relationship from Message to Conversation.
-    # We use MessageSerializer(many=True) to serialize multiple Message objects.
-    # read_only=True means messages cannot be created/updated directly via this nested serializer.
-    # source='messages' refers to the related_name defined in the Message model's ForeignKey to Conversation.
-    messages = MessageSerializer(many=True, read_only=True, source='messages')
+    # The latest message, or null for a conversation without messages.
+    last_message = MessageSerializer(read_only=True)
+    # Number of messages the requesting user has not read yet.
+    # ConversationViewSet annotates it from the user's participant row.
+    unread_count = serializers.SerializerMethodField()
+    # Time of the latest message, or the creation time if there are none.
+    last_activity = serializers.SerializerMethodField()
+    # The full history is paged from the nested messages route.
+    messages_url = serializers.SerializerMethodField()
 
     # Example of using serializers.SerializerMethodField()
     # This field will return a custom value computed by a method on the serializer.
     # Here, it returns a comma-separated string of participant usernames.
     participant_usernames = serializers.SerializerMethodField()
-    # Another example: message_count = serializers.SerializerMethodField()
 
     class Meta:
         model = Conversation
@@ -79,20 +96,73 @@ class ConversationSerializer(serializers.ModelSerializer):
         # 'participants' will be a list of serialized User objects.
         # 'name' is the conversation name.
         # 'created_at' and 'updated_at' are timestamps.
-        # 'messages' will be a list of serialized Message objects.
+        # 'last_message', 'last_message_at', 'message_count' and 'unread_count'
+        # summarize the history; 'messages_url' pages through it.
         # 'participant_usernames' is our new custom field.
-        fields = ['conversation_id', 'participants', 'name', 'created_at', 'updated_at', 'messages', 'participant_usernames']
+        fields = [
+            'conversation_id', 'participants', 'name', 'created_at', 'updated_at',
+            'last_message', 'last_message_at', 'message_count', 'unread_count', 'last_activity',
+            'messages_url', 'participant_usernames',
+        ]
         # 'read_only_fields' ensures these fields cannot be updated via the serializer.
-        read_only_fields = ['conversation_id', 'created_at', 'updated_at']
+        # The history summary is maintained by chats.inbox only.
+        read_only_fields = ['conversation_id', 'created_at', 'updated_at', 'last_message_at', 'message_count']
+
+    def get_unread_count(self, obj):
+        unread = getattr(obj, 'unread_count', None)
+        if unread is None:
+            # Not loaded through ConversationViewSet (e.g. just created): read the participant row
+            user = getattr(self.context.get('request'), 'user', None)
+            unread = obj.memberships.filter(user_id=getattr(user, 'pk', None)).values_list(
+                'unread_count', flat=True
+            ).first() or 0
+        return unread
+
+    def get_last_activity(self, obj):
+        last_activity = getattr(obj, 'last_activity', None) or obj.last_message_at or obj.created_at
+        return serializers.DateTimeField().to_representation(last_activity)
+
+    def get_messages_url(self, obj):
+        return reverse(
+            'conversation-messages-list',
+            kwargs={'conversation_pk': obj.pk},
+            request=self.context.get('request'),
+        )
 
     # Method for participant_usernames SerializerMethodField
     def get_participant_usernames(self, obj):
         # 'obj' refers to the current Conversation instance being serialized
+        # participants.all() reads the list ConversationViewSet prefetched for
+        # the 'participants' field, so this does not run a query per conversation.
         return ", ".join([p.username for p in obj.participants.all()])
 
-    # Example method for message_count SerializerMethodField
-    # def get_message_count(self, obj):
-    #     return obj.messages.count()
+
+# Conversation Serializer
+# This serializer handles the Conversation model, with nested relationships.
+# It exposes everything ConversationListSerializer does plus the latest messages.
+class ConversationSerializer(ConversationListSerializer):
+    # How many of the latest messages are embedded in 'messages'.
+    # Override with CHATS_EMBEDDED_MESSAGES in settings; it is read on every use,
+    # so override_settings and runtime configuration apply.
+    @classmethod
+    def get_embedded_messages(cls):
+        return getattr(settings, 'CHATS_EMBEDDED_MESSAGES', 20)
+
+    # 'messages' embeds only the latest get_embedded_messages() messages, oldest first,
+    # so the payload does not grow with the conversation's history.
+    # The full history is paged from the nested route given by 'messages_url'.
+    messages = serializers.SerializerMethodField()
+
+    class Meta(ConversationListSerializer.Meta):
+        fields = ConversationListSerializer.Meta.fields + ['messages']
+
+    def get_messages(self, obj):
+        # 'recent_messages' is prefetched newest first by ConversationViewSet;
+        # fall back to a query for instances that were not loaded through it.
+        recent = getattr(obj, 'recent_messages', None)
+        if recent is None:
+            recent = obj.messages.select_related('sender').order_by('-sent_at')[:self.get_embedded_messages()]
+        return MessageSerializer(list(reversed(recent)), many=True, context=self.context).data
 
     # Example of using serializers.ValidationError in a custom validation method for the whole serializer
     # def validate(self, data):
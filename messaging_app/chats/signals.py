@@ -0,0 +1,105 @@
+# messaging_app/chats/signals.py
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import auth, list_cache
+from .inbox import record_messages
+from .membership import invalidate, Participant
+from .models import Conversation, ConversationParticipant, Message, User
+
+@receiver(m2m_changed, sender=Participant)
+def invalidate_membership_on_participants_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Drops the cached membership of every user whose conversations changed.
+    When reverse is False `instance` is a Conversation and pk_set holds user ids;
+    when reverse is True (user.conversations.add(...)) `instance` is the User.
+    """
+    if reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            invalidate(instance.pk)
+    elif action in ('post_add', 'post_remove'):
+        invalidate(*pk_set)
+    elif action == 'pre_clear':
+        # After the clear the former participants can no longer be looked up
+        instance._cleared_participant_ids = list(instance.participants.values_list('pk', flat=True))
+    elif action == 'post_clear':
+        invalidate(*getattr(instance, '_cleared_participant_ids', []))
+
+@receiver(m2m_changed, sender=Participant)
+def invalidate_conversation_lists_on_participants_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Participants are rendered in every participant's conversation list, so a change
+    invalidates the lists of the users added or removed and of those remaining.
+    The membership handler above has already stored the ids a clear removes.
+    """
+    if reverse:
+        if action == 'pre_clear':
+            instance._cleared_conversation_ids = list(instance.conversations.values_list('pk', flat=True))
+        elif action in ('post_add', 'post_remove', 'post_clear'):
+            conversation_ids = pk_set if action != 'post_clear' else getattr(instance, '_cleared_conversation_ids', [])
+            list_cache.invalidate_users(instance.pk)
+            list_cache.invalidate_conversations(conversation_ids)
+    elif action in ('post_add', 'post_remove'):
+        list_cache.invalidate_users(*pk_set)
+        list_cache.invalidate_conversations([instance.pk])
+    elif action == 'post_clear':
+        list_cache.invalidate_users(*getattr(instance, '_cleared_participant_ids', []))
+
+@receiver(post_save, sender=ConversationParticipant)
+@receiver(post_delete, sender=ConversationParticipant)
+def invalidate_membership_on_participant_row_change(sender, instance, raw=False, **kwargs):
+    """
+    Participant rows written through ConversationParticipant.objects rather than the
+    participants manager send no m2m_changed, so the same caches are dropped here.
+    """
+    if raw:
+        return
+    invalidate(instance.user_id)
+    list_cache.invalidate_users(instance.user_id)
+    list_cache.invalidate_conversations([instance.conversation_id])
+
+@receiver(post_save, sender=Conversation)
+def invalidate_conversation_lists_on_conversation_save(sender, instance, created, **kwargs):
+    """
+    A renamed conversation changes its participants' lists; a new one has none yet.
+    """
+    if not created:
+        list_cache.invalidate_conversations([instance.pk])
+
+@receiver(pre_delete, sender=Conversation)
+def invalidate_membership_on_conversation_delete(sender, instance, **kwargs):
+    """
+    Deleting a conversation removes its participant rows without m2m_changed,
+    which also leaves the participants' conversation lists out of date.
+    """
+    participant_ids = list(instance.participants.values_list('pk', flat=True))
+    invalidate(*participant_ids)
+    list_cache.invalidate_users(*participant_ids)
+
+@receiver(post_save, sender=Message)
+def update_inbox_on_message_create(sender, instance, created, raw=False, **kwargs):
+    """
+    Moves the conversation's last message and the participants' unread counters
+    forward for every newly created message (edits leave them alone, and so do
+    fixtures, whose conversations already carry their inbox columns).
+    """
+    if created and not raw:
+        record_messages([instance])
+
+@receiver(post_save, sender=Message)
+def invalidate_conversation_lists_on_message_edit(sender, instance, created, raw=False, **kwargs):
+    """
+    An edited message may be the last_message shown in the conversation lists.
+    New messages are handled by record_messages().
+    """
+    if not created and not raw:
+        list_cache.invalidate_conversations([instance.conversation_id])
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_authentication_on_user_change(sender, instance, **kwargs):
+    """
+    Drops the user's cached token resolutions (chats.auth) whenever the user changes,
+    so deactivation, permission and profile changes apply to the next request.
+    """
+    auth.invalidate_user(instance.pk)
@@ -0,0 +1,317 @@
+# messaging_app/chats/tasks.py
+"""
+A local background task queue: durable jobs in the chats_job table (chats.models.Job),
+run by a pool of worker threads, with no external broker.
+
+- register('name') registers a function taking the job's JSON payload.
+- enqueue() / enqueue_many() insert jobs in the caller's transaction, so they commit
+  or roll back with the change that needs them, and wake the workers through
+  transaction.on_commit().
+- Workers claim a due job with a conditional UPDATE, which at most one worker wins,
+  so any number of threads and processes can share the table. A finished job is
+  deleted. A failed one is retried after `backoff` * 2**(attempts - 1) seconds, and
+  after `max_attempts` attempts it stays in the table with status 'dead' for
+  inspection (admin) and requeue_dead(). A job whose worker died while running it is
+  claimed again once its lease (`lease` seconds) has run out, so a task must
+  tolerate running more than once; its database changes commit together with the
+  deletion of its job, though, so those are made once.
+
+Workers run in the web process (CHATS_TASK_WORKERS threads, started on the first
+commit that enqueues a job; 0 to disable) and/or in dedicated processes started with
+`python manage.py chats_worker`. Workers poll every `poll_interval` seconds for jobs
+enqueued by other processes and for retries that have become due.
+
+stats() reports the queue depth from the table; WorkerPool.counts() counts what the
+pool's workers have done.
+"""
+import logging
+import threading
+import traceback
+from collections import Counter
+from datetime import timedelta
+from typing import NamedTuple
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, connection, transaction
+from django.db.models import Count, Min, Q
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+# Worker threads started in each web process; 0 leaves jobs to `manage.py chats_worker`
+WORKERS = getattr(settings, 'CHATS_TASK_WORKERS', 2)
+# Attempts before a job is dead-lettered, and seconds before the first retry
+MAX_ATTEMPTS = getattr(settings, 'CHATS_TASK_MAX_ATTEMPTS', 5)
+BACKOFF = getattr(settings, 'CHATS_TASK_BACKOFF', 1.0)
+
+_registry = {}
+
+
+def register(name):
+    """
+    Decorator registering `func(payload)` as the task called `name`.
+    """
+    def decorator(func):
+        _registry[name] = func
+        return func
+    return decorator
+
+
+def enqueue(name, payload=None, delay=None):
+    """
+    Queues the task `name` with a JSON-serializable payload, in the current transaction.
+    """
+    return enqueue_many([(name, payload)], delay)[0]
+
+
+def enqueue_many(jobs, delay=None):
+    """
+    Queues several (name, payload) jobs with one INSERT per batch.
+    """
+    run_at = timezone.now() + (delay or timedelta())
+    for name, _ in jobs:
+        if name not in _registry:
+            raise ValueError(f'Unknown task {name!r}')
+    created = Job.objects.bulk_create([Job(name=name, payload=payload or {}, run_at=run_at) for name, payload in jobs])
+    transaction.on_commit(wake)
+    return created
+
+
+def requeue_dead(queryset=None):
+    """
+    Puts dead jobs (all of them, or those in `queryset`) back in the queue for a fresh
+    set of attempts. Returns how many were requeued.
+    """
+    queryset = Job.objects.all() if queryset is None else queryset
+    count = queryset.filter(status=Job.DEAD).update(status=Job.QUEUED, attempts=0, run_at=timezone.now())
+    if count:
+        transaction.on_commit(wake)
+    return count
+
+
+class QueueStats(NamedTuple):
+    """
+    Depth of the job queue: jobs due now, waiting for a retry or a delay, being run and
+    dead-lettered, and the age in seconds of the oldest due job (0 with none).
+    """
+    ready: int
+    scheduled: int
+    running: int
+    dead: int
+    oldest_ready_age: float
+
+
+def stats():
+    """
+    The queue depth, counted with one query.
+    """
+    now = timezone.now()
+    ready = Q(status=Job.QUEUED, run_at__lte=now)
+    counts = Job.objects.aggregate(
+        ready=Count('pk', filter=ready),
+        scheduled=Count('pk', filter=Q(status=Job.QUEUED, run_at__gt=now)),
+        running=Count('pk', filter=Q(status=Job.RUNNING)),
+        dead=Count('pk', filter=Q(status=Job.DEAD)),
+        oldest=Min('run_at', filter=ready),
+    )
+    oldest = counts.pop('oldest')
+    return QueueStats(**counts, oldest_ready_age=(now - oldest).total_seconds() if oldest else 0.0)
+
+
+class _LeaseLost(Exception):
+    """
+    A finished job's row was reclaimed by another worker before it could be deleted.
+    """
+
+
+class WorkerPool:
+    """
+    `workers` threads running due jobs until stop() is called.
+    run_pending() runs them in the calling thread instead.
+    """
+    def __init__(self, workers=WORKERS, poll_interval=1.0, lease=60, max_attempts=MAX_ATTEMPTS, backoff=BACKOFF):
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        # 'succeeded', 'retried' and 'dead' jobs since the pool was created, written by
+        # every worker thread under _counters_lock
+        self.counters = Counter()
+        self._counters_lock = threading.Lock()
+        self._threads = []
+        self._wakeup = threading.Condition()
+        self._pending_wakeups = 0
+        self._stopping = False
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            self._stopping = False
+            self._threads = [
+                threading.Thread(target=self._work, name=f'chats-worker-{i}', daemon=True) for i in range(self.workers)
+            ]
+            for thread in self._threads:
+                thread.start()
+
+    def stop(self, timeout=None):
+        with self._lock:
+            threads, self._threads = self._threads, []
+            self._stopping = True
+        self.wake()
+        for thread in threads:
+            thread.join(timeout)
+
+    @property
+    def running(self):
+        return bool(self._threads)
+
+    def wake(self):
+        with self._wakeup:
+            self._pending_wakeups += 1
+            self._wakeup.notify_all()
+
+    def counts(self):
+        """
+        A copy of `counters`, safe to read while the workers run.
+        """
+        with self._counters_lock:
+            return dict(self.counters)
+
+    def _count(self, outcome):
+        with self._counters_lock:
+            self.counters[outcome] += 1
+
+    def run_pending(self, limit=None):
+        """
+        Runs due jobs in this thread until there are none left (or `limit` have run).
+        Returns how many ran.
+        """
+        count = 0
+        while (limit is None or count < limit) and self.run_one():
+            count += 1
+        return count
+
+    def _work(self):
+        # Whether the last attempt to use the job table failed, so an outage is logged once
+        failing = False
+        try:
+            while not self._stopping:
+                try:
+                    ran = self.run_one()
+                    failing = False
+                    if ran:
+                        continue
+                except DatabaseError as error:
+                    # The database is unavailable or the table locked; try again after a pause
+                    if not failing:
+                        logger.warning('Task worker cannot use the job table, retrying: %s', error)
+                    failing = True
+                except Exception:
+                    logger.exception('Task worker could not claim or update a job')
+                # Idle: let Django drop a connection past CONN_MAX_AGE or left unusable
+                close_old_connections()
+                with self._wakeup:
+                    if not self._pending_wakeups and not self._stopping:
+                        self._wakeup.wait(self.poll_interval)
+                    self._pending_wakeups = 0
+        finally:
+            connection.close()
+
+    def claim(self):
+        """
+        Marks the oldest due job as running under this worker's lease and returns it, or None.
+        """
+        now = timezone.now()
+        due = Job.objects.filter(
+            Q(status=Job.QUEUED, run_at__lte=now) | Q(status=Job.RUNNING, locked_until__lt=now)
+        ).order_by('run_at', 'pk')
+        for job in due[:5]:
+            # Whoever changes the row first gets the job; the others try the next one
+            claimed = Job.objects.filter(pk=job.pk, status=job.status, attempts=job.attempts).update(
+                status=Job.RUNNING, attempts=job.attempts + 1, locked_until=now + timedelta(seconds=self.lease),
+            )
+            if claimed:
+                job.status, job.attempts = Job.RUNNING, job.attempts + 1
+                return job
+        return None
+
+    def run_one(self):
+        """
+        Claims and runs one due job. Returns False when there was none.
+        """
+        job = self.claim()
+        if job is None:
+            return False
+        # Only while the row is still running under this claim: once the lease has run
+        # out another worker may have reclaimed the job, and it now owns the row
+        owned = Job.objects.filter(pk=job.pk, status=Job.RUNNING, attempts=job.attempts)
+        try:
+            handler = _registry.get(job.name)
+            if handler is None:
+                raise LookupError(f'Unknown task {job.name!r}')
+            if job.attempts > self.max_attempts:
+                # Reclaimed after its workers died on every attempt
+                raise RuntimeError(f'Worker lost the job {job.attempts - 1} times')
+            # The job row is deleted in the task's own transaction, so the task's
+            # database changes are made exactly once
+            with transaction.atomic():
+                handler(job.payload)
+                deleted, _ = owned.delete()
+                if not deleted:
+                    # Roll the task's changes back: the worker that reclaimed it makes them
+                    raise _LeaseLost
+        except _LeaseLost:
+            logger.warning('Task %s (job %s) outlived its lease and was reclaimed', job.name, job.pk)
+        except Exception:
+            error = traceback.format_exc()
+            if job.attempts >= self.max_attempts:
+                if owned.update(status=Job.DEAD, locked_until=None, last_error=error):
+                    logger.error('Task %s (job %s) failed %s times, dead-lettered', job.name, job.pk, job.attempts)
+                    self._count('dead')
+                else:
+                    logger.warning('Task %s (job %s) failed after it was reclaimed', job.name, job.pk)
+            else:
+                delay = timedelta(seconds=self.backoff * 2 ** (job.attempts - 1))
+                if owned.update(
+                    status=Job.QUEUED, run_at=timezone.now() + delay, locked_until=None, last_error=error,
+                ):
+                    logger.warning('Task %s (job %s) failed, retrying in %s', job.name, job.pk, delay)
+                    self._count('retried')
+                else:
+                    logger.warning('Task %s (job %s) failed after it was reclaimed', job.name, job.pk)
+        else:
+            self._count('succeeded')
+        return True
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """
+    This process's worker pool, created (not started) on first use.
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = WorkerPool()
+    return _pool
+
+
+def wake():
+    """
+    Tells this process's workers that jobs were committed, starting them if needed.
+    """
+    pool = get_pool()
+    if not pool.running:
+        if not pool.workers:
+            return
+        pool.start()
+    pool.wake()
@@ -1,3 +1,1715 @@
-from django.test import TestCase
+import json
+import statistics
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import OperationalError, connection, connections
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.tokens import AccessToken
+
+from . import archive, auth, broker, inbox, list_cache, membership, notifications, pagination, tasks
+from . import search as message_search
+from .models import User, ArchivedMessage, Conversation, ConversationParticipant, Job, Message
+from .renderers import FastJSONRenderer
+from .views import ConversationViewSet, MessageViewSet
+
+
+class ConversationQueryCountTest(TestCase):
+    """
+    Listing or retrieving conversations must cost a fixed number of queries,
+    no matter how many conversations, participants and messages there are.
+    """
+    def setUp(self):
+        """
+        Create the requesting user and an authenticated API client.
+        """
+        self.user = User.objects.create_user(username='alice', password='password123')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def create_conversations(self, count, participants=3, messages=4):
+        """
+        Create `count` conversations with the requesting user, extra participants and messages.
+        """
+        start = Conversation.objects.count()
+        for i in range(start, start + count):
+            conversation = Conversation.objects.create(name=f'Conversation {i}')
+            others = [
+                User.objects.create_user(username=f'user-{i}-{j}', password='password123')
+                for j in range(participants - 1)
+            ]
+            conversation.participants.add(self.user, *others)
+            for j in range(messages):
+                Message.objects.create(
+                    conversation=conversation,
+                    sender=others[j % len(others)],
+                    message_body=f'Message {j}',
+                )
+
+    def test_list_query_count_is_constant(self):
+        """
+        The list endpoint runs the same queries for 2 and for 20 conversations:
+        the user's conversation ids (chats.membership, whose list cache versions the
+        cached list records), conversations with their last message and its sender,
+        and participants.
+        """
+        url = reverse('conversation-list')
+        for count in (2, 18):
+            self.create_conversations(count)
+            with self.assertNumQueries(3):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 20)
+        first = response.data[0]
+        self.assertEqual(len(first['participants']), 3)
+        self.assertEqual(first['last_message']['message_body'], 'Message 3')
+        self.assertEqual(first['unread_count'], 4)
+        self.assertNotIn('messages', first)
+        self.assertIn('alice', first['participant_usernames'])
+
+    def test_retrieve_query_count(self):
+        """
+        Retrieving one conversation also reuses the prefetched participants
+        for the permission check and participant_usernames.
+        """
+        self.create_conversations(1, participants=10, messages=25)
+        conversation = Conversation.objects.get()
+        url = reverse('conversation-detail', args=[conversation.pk])
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['messages']), 20)
+        self.assertEqual(response.data['message_count'], 25)
+        self.assertEqual(
+            {message['sender'] for message in response.data['messages']},
+            {f'user-0-{j}' for j in range(9)},
+        )
+
+
+class BoundedMessageEmbeddingTest(TestCase):
+    """
+    Conversations embed only their latest messages plus a message count and
+    the last activity time; the nested messages route serves the full history.
+    """
+    def setUp(self):
+        """
+        Create two participants, a conversation and an authenticated API client.
+        """
+        self.user = User.objects.create_user(username='alice', password='password123')
+        self.other = User.objects.create_user(username='bob', password='password123')
+        self.conversation = Conversation.objects.create(name='History')
+        self.conversation.participants.add(self.user, self.other)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('conversation-detail', args=[self.conversation.pk])
+
+    def add_messages(self, count):
+        """
+        Bulk-insert `count` messages, one second apart, after the existing ones.
+        """
+        start = Message.objects.count()
+        base = timezone.now() - timedelta(days=1)
+        messages = Message.objects.bulk_create([
+            Message(conversation=self.conversation, sender=self.other, message_body=f'Message {i:06d}')
+            for i in range(start, start + count)
+        ])
+        # sent_at is auto_now_add, so spread the timestamps out afterwards
+        for i, message in enumerate(messages, start):
+            message.sent_at = base + timedelta(seconds=i)
+        Message.objects.bulk_update(messages, ['sent_at'])
+        # bulk_create sends no post_save, so update the inbox columns directly
+        inbox.record_messages(messages)
+
+    def test_embeds_latest_messages_oldest_first(self):
+        """
+        Only the last 20 messages are embedded, in chronological order.
+        """
+        self.add_messages(50)
+        data = self.client.get(self.url).data
+        self.assertEqual(
+            [message['message_body'] for message in data['messages']],
+            [f'Message {i:06d}' for i in range(30, 50)],
+        )
+        self.assertEqual(data['message_count'], 50)
+        latest = Message.objects.order_by('-sent_at').first()
+        self.assertEqual(parse_datetime(data['last_activity']), latest.sent_at)
+        self.assertTrue(data['messages_url'].endswith(
+            f'/conversations/{self.conversation.pk}/messages/'))
+
+    @override_settings(CHATS_EMBEDDED_MESSAGES=5)
+    def test_embedded_messages_setting(self):
+        """
+        CHATS_EMBEDDED_MESSAGES is read per request.
+        """
+        self.add_messages(10)
+        data = self.client.get(self.url).data
+        self.assertEqual(
+            [message['message_body'] for message in data['messages']],
+            [f'Message {i:06d}' for i in range(5, 10)],
+        )
+
+    def test_empty_conversation(self):
+        """
+        Without messages the last activity is the creation time.
+        """
+        data = self.client.get(self.url).data
+        self.assertEqual(data['messages'], [])
+        self.assertEqual(data['message_count'], 0)
+        self.assertEqual(data['last_activity'], data['created_at'])
+
+    def test_nested_route_serves_full_history(self):
+        """
+        The nested messages route pages through this conversation's messages only.
+        """
+        self.add_messages(45)
+        elsewhere = Conversation.objects.create(name='Elsewhere')
+        elsewhere.participants.add(self.user)
+        Message.objects.create(conversation=elsewhere, sender=self.user, message_body='Not here')
+        url = reverse('conversation-messages-list', kwargs={'conversation_pk': self.conversation.pk})
+        data = self.client.get(url, {'page_size': 100}).data
+        self.assertEqual(data['total_count'], 45)
+        self.assertEqual(len(data['results']), 45)
+
+    def test_response_size_and_latency_stay_flat(self):
+        """
+        Growing the history from 25 to 2,500 messages leaves the payload size
+        unchanged and the query count constant; latency stays within a small factor.
+        """
+        def measure():
+            timings = []
+            for _ in range(5):
+                started = time.perf_counter()
+                response = self.client.get(self.url)
+                timings.append(time.perf_counter() - started)
+            return len(response.content), statistics.median(timings)
+
+        self.add_messages(25)
+        small_size, small_latency = measure()
+        self.add_messages(2475)
+        with self.assertNumQueries(3):
+            self.client.get(self.url)
+        large_size, large_latency = measure()
+        # Only message_count changes ("25" -> "2500")
+        self.assertLessEqual(abs(large_size - small_size), 4)
+        self.assertLess(large_latency, small_latency * 4 + 0.05)
+
+
+class MessageCursorPaginationTest(TestCase):
+    """
+    The nested messages route pages by (sent_at, message_id) cursor.
+    """
+    def setUp(self):
+        """
+        Create a conversation with 45 messages, many sharing the same sent_at.
+        """
+        cache.clear()
+        self.user = User.objects.create_user(username='alice', password='password123')
+        self.conversation = Conversation.objects.create(name='Cursor')
+        self.conversation.participants.add(self.user)
+        messages = Message.objects.bulk_create([
+            Message(conversation=self.conversation, sender=self.user, message_body=f'Message {i}')
+            for i in range(45)
+        ])
+        # Groups of five messages share a timestamp, so message_id must break ties
+        base = timezone.now() - timedelta(hours=1)
+        for i, message in enumerate(messages):
+            message.sent_at = base + timedelta(seconds=i // 5)
+        Message.objects.bulk_update(messages, ['sent_at'])
+        self.expected = [
+            str(pk) for pk in Message.objects.order_by('sent_at', 'message_id').values_list('message_id', flat=True)
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('conversation-messages-list', kwargs={'conversation_pk': self.conversation.pk})
+
+    def walk(self, url, link):
+        """
+        Follow `link` ('next' or 'previous') from url, returning every page's message ids.
+        """
+        pages = []
+        while url:
+            data = self.client.get(url).data
+            pages.append([message['message_id'] for message in data['results']])
+            url = data[link]
+        return pages
+
+    def test_forward_walk_visits_every_message_once(self):
+        """
+        Following next links returns every message exactly once, in order.
+        """
+        pages = self.walk(self.url + '?page_size=10', 'next')
+        self.assertEqual([len(page) for page in pages], [10, 10, 10, 10, 5])
+        self.assertEqual([pk for page in pages for pk in page], self.expected)
+
+    def test_backward_walk_mirrors_forward_walk(self):
+        """
+        Following previous links from the last page returns the same pages in reverse.
+        """
+        forward = self.walk(self.url + '?page_size=10', 'next')
+        last_page_url = self.url + '?page_size=10'
+        for _ in range(len(forward) - 1):
+            last_page_url = self.client.get(last_page_url).data['next']
+        backward = self.walk(last_page_url, 'previous')
+        self.assertEqual(backward, list(reversed(forward)))
+
+    def test_first_page_has_no_previous_link(self):
+        """
+        The first page links forward only and reports the total count.
+        """
+        data = self.client.get(self.url).data
+        self.assertIsNone(data['previous'])
+        self.assertIsNotNone(data['next'])
+        self.assertEqual(len(data['results']), 20)
+        self.assertEqual(data['total_count'], 45)
+
+    def test_count_is_cached_between_requests(self):
+        """
+        The second request reuses the cached count instead of running COUNT(*).
+        """
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url)
+        self.assertFalse(any('COUNT(' in query['sql'] for query in queries.captured_queries))
+
+    def test_invalid_cursor(self):
+        """
+        A malformed cursor is rejected with 404, like DRF's own cursor pagination.
+        """
+        response = self.client.get(self.url, {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 404)
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN output is SQLite-specific')
+class QueryPlanRegressionTest(TestCase):
+    """
+    The hot list queries of ConversationViewSet and MessageViewSet must reach the
+    message and participant tables through an index (SEARCH), never a full SCAN,
+    and the message history must be read in index order without a sort.
+    """
+    def setUp(self):
+        """
+        Create a user with a conversation holding a message.
+        """
+        self.user = User.objects.create_user(username='alice', password='password123')
+        self.conversation = Conversation.objects.create(name='Plans')
+        self.conversation.participants.add(self.user)
+        Message.objects.create(conversation=self.conversation, sender=self.user, message_body='Hello')
+
+    def get_queryset(self, viewset_class, action='list', **kwargs):
+        """
+        The queryset `viewset_class` builds for an `action` request by self.user.
+        """
+        request = Request(APIRequestFactory().get('/'))
+        request.user = self.user
+        view = viewset_class(request=request, kwargs=kwargs, format_kwarg=None, action=action)
+        return view.get_queryset()
+
+    def query_plan(self, queryset):
+        """
+        The detail column of EXPLAIN QUERY PLAN for the queryset's SQL.
+        """
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assertSearches(self, plan, *tables):
+        """
+        Every step touching one of `tables` must be an indexed SEARCH.
+        """
+        for step in plan:
+            for table in tables:
+                if f' {table} ' in f' {step} ':
+                    self.assertTrue(step.startswith('SEARCH') and 'INDEX' in step, f'{step!r} in {plan}')
+
+    def test_conversation_list_uses_indexes(self):
+        """
+        The conversation list finds the user's conversations through the
+        participants index and their last message by primary key.
+        """
+        plan = self.query_plan(self.get_queryset(ConversationViewSet))
+        self.assertSearches(plan, 'chats_conversation_participants', 'chats_message')
+        # The user's participant rows carry unread_count, so the user_id index is
+        # as good as the covering (user_id, conversation_id) one here
+        self.assertTrue(any('chats_conversation_participants' in step and '(user_id=?)' in step for step in plan), plan)
+
+    def test_latest_messages_prefetch_uses_index(self):
+        """
+        The per-conversation latest messages prefetch reads the (conversation, sent_at) index.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            list(self.get_queryset(ConversationViewSet, action='retrieve'))
+        # The sliced Prefetch numbers each conversation's messages with ROW_NUMBER()
+        message_sql = [query['sql'] for query in queries.captured_queries if 'ROW_NUMBER' in query['sql']]
+        self.assertEqual(len(message_sql), 1)
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + message_sql[0])
+            plan = [row[-1] for row in cursor.fetchall()]
+        self.assertSearches(plan, 'chats_message')
+
+    def test_message_history_page_uses_index_order(self):
+        """
+        A cursor page of the nested messages route seeks into chats_msg_conv_sent_idx
+        and needs no sort for ORDER BY sent_at, message_id.
+        """
+        queryset = self.get_queryset(MessageViewSet, conversation_pk=self.conversation.pk)
+        page = queryset.order_by('sent_at', 'message_id')[:21]
+        plan = self.query_plan(page)
+        self.assertSearches(plan, 'chats_message', 'chats_conversation_participants')
+        self.assertTrue(any('chats_msg_conv_sent_idx' in step for step in plan), plan)
+        self.assertFalse(any('TEMP B-TREE FOR ORDER BY' in step for step in plan), plan)
+
+
+class MembershipServiceTest(TestCase):
+    """
+    chats.membership answers participant checks with EXISTS or a cached id set,
+    and drops the cache whenever participants change.
+    """
+    def setUp(self):
+        """
+        Create two users and a conversation with only the first one in it.
+        """
+        cache.clear()
+        self.user = User.objects.create_user(username='alice', password='password123')
+        self.other = User.objects.create_user(username='bob', password='password123')
+        self.conversation = Conversation.objects.create(name='Members')
+        self.conversation.participants.add(self.user)
+
+    def test_exists_query_without_cache(self):
+        """
+        An uncached check is a single EXISTS query, not a participant list.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            self.assertTrue(membership.is_participant(self.user, self.conversation))
+        self.assertEqual(len(queries), 1)
+        self.assertIn('LIMIT 1', queries[0]['sql'])
+        self.assertFalse(membership.is_participant(self.other, self.conversation.pk))
+
+    def test_request_memo(self):
+        """
+        Repeated checks within one request run one query.
+        """
+        request = Request(APIRequestFactory().get('/'))
+        with self.assertNumQueries(1):
+            for _ in range(3):
+                self.assertTrue(membership.is_participant(self.user, self.conversation.pk, request))
+
+    def test_cached_id_set(self):
+        """
+        Once a user's conversation ids are cached, checks need no query.
+        """
+        membership.conversation_ids(self.user)
+        with self.assertNumQueries(0):
+            self.assertTrue(membership.is_participant(self.user, self.conversation.pk))
+            self.assertFalse(membership.is_participant(self.user, Conversation().pk))
+
+    def test_invalidated_on_participant_changes(self):
+        """
+        Adding, removing and clearing participants, from either side, refreshes the cache.
+        """
+        membership.conversation_ids(self.other)
+        self.conversation.participants.add(self.other)
+        self.assertTrue(membership.is_participant(self.other, self.conversation.pk))
+
+        membership.conversation_ids(self.other)
+        self.conversation.participants.remove(self.other)
+        self.assertFalse(membership.is_participant(self.other, self.conversation.pk))
+
+        membership.conversation_ids(self.other)
+        self.other.conversations.add(self.conversation)
+        self.assertTrue(membership.is_participant(self.other, self.conversation.pk))
+
+        membership.conversation_ids(self.other)
+        self.conversation.participants.clear()
+        self.assertFalse(membership.is_participant(self.other, self.conversation.pk))
+
+    def test_invalidated_on_participant_row_changes(self):
+        """
+        Participant rows created or deleted through the through model refresh the cache.
+        """
+        membership.conversation_ids(self.other)
+        row = ConversationParticipant.objects.create(conversation=self.conversation, user=self.other)
+        self.assertTrue(membership.is_participant(self.other, self.conversation.pk))
+
+        membership.conversation_ids(self.other)
+        row.delete()
+        self.assertFalse(membership.is_participant(self.other, self.conversation.pk))
+
+    def test_invalidated_again_on_commit(self):
+        """
+        A set cached from the old rows between the change and the commit is dropped on commit.
+        """
+        with self.captureOnCommitCallbacks(execute=True):
+            self.conversation.participants.remove(self.user)
+            # Another request re-caches the set before the change commits
+            cache.set(membership.cache_key(self.user.pk), frozenset([str(self.conversation.pk)]))
+        self.assertFalse(membership.is_participant(self.user, self.conversation.pk))
+
+    def test_invalidated_on_conversation_delete(self):
+        """
+        Deleting a conversation removes it from its participants' cached sets.
+        """
+        pk = self.conversation.pk
+        self.assertIn(str(pk), membership.conversation_ids(self.user))
+        self.conversation.delete()
+        self.assertNotIn(str(pk), membership.conversation_ids(self.user))
+
+    def test_message_create_checks_membership(self):
+        """
+        Participants can post messages; other users get 403.
+        """
+        client = APIClient()
+        url = reverse('conversation-messages-list', kwargs={'conversation_pk': self.conversation.pk})
+        payload = {'conversation': str(self.conversation.pk), 'message_body': 'Hi'}
+        client.force_authenticate(user=self.user)
+        self.assertEqual(client.post(url, payload).status_code, 201)
+        client.force_authenticate(user=self.other)
+        self.assertEqual(client.post(url, payload).status_code, 403)
+        self.assertEqual(Message.objects.count(), 1)
+
+
+class InboxColumnsTest(TestCase):
+    """
+    Creating messages keeps Conversation.last_message, last_message_at, message_count
+    and the participants' unread counters current, and the conversation list is
+    served from those columns.
+    """
+    def setUp(self):
+        """
+        Create three participants, a conversation and API clients for two of them.
+        """
+        self.alice = User.objects.create_user(username='alice', password='password123')
+        self.bob = User.objects.create_user(username='bob', password='password123')
+        self.carol = User.objects.create_user(username='carol', password='password123')
+        self.conversation = Conversation.objects.create(name='Inbox')
+        self.conversation.participants.add(self.alice, self.bob, self.carol)
+        self.alice_client = APIClient()
+        self.alice_client.force_authenticate(user=self.alice)
+        self.bob_client = APIClient()
+        self.bob_client.force_authenticate(user=self.bob)
+        self.messages_url = reverse('conversation-messages-list', kwargs={'conversation_pk': self.conversation.pk})
+
+    def post(self, client, body):
+        """
+        Post a message to the conversation and return its id.
+        """
+        response = client.post(self.messages_url, {'conversation': str(self.conversation.pk), 'message_body': body})
+        self.assertEqual(response.status_code, 201)
+        return response.data['message_id']
+
+    def unread(self):
+        """
+        Every participant's unread counter by username.
+        """
+        return dict(ConversationParticipant.objects.filter(conversation=self.conversation).values_list(
+            'user__username', 'unread_count'
+        ))
+
+    def test_message_create_updates_columns(self):
+        """
+        Posting moves last_message forward and counts the message as unread for everyone but its sender.
+        """
+        self.post(self.bob_client, 'One')
+        last = self.post(self.bob_client, 'Two')
+        self.post(self.alice_client, 'Three')
+        self.conversation.refresh_from_db()
+        self.assertEqual(self.conversation.message_count, 3)
+        self.assertEqual(self.conversation.last_message.message_body, 'Three')
+        self.assertEqual(self.conversation.last_message_at, self.conversation.last_message.sent_at)
+        self.assertEqual(self.unread(), {'alice': 2, 'bob': 1, 'carol': 3})
+        self.assertNotEqual(last, str(self.conversation.last_message_id))
+
+    def test_mark_read(self):
+        """
+        The read action resets only the requesting user's counter.
+        """
+        self.post(self.bob_client, 'Hello')
+        url = reverse('conversation-read', args=[self.conversation.pk])
+        self.assertEqual(self.alice_client.post(url).status_code, 204)
+        self.assertEqual(self.unread(), {'alice': 0, 'bob': 0, 'carol': 1})
+        listed = self.alice_client.get(reverse('conversation-list')).data[0]
+        self.assertEqual(listed['unread_count'], 0)
+
+    def test_record_messages_batch(self):
+        """
+        A bulk batch from several senders is folded in with three updates,
+        and an older batch never moves last_message backwards.
+        """
+        now = timezone.now()
+        newer = Message.objects.bulk_create([
+            Message(conversation=self.conversation, sender=sender, message_body=body)
+            for sender, body in ((self.alice, 'A'), (self.bob, 'B'), (self.bob, 'C'))
+        ])
+        for i, message in enumerate(newer):
+            message.sent_at = now + timedelta(seconds=i)
+        with CaptureQueriesContext(connection) as queries:
+            inbox.record_messages(newer)
+        self.assertEqual(sum(query['sql'].startswith('UPDATE') for query in queries.captured_queries), 3)
+        older = Message.objects.create(conversation=self.conversation, sender=self.carol, message_body='Old')
+        older.sent_at = now - timedelta(hours=1)
+        inbox.record_messages([older])
+        self.conversation.refresh_from_db()
+        # 'Old' is counted twice: by its own post_save and by the call above
+        self.assertEqual(self.conversation.message_count, 5)
+        self.assertEqual(self.unread(), {'alice': 4, 'bob': 3, 'carol': 3})
+        self.assertEqual(self.conversation.last_message, newer[-1])
+
+    def test_delete_falls_back_to_previous_message(self):
+        """
+        Deleting the last message makes the one before it the last message again.
+        """
+        first = self.post(self.bob_client, 'First')
+        second = self.post(self.bob_client, 'Second')
+        url = reverse('conversation-messages-detail', kwargs={'conversation_pk': self.conversation.pk, 'pk': second})
+        self.assertEqual(self.bob_client.delete(url).status_code, 204)
+        self.conversation.refresh_from_db()
+        self.assertEqual(str(self.conversation.last_message_id), first)
+        self.assertEqual(self.conversation.message_count, 1)
+
+    def test_list_is_ordered_and_served_from_columns(self):
+        """
+        The most recently active conversation comes first, and listing reads
+        messages only through the last_message key: no scan, count or max.
+        """
+        quiet = Conversation.objects.create(name='Quiet')
+        quiet.participants.add(self.alice)
+        self.post(self.bob_client, 'Latest')
+        with CaptureQueriesContext(connection) as queries:
+            data = self.alice_client.get(reverse('conversation-list')).data
+        self.assertEqual([entry['name'] for entry in data], ['Inbox', 'Quiet'])
+        self.assertEqual(data[0]['last_message']['sender'], 'bob')
+        self.assertIsNone(data[1]['last_message'])
+        for query in queries.captured_queries:
+            self.assertNotIn('FROM "chats_message"', query['sql'])
+            self.assertNotIn('COUNT(', query['sql'])
+            self.assertNotIn('MAX(', query['sql'])
+
+
+class BulkMessageCreateTest(TestCase):
+    """
+    The bulk action creates many messages in one request, checking membership once
+    and reporting a result per item.
+    """
+    def setUp(self):
+        """
+        Create a user in two conversations and a conversation they are not in.
+        """
+        cache.clear()
+        self.user = User.objects.create_user(username='alice', password='password123')
+        self.other = User.objects.create_user(username='bob', password='password123')
+        self.first = Conversation.objects.create(name='First')
+        self.first.participants.add(self.user, self.other)
+        self.second = Conversation.objects.create(name='Second')
+        self.second.participants.add(self.user)
+        self.outside = Conversation.objects.create(name='Outside')
+        self.outside.participants.add(self.other)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('conversation-messages-bulk', kwargs={'conversation_pk': self.first.pk})
+
+    def test_per_item_results(self):
+        """
+        Valid items for either conversation are created; invalid and foreign ones are reported.
+        """
+        response = self.client.post(self.url, [
+            {'message_body': 'One'},
+            {'message_body': 'Two', 'conversation': str(self.second.pk)},
+            {'message_body': ''},
+            {'message_body': 'Nope', 'conversation': str(self.outside.pk)},
+            {'message_body': 'Three'},
+        ], format='json')
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual((response.data['created'], response.data['failed']), (3, 2))
+        results = response.data['results']
+        self.assertEqual([result['status'] for result in results], [201, 201, 400, 403, 201])
+        self.assertIn('message_body', results[2]['errors'])
+        self.assertEqual(results[1]['conversation'], str(self.second.pk))
+        self.assertEqual(
+            list(Message.objects.filter(conversation=self.first).order_by('message_body').values_list(
+                'message_body', flat=True
+            )),
+            ['One', 'Three'],
+        )
+        self.assertFalse(Message.objects.filter(conversation=self.outside).exists())
+        # bulk_create sends no signals; the inbox columns are updated all the same
+        self.first.refresh_from_db()
+        self.assertEqual(self.first.message_count, 2)
+        self.assertEqual(
+            ConversationParticipant.objects.get(conversation=self.first, user=self.other).unread_count, 2
+        )
+
+    def test_query_count_does_not_grow_with_items(self):
+        """
+        10 and 150 messages cost the same queries: one membership lookup, one INSERT
+        (SQLite fits 199 five-column rows in one) and the inbox updates. Cached
+        conversation lists are invalidated by conversation, without a query.
+        """
+        def captured(size):
+            cache.clear()
+            payload = [{'message_body': f'Message {i}'} for i in range(size)]
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post(self.url, payload, format='json')
+            self.assertEqual(response.status_code, 201)
+            return [query['sql'].split()[0] for query in queries.captured_queries]
+
+        small = captured(10)
+        self.assertEqual(small, captured(150))
+        self.assertEqual((small.count('SELECT'), small.count('INSERT'), small.count('UPDATE')), (1, 1, 3))
+        self.assertEqual(Message.objects.count(), 160)
+
+    def test_rejects_malformed_requests(self):
+        """
+        A body that is not a list, or one over the size limit, is rejected as a whole.
+        """
+        response = self.client.post(self.url, {'message_body': 'One'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        with override_settings(CHATS_BULK_MAX_MESSAGES=2):
+            response = self.client.post(self.url, [{'message_body': 'x'}] * 3, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Message.objects.exists())
+
+
+class ConversationListCacheTest(TestCase):
+    """
+    Each user's serialized conversation list is cached until a conversation,
+    its participants or its messages change.
+    """
+    def setUp(self):
+        """
+        Create two participants of a conversation and a client for each.
+        """
+        cache.clear()
+        self.alice = User.objects.create_user(username='alice', password='password123')
+        self.bob = User.objects.create_user(username='bob', password='password123')
+        self.conversation = Conversation.objects.create(name='Cached')
+        self.conversation.participants.add(self.alice, self.bob)
+        self.alice_client = APIClient()
+        self.alice_client.force_authenticate(user=self.alice)
+        self.bob_client = APIClient()
+        self.bob_client.force_authenticate(user=self.bob)
+        self.url = reverse('conversation-list')
+
+    def get(self, client):
+        """
+        Fetch the list, returning (X-Cache header, data).
+        """
+        response = client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return response['X-Cache'], response.data
+
+    def test_second_request_is_a_hit_without_queries(self):
+        """
+        A repeated request is served from the cache, per user.
+        """
+        self.assertEqual(self.get(self.alice_client)[0], 'MISS')
+        with self.assertNumQueries(0):
+            state, data = self.get(self.alice_client)
+        self.assertEqual(state, 'HIT')
+        self.assertEqual(data[0]['name'], 'Cached')
+        self.assertEqual(self.get(self.bob_client)[0], 'MISS')
+
+    def test_new_message_invalidates_every_participant(self):
+        """
+        Posting a message refreshes both participants' lists.
+        """
+        self.get(self.alice_client)
+        self.get(self.bob_client)
+        Message.objects.create(conversation=self.conversation, sender=self.bob, message_body='New')
+        state, data = self.get(self.alice_client)
+        self.assertEqual((state, data[0]['unread_count']), ('MISS', 1))
+        state, data = self.get(self.bob_client)
+        self.assertEqual((state, data[0]['last_message']['message_body']), ('MISS', 'New'))
+
+    def test_conversation_and_participant_changes_invalidate(self):
+        """
+        Renaming, adding or removing participants and deleting all refresh the lists.
+        """
+        carol = User.objects.create_user(username='carol', password='password123')
+        carol_client = APIClient()
+        carol_client.force_authenticate(user=carol)
+        self.assertEqual(self.get(carol_client)[1], [])
+
+        self.conversation.participants.add(carol)
+        self.assertEqual(len(self.get(carol_client)[1]), 1)
+        self.assertEqual(len(self.get(self.alice_client)[1][0]['participants']), 3)
+
+        self.conversation.name = 'Renamed'
+        self.conversation.save()
+        self.assertEqual(self.get(self.bob_client)[1][0]['name'], 'Renamed')
+
+        carol.conversations.remove(self.conversation)
+        self.assertEqual(self.get(carol_client)[1], [])
+        self.assertEqual(len(self.get(self.alice_client)[1][0]['participants']), 2)
+
+        self.conversation.delete()
+        self.assertEqual(self.get(self.alice_client)[1], [])
+
+    def test_new_message_bumps_one_version(self):
+        """
+        A post invalidates the lists through one counter for its conversation, whatever
+        the number of participants.
+        """
+        others = [User.objects.create_user(username=f'member-{i}', password='password123') for i in range(5)]
+        self.conversation.participants.add(*others)
+        self.get(self.alice_client)
+        with mock.patch.object(cache, 'incr', wraps=cache.incr) as incr:
+            Message.objects.create(conversation=self.conversation, sender=self.bob, message_body='New')
+        bumped = [call.args[0] for call in incr.call_args_list if ':stats:' not in call.args[0]]
+        self.assertEqual(bumped, [list_cache.conversation_version_key(self.conversation.pk)])
+        self.assertEqual(self.get(self.alice_client)[0], 'MISS')
+        self.assertEqual(self.get(self.alice_client)[0], 'HIT')
+
+    def test_bump_is_repeated_on_commit(self):
+        """
+        Inside a transaction the invalidation runs again once it commits.
+        """
+        with self.captureOnCommitCallbacks() as callbacks:
+            list_cache.invalidate_users(self.alice.pk)
+        self.assertEqual(len(callbacks), 1)
+
+    def test_cache_stats(self):
+        """
+        Staff users can read the hit rate; others cannot.
+        """
+        list_cache.reset_stats()
+        for _ in range(4):
+            self.get(self.alice_client)
+        stats_url = reverse('conversation-cache-stats')
+        self.assertEqual(self.alice_client.get(stats_url).status_code, 403)
+        self.alice.is_staff = True
+        self.alice.save()
+        data = self.alice_client.get(stats_url).data
+        self.assertEqual((data['hits'], data['misses']), (3, 1))
+        self.assertEqual(data['hit_rate'], 0.75)
+
+
+class MessageVisibilityQueryTest(TestCase):
+    """
+    MessageViewSet reads messages through an EXISTS on the participants table,
+    joined with their senders and limited to the serialized columns.
+    """
+    def setUp(self):
+        """
+        Create a conversation of two users and one the requesting user is not in.
+        """
+        cache.clear()
+        self.user = User.objects.create_user(username='alice', password='password123')
+        self.other = User.objects.create_user(username='bob', password='password123')
+        self.conversation = Conversation.objects.create(name='Visible')
+        self.conversation.participants.add(self.user, self.other)
+        self.hidden = Conversation.objects.create(name='Hidden')
+        self.hidden.participants.add(self.other)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('conversation-messages-list', kwargs={'conversation_pk': self.conversation.pk})
+
+    def add_messages(self, count):
+        """
+        Create `count` messages alternating between the two senders.
+        """
+        for i in range(count):
+            Message.objects.create(
+                conversation=self.conversation, sender=(self.user, self.other)[i % 2], message_body=f'Message {i}'
+            )
+
+    def page_queries(self):
+        """
+        The SQL of one list request, after its count has been cached.
+        """
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return [query['sql'] for query in queries.captured_queries]
+
+    def test_senders_are_joined(self):
+        """
+        Listing 2 or 20 messages runs the same query, and one for the archived messages
+        the first (oldest) page also covers.
+        """
+        self.add_messages(2)
+        few = self.page_queries()
+        self.add_messages(18)
+        self.assertEqual(len(self.page_queries()), len(few))
+        self.assertEqual(len(few), 2)
+        self.assertIn(ArchivedMessage._meta.db_table, few[1])
+        sql = few[0]
+        self.assertIn('EXISTS', sql)
+        self.assertIn('INNER JOIN "chats_user"', sql)
+        # only() leaves out the columns MessageSerializer does not render
+        self.assertNotIn('"password"', sql)
+
+    def test_scoped_to_the_nested_conversation(self):
+        """
+        The nested route returns that conversation only, and nothing for one the user is not in.
+        """
+        self.add_messages(3)
+        Message.objects.create(conversation=self.hidden, sender=self.other, message_body='Secret')
+        data = self.client.get(self.url).data
+        self.assertEqual(len(data['results']), 3)
+        self.assertEqual({message['sender'] for message in data['results']}, {'alice', 'bob'})
+        hidden_url = reverse('conversation-messages-list', kwargs={'conversation_pk': self.hidden.pk})
+        self.assertEqual(self.client.get(hidden_url).data['results'], [])
+        self.assertEqual(
+            self.client.get(reverse('conversation-messages-list', kwargs={'conversation_pk': 'nope'})).status_code, 200
+        )
+
+
+@skipUnless(connection.vendor == 'sqlite', 'checks the SQLite FTS5 index')
+class MessageSearchTest(TestCase):
+    """
+    The search action ranks matching messages from the user's conversations,
+    and the FTS5 index follows every insert, update and delete.
+    """
+    def setUp(self):
+        """
+        Create a conversation of two users, one only the other user is in, and some messages.
+        """
+        cache.clear()
+        self.user = User.objects.create_user(username='alice', password='password123')
+        self.other = User.objects.create_user(username='bob', password='password123')
+        self.conversation = Conversation.objects.create(name='Searchable')
+        self.conversation.participants.add(self.user, self.other)
+        self.second = Conversation.objects.create(name='Second')
+        self.second.participants.add(self.user)
+        self.hidden = Conversation.objects.create(name='Hidden')
+        self.hidden.participants.add(self.other)
+        self.create(self.conversation, 'deploy the release tonight')
+        self.create(self.conversation, 'release release release notes')
+        self.create(self.second, 'lunch plans')
+        self.create(self.hidden, 'secret release date')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('message-search')
+
+    def create(self, conversation, body):
+        return Message.objects.create(conversation=conversation, sender=self.other, message_body=body)
+
+    def bodies(self, q, url=None):
+        """
+        Message bodies returned for query `q`, in rank order.
+        """
+        response = self.client.get(url or self.url, {'q': q})
+        self.assertEqual(response.status_code, 200)
+        return [message['message_body'] for message in response.data['results']]
+
+    def test_ranked_and_restricted_to_own_conversations(self):
+        """
+        More occurrences rank higher; conversations the user is not in never match.
+        """
+        self.assertEqual(message_search.backend(), 'fts5')
+        self.assertEqual(self.bodies('release'), ['release release release notes', 'deploy the release tonight'])
+        response = self.client.get(self.url, {'q': 'release'})
+        ranks = [message['rank'] for message in response.data['results']]
+        self.assertGreater(ranks[0], ranks[1])
+
+    def test_all_words_and_prefix(self):
+        """
+        Every word must match; a trailing * makes a prefix.
+        """
+        self.assertEqual(self.bodies('release tonig*'), ['deploy the release tonight'])
+        self.assertEqual(self.bodies('release tonig'), [])
+        self.assertEqual(self.bodies('lunch release'), [])
+        self.assertEqual(self.bodies('"release" AND (NEAR'), [])
+        self.assertEqual(self.bodies('   '), [])
+
+    def test_nested_route_searches_one_conversation(self):
+        """
+        The nested search only looks into that conversation.
+        """
+        url = reverse('conversation-messages-search', kwargs={'conversation_pk': self.second.pk})
+        self.assertEqual(self.bodies('lunch', url), ['lunch plans'])
+        self.assertEqual(self.bodies('release', url), [])
+
+    def test_index_follows_updates_and_deletes(self):
+        """
+        Edited bodies are searchable by their new words only; deleted and bulk-inserted
+        messages drop out of and come into the index.
+        """
+        message = Message.objects.get(message_body='lunch plans')
+        message.message_body = 'dinner plans'
+        message.save()
+        self.assertEqual(self.bodies('lunch'), [])
+        self.assertEqual(self.bodies('dinner'), ['dinner plans'])
+        message.delete()
+        self.assertEqual(self.bodies('plans'), [])
+        Message.objects.bulk_create([
+            Message(conversation=self.second, sender=self.user, message_body=f'bulk item {i}') for i in range(3)
+        ])
+        self.assertEqual(len(self.bodies('bulk')), 3)
+
+    def test_like_backend_matches_the_same_messages(self):
+        """
+        The LIKE fallback finds the same messages, unranked.
+        """
+        fts = {pk for pk, _ in message_search.search(self.user, 'release')}
+        like = message_search.search(self.user, 'release', using='like')
+        self.assertEqual({pk for pk, _ in like}, fts)
+        self.assertEqual({rank for _, rank in like}, {0.0})
+
+    def test_rebuild_index(self):
+        """
+        Rebuilding refills the index from the messages table.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {message_search.FTS_TABLE}')
+        self.assertEqual(self.bodies('release'), [])
+        message_search.rebuild_index()
+        self.assertEqual(len(self.bodies('release')), 2)
+
+    def test_message_filter_by_sent_at(self):
+        """
+        The timestamp range filter reads sent_at.
+        """
+        old = self.create(self.conversation, 'old news')
+        Message.objects.filter(pk=old.pk).update(sent_at=timezone.now() - timedelta(days=10))
+        url = reverse('conversation-messages-list', kwargs={'conversation_pk': self.conversation.pk})
+        before = (timezone.now() - timedelta(days=5)).isoformat()
+        data = self.client.get(url, {'timestamp_before': before}).data
+        self.assertEqual([message['message_body'] for message in data['results']], ['old news'])
+
+
+class MessageBrokerTest(TestCase):
+    """
+    LocalBroker delivers published events to the subscribers of the channel only,
+    and waking a waiting subscriber takes milliseconds.
+    """
+    def test_publish_reaches_channel_subscribers(self):
+        """
+        Subscribers of other channels get nothing; closed subscriptions are removed.
+        """
+        local = broker.LocalBroker()
+        with local.subscribe(['a']) as first, local.subscribe(['b']) as second:
+            self.assertEqual(local.subscriber_count(), 2)
+            self.assertEqual(local.publish('a', {'n': 1}), 1)
+            self.assertEqual(first.wait(0), [{'n': 1}])
+            self.assertEqual(second.wait(0), [])
+        self.assertEqual(local.subscriber_count(), 0)
+        self.assertEqual(local.publish('a', {'n': 2}), 0)
+
+    def test_waiting_subscriber_wakes_immediately(self):
+        """
+        A subscriber blocked in wait() returns as soon as another thread publishes.
+        """
+        local = broker.LocalBroker()
+        latencies = []
+        with local.subscribe(['a']) as subscription:
+            for _ in range(20):
+                published = []
+                timer = threading.Timer(0.005, lambda: (published.append(time.perf_counter()), local.publish('a', {})))
+                timer.start()
+                self.assertEqual(subscription.wait(5), [{}])
+                latencies.append(time.perf_counter() - published[0])
+                timer.join()
+        self.assertLess(statistics.median(latencies), 0.05)
+
+    def test_announced_on_commit(self):
+        """
+        record_messages() publishes one event per conversation once the transaction commits.
+        """
+        user = User.objects.create_user(username='alice', password='password123')
+        conversation = Conversation.objects.create(name='Announced')
+        conversation.participants.add(user)
+        with broker.get_broker().subscribe([str(conversation.pk)]) as subscription:
+            with self.captureOnCommitCallbacks() as callbacks:
+                message = Message.objects.create(conversation=conversation, sender=user, message_body='hi')
+            self.assertEqual(subscription.wait(0), [])
+            for callback in callbacks:
+                callback()
+            self.assertEqual(subscription.wait(0), [{
+                'conversation': str(conversation.pk), 'message_id': str(message.pk), 'sent_at': message.sent_at,
+            }])
+
+
+class MessageStreamTest(TestCase):
+    """
+    The stream action returns the messages after a cursor, by long-poll or as server-sent events.
+    """
+    def setUp(self):
+        """
+        Create a conversation of two users, one the user is not in, and an authenticated client.
+        """
+        cache.clear()
+        self.user = User.objects.create_user(username='alice', password='password123')
+        self.other = User.objects.create_user(username='bob', password='password123')
+        self.conversation = Conversation.objects.create(name='Streamed')
+        self.conversation.participants.add(self.user, self.other)
+        self.hidden = Conversation.objects.create(name='Hidden')
+        self.hidden.participants.add(self.other)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('message-stream')
+
+    def create(self, conversation, body, sent_at=None):
+        message = Message.objects.create(conversation=conversation, sender=self.other, message_body=body)
+        if sent_at is not None:
+            Message.objects.filter(pk=message.pk).update(sent_at=sent_at)
+            message.sent_at = sent_at
+        return message
+
+    def test_returns_messages_after_cursor(self):
+        """
+        Messages after the cursor are returned at once, oldest first, without the hidden
+        conversation's; the returned cursor continues after the last one.
+        """
+        start = timezone.now() - timedelta(minutes=5)
+        first = self.create(self.conversation, 'first', start + timedelta(seconds=1))
+        self.create(self.hidden, 'hidden', start + timedelta(seconds=2))
+        self.create(self.conversation, 'second', start + timedelta(seconds=3))
+        cursor = pagination.encode_position('next', start, first.message_id)
+
+        began = time.monotonic()
+        response = self.client.get(self.url, {'cursor': cursor, 'timeout': 5})
+        self.assertLess(time.monotonic() - began, 1)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([m['message_body'] for m in response.data['results']], ['first', 'second'])
+
+        response = self.client.get(self.url, {'cursor': response.data['cursor'], 'timeout': 0})
+        self.assertEqual(response.data['results'], [])
+
+    def test_times_out_empty(self):
+        """
+        Without new messages the request returns no results after its timeout, keeping the cursor.
+        """
+        response = self.client.get(self.url, {'timeout': 0.1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'], [])
+        self.assertEqual(pagination.decode_position(response.data['cursor'])[0], 'next')
+
+    def test_nested_route_requires_membership(self):
+        """
+        Streaming a conversation the user is not in is forbidden.
+        """
+        url = reverse('conversation-messages-stream', kwargs={'conversation_pk': self.hidden.pk})
+        self.assertEqual(self.client.get(url, {'timeout': 0}).status_code, 403)
+        url = reverse('conversation-messages-stream', kwargs={'conversation_pk': self.conversation.pk})
+        self.assertEqual(self.client.get(url, {'timeout': 0}).status_code, 200)
+
+    def test_server_sent_events(self):
+        """
+        With Accept: text/event-stream each message is an event whose id resumes the
+        stream after it, also through Last-Event-ID.
+        """
+        start = timezone.now() - timedelta(minutes=5)
+        self.create(self.conversation, 'one', start + timedelta(seconds=1))
+        self.create(self.conversation, 'two', start + timedelta(seconds=2))
+        cursor = pagination.encode_position('next', start, uuid.UUID(int=0))
+
+        response = self.client.get(self.url, {'cursor': cursor, 'timeout': 0}, HTTP_ACCEPT='text/event-stream')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        body = b''.join(response.streaming_content).decode()
+        events = [block for block in body.split('\n\n') if block.startswith('id: ')]
+        self.assertEqual(len(events), 2)
+        self.assertIn('"message_body":"one"', events[0])
+        first_id = events[0].split('\n')[0][len('id: '):]
+
+        response = self.client.get(self.url, {'timeout': 0}, HTTP_ACCEPT='text/event-stream', HTTP_LAST_EVENT_ID=first_id)
+        body = b''.join(response.streaming_content).decode()
+        self.assertIn('"message_body":"two"', body)
+        self.assertNotIn('"message_body":"one"', body)
+
+
+class MessageStreamDeliveryTest(TransactionTestCase):
+    """
+    A waiting stream request is woken by a message posted from another thread, through
+    the post_save signal, chats.inbox and the broker, within milliseconds.
+    """
+    def test_long_poll_wakes_on_new_message(self):
+        """
+        The request returns the new message as soon as it is committed, not after its timeout.
+        """
+        cache.clear()
+        user = User.objects.create_user(username='alice', password='password123')
+        other = User.objects.create_user(username='bob', password='password123')
+        conversation = Conversation.objects.create(name='Streamed')
+        conversation.participants.add(user, other)
+        client = APIClient()
+        client.force_authenticate(user=user)
+        posted = []
+
+        def post():
+            try:
+                Message.objects.create(conversation=conversation, sender=other, message_body='pushed')
+                posted.append(time.monotonic())
+            finally:
+                connections.close_all()
+
+        timer = threading.Timer(0.2, post)
+        timer.start()
+        response = client.get(reverse('message-stream'), {'timeout': 10})
+        returned = time.monotonic()
+        timer.join()
+        self.assertEqual([m['message_body'] for m in response.data['results']], ['pushed'])
+        self.assertLess(returned - posted[0], 1)
+
+
+class FastSerializationTest(TestCase):
+    """
+    The list actions' fast path (chats.fast_serializers with FastJSONRenderer) produces
+    byte for byte the JSON of the model serializers.
+    """
+    def setUp(self):
+        """
+        Create two conversations with awkward field values and an authenticated client.
+        """
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='alice', password='password123', email='alice@example.com', first_name='Älice', phone_number='555-0100',
+        )
+        self.other = User.objects.create_user(username='bob', password='password123')
+        self.conversation = Conversation.objects.create(name='Fast "path" ☃')
+        self.conversation.participants.add(self.other, self.user)
+        self.empty = Conversation.objects.create()
+        self.empty.participants.add(self.user)
+        for body in ['plain', 'line\nbreak\ttab "quoted" \\ slash', 'emoji 😀 and \u2028 separator', '\x00\x1f control']:
+            Message.objects.create(conversation=self.conversation, sender=self.other, message_body=body)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def get_both(self, url, params=None):
+        """
+        The response bodies of `url` with and without fast serialization.
+        """
+        fast = self.client.get(url, params)
+        cache.clear()
+        with override_settings(CHATS_FAST_SERIALIZATION=False):
+            slow = self.client.get(url, params)
+        self.assertEqual(fast.status_code, 200)
+        self.assertEqual(slow.status_code, 200)
+        return fast.content, slow.content
+
+    def test_message_list_is_identical(self):
+        """
+        Every page of the message list, including the cursors, is the same.
+        """
+        url = reverse('conversation-messages-list', kwargs={'conversation_pk': self.conversation.pk})
+        fast, slow = self.get_both(url, {'page_size': 3})
+        self.assertEqual(fast, slow)
+        self.assertIn(b'\\u2028', fast)
+        next_url = json.loads(fast)['next']
+        fast, slow = self.get_both(next_url)
+        self.assertEqual(fast, slow)
+
+    def test_conversation_list_is_identical(self):
+        """
+        The conversation list, with participants, last messages and links, is the same.
+        """
+        fast, slow = self.get_both(reverse('conversation-list'))
+        self.assertEqual(fast, slow)
+        data = json.loads(fast)
+        self.assertEqual(data[0]['participant_usernames'], 'alice, bob')
+        self.assertIsNone(data[1]['last_message'])
+
+    def test_renderer_matches_json_renderer(self):
+        """
+        FastJSONRenderer renders datetimes, UUIDs, decimals and lazy strings like
+        JSONRenderer, and falls back to it for what orjson rejects.
+        """
+        data = {
+            'when': timezone.now(), 'id': uuid.uuid4(), 'amount': Decimal('1.50'), 'lazy': gettext_lazy('Hello'),
+            'nested': [{'text': 'a b', 'none': None, 'flag': True}],
+        }
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(FastJSONRenderer().render({1: 'int key'}), JSONRenderer().render({1: 'int key'}))
+
+
+class CachedJWTAuthenticationTest(TestCase):
+    """
+    CachedJWTAuthentication loads a token's user once, then serves it from the
+    in-process LRU or the shared cache until the user changes.
+    """
+    def setUp(self):
+        """
+        Create a user, an access token for them and empty caches.
+        """
+        cache.clear()
+        auth.local_cache.clear()
+        self.user = User.objects.create_user(username='alice', password='password123')
+        self.token = str(AccessToken.for_user(self.user))
+        self.authentication = auth.CachedJWTAuthentication()
+
+    def authenticate(self, token=None):
+        request = APIRequestFactory().get('/api/conversations/', HTTP_AUTHORIZATION=f'Bearer {token or self.token}')
+        return self.authentication.authenticate(request)
+
+    def test_user_loaded_once_per_token(self):
+        """
+        The first request queries the user; later ones run no query, from either cache layer.
+        """
+        with self.assertNumQueries(1):
+            user, _ = self.authenticate()
+        self.assertEqual(user.pk, self.user.pk)
+        with self.assertNumQueries(0):
+            user, token = self.authenticate()
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertEqual(str(token), self.token)
+
+        # Another process: only the shared cache has the entry
+        auth.local_cache.clear()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.authenticate()[0].pk, self.user.pk)
+
+    def test_shared_cache_keeps_no_password(self):
+        """
+        The shared entry holds the authentication fields only; the user read from it has
+        the password deferred, and saving it writes none of the fields it did not load.
+        """
+        self.authenticate()
+        entry = cache.get(auth.entry_key(str(self.user.pk), auth.token_key(AccessToken(self.token))))
+        self.assertEqual(set(entry[1]), {'pk', *auth.USER_FIELDS})
+        self.assertNotIn(self.user.password, repr(entry))
+
+        auth.local_cache.clear()
+        with self.assertNumQueries(0):
+            user, _ = self.authenticate()
+        self.assertEqual((user.pk, user.username, user.is_active), (self.user.pk, 'alice', True))
+        self.assertIn('password', user.get_deferred_fields())
+        User.objects.filter(pk=self.user.pk).update(email='alice@example.com')
+        user.is_staff = True
+        user.save()
+        self.user.refresh_from_db()
+        self.assertEqual((self.user.email, self.user.is_staff), ('alice@example.com', True))
+        self.assertTrue(self.user.check_password('password123'))
+
+    def test_deactivation_invalidates(self):
+        """
+        Saving the user as inactive drops the cached resolution, so the next request is refused.
+        """
+        self.authenticate()
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_shared_generation_invalidates(self):
+        """
+        An invalidation seen only through the shared cache (from another process) is honoured
+        once the local entry is gone.
+        """
+        self.authenticate()
+        auth.local_cache.clear()
+        cache.set(auth.generation_key(self.user.pk), 0, None)
+        with self.assertNumQueries(1):
+            self.authenticate()
+
+    def test_invalid_token_is_rejected(self):
+        """
+        Tokens are still verified on every request.
+        """
+        self.authenticate()
+        with self.assertRaises(InvalidToken):
+            self.authenticate(self.token[:-2] + ('AA' if not self.token.endswith('AA') else 'BB'))
+
+    def test_local_cache_is_bounded(self):
+        """
+        The LRU evicts its least recently used entry and forgets a user's entries together.
+        """
+        local = auth.LocalCache(2)
+        expires_at = time.time() + 60
+        local.set('a', 'u1', 'A', expires_at)
+        local.set('b', 'u2', 'B', expires_at)
+        local.get('a')
+        local.set('c', 'u1', 'C', expires_at)
+        self.assertIsNone(local.get('b'))
+        self.assertEqual(len(local), 2)
+        local.delete_user('u1')
+        self.assertEqual(len(local), 0)
+        local.set('d', 'u3', 'D', time.time() - 1)
+        self.assertIsNone(local.get('d'))
+
+
+def setUpModule():
+    """
+    Jobs only run when a test runs them (WorkerPool.run_pending()): no worker threads
+    are started on commit.
+    """
+    global _no_workers
+    tasks.get_pool().stop()
+    _no_workers = mock.patch.object(tasks.get_pool(), 'workers', 0)
+    _no_workers.start()
+
+
+def tearDownModule():
+    _no_workers.stop()
+
+
+@tasks.register('chats.tests.flaky')
+def flaky_task(payload):
+    """
+    Fails the first `failures` times it runs for a key, then succeeds.
+    """
+    FLAKY_RUNS[payload['key']] += 1
+    if FLAKY_RUNS[payload['key']] <= payload['failures']:
+        raise RuntimeError('flaky')
+
+
+FLAKY_RUNS = Counter()
+
+
+@tasks.register('chats.tests.rename')
+def rename_task(payload):
+    """
+    Renames a conversation, then fails if asked to.
+    """
+    Conversation.objects.filter(pk=payload['conversation_id']).update(name=payload['name'])
+    if payload.get('fail'):
+        raise RuntimeError('rename failed')
+
+
+class TaskQueueTest(TestCase):
+    """
+    chats.tasks runs queued jobs with retries and dead-lettering, and new messages are
+    fanned out to their recipients through it once a receiver is connected.
+    """
+    def setUp(self):
+        """
+        Create a conversation of three users and a pool run in the test's thread.
+        """
+        cache.clear()
+        self.alice = User.objects.create_user(username='alice', password='password123')
+        self.bob = User.objects.create_user(username='bob', password='password123')
+        self.carol = User.objects.create_user(username='carol', password='password123')
+        self.conversation = Conversation.objects.create(name='Fan-out')
+        self.conversation.participants.add(self.alice, self.bob, self.carol)
+        self.pool = tasks.WorkerPool(workers=0, backoff=0, max_attempts=3)
+        self.received = []
+
+    def receive(self, sender, recipient_id, messages, **kwargs):
+        self.received.append((recipient_id, [message.message_body for message in messages]))
+
+    def connect(self, receiver):
+        notifications.message_received.connect(receiver, sender=Message)
+        self.addCleanup(notifications.message_received.disconnect, receiver, sender=Message)
+
+    def test_no_jobs_without_receivers(self):
+        """
+        Posting a message queues nothing while nobody listens.
+        """
+        Message.objects.create(conversation=self.conversation, sender=self.alice, message_body='Hi')
+        self.assertFalse(Job.objects.exists())
+
+    def test_fan_out_reaches_every_recipient(self):
+        """
+        One job per conversation is queued with the message and wakes the workers on
+        commit; running it delivers to every participant but the sender.
+        """
+        self.connect(self.receive)
+        with self.captureOnCommitCallbacks() as callbacks:
+            Message.objects.create(conversation=self.conversation, sender=self.alice, message_body='Hi')
+        self.assertEqual(Job.objects.count(), 1)
+        self.assertIn(tasks.wake, callbacks)
+
+        self.assertEqual(self.pool.run_pending(), 3)
+        self.assertEqual(sorted(self.received), sorted([(str(self.bob.pk), ['Hi']), (str(self.carol.pk), ['Hi'])]))
+        self.assertFalse(Job.objects.exists())
+        self.assertEqual(self.pool.counters['succeeded'], 3)
+
+    def test_failing_recipient_is_retried_alone(self):
+        """
+        A receiver failing for one recipient makes only that recipient's delivery retry.
+        """
+        failures = Counter()
+
+        def receive(sender, recipient_id, messages, **kwargs):
+            if recipient_id == str(self.bob.pk) and not failures[recipient_id]:
+                failures[recipient_id] += 1
+                raise RuntimeError('push service unavailable')
+            self.receive(sender, recipient_id, messages)
+
+        self.connect(receive)
+        Message.objects.create(conversation=self.conversation, sender=self.alice, message_body='Hi')
+        with self.assertLogs('chats.tasks', 'WARNING'):
+            self.pool.run_pending()
+        self.assertEqual(sorted(recipient for recipient, _ in self.received), sorted([str(self.bob.pk), str(self.carol.pk)]))
+        self.assertEqual(self.pool.counters['retried'], 1)
+
+    def test_retries_then_dead_letters(self):
+        """
+        A job is retried with backoff until max_attempts, then kept as dead with its
+        error; requeue_dead() puts it back in the queue.
+        """
+        tasks.enqueue('chats.tests.flaky', {'key': 'recovers', 'failures': 2})
+        tasks.enqueue('chats.tests.flaky', {'key': 'dies', 'failures': 10})
+        with self.assertLogs('chats.tasks', 'WARNING') as logs:
+            self.pool.run_pending()
+        self.assertTrue(any('dead-lettered' in line for line in logs.output))
+        self.assertEqual(FLAKY_RUNS['recovers'], 3)
+        self.assertEqual(FLAKY_RUNS['dies'], 3)
+        dead = Job.objects.get()
+        self.assertEqual((dead.status, dead.attempts), (Job.DEAD, 3))
+        self.assertIn('RuntimeError: flaky', dead.last_error)
+        self.assertEqual(tasks.stats().dead, 1)
+
+        self.assertEqual(tasks.requeue_dead(), 1)
+        self.assertEqual(tasks.stats().ready, 1)
+
+    def test_backoff_and_queue_depth(self):
+        """
+        A failed job waits `backoff` seconds before its retry, and stats() counts it as scheduled.
+        """
+        pool = tasks.WorkerPool(workers=0, backoff=60)
+        tasks.enqueue('chats.tests.flaky', {'key': 'backoff', 'failures': 1})
+        tasks.enqueue('chats.tests.flaky', {'key': 'later', 'failures': 0}, delay=timedelta(minutes=5))
+        self.assertEqual(tasks.stats()._replace(oldest_ready_age=0), tasks.QueueStats(1, 1, 0, 0, 0))
+        with self.assertLogs('chats.tasks', 'WARNING'):
+            self.assertEqual(pool.run_pending(), 1)
+        self.assertEqual(tasks.stats(), tasks.QueueStats(0, 2, 0, 0, 0.0))
+
+    def test_expired_lease_is_reclaimed(self):
+        """
+        A job left running by a dead worker is run again once its lease has expired.
+        """
+        job = tasks.enqueue('chats.tests.flaky', {'key': 'lease', 'failures': 0})
+        Job.objects.filter(pk=job.pk).update(
+            status=Job.RUNNING, attempts=1, locked_until=timezone.now() - timedelta(seconds=1)
+        )
+        self.assertEqual(self.pool.run_pending(), 1)
+        self.assertEqual(FLAKY_RUNS['lease'], 1)
+        self.assertFalse(Job.objects.exists())
+
+    def test_reclaimed_job_is_left_to_its_new_worker(self):
+        """
+        A worker whose job was reclaimed after its lease ran out neither deletes, retries
+        nor dead-letters the row, and rolls the task's changes back.
+        """
+        claim = self.pool.claim
+
+        def claim_and_lose():
+            # Another worker reclaims the job as soon as this one has claimed it
+            job = claim()
+            if job is not None:
+                Job.objects.filter(pk=job.pk).update(attempts=job.attempts + 1)
+            return job
+
+        pool = tasks.WorkerPool(workers=0, backoff=0, max_attempts=1)
+        for worker in (self.pool, pool):
+            for fail in (False, True):
+                with self.subTest(max_attempts=worker.max_attempts, fail=fail):
+                    job = tasks.enqueue('chats.tests.rename', {
+                        'conversation_id': str(self.conversation.pk), 'name': 'Renamed', 'fail': fail,
+                    })
+                    with mock.patch.object(worker, 'claim', claim_and_lose), \
+                            self.assertLogs('chats.tasks', 'WARNING') as logs:
+                        self.assertIs(worker.run_one(), True)
+                    self.assertTrue(all('reclaimed' in line for line in logs.output))
+                    job.refresh_from_db()
+                    self.assertEqual((job.status, job.attempts, job.last_error), (Job.RUNNING, 2, ''))
+                    self.conversation.refresh_from_db()
+                    self.assertEqual(self.conversation.name, 'Fan-out')
+                    job.delete()
+        self.assertEqual(self.pool.counts(), {})
+        self.assertEqual(pool.counts(), {})
+
+    def test_commit_starts_the_workers(self):
+        """
+        Committing a job wakes this process's pool, starting its threads on first use.
+        """
+        self.connect(self.receive)
+        pool = tasks.get_pool()
+        with mock.patch.object(pool, 'workers', 2), mock.patch.object(pool, 'start') as start:
+            with self.captureOnCommitCallbacks(execute=True):
+                Message.objects.create(conversation=self.conversation, sender=self.alice, message_body='Hi')
+        start.assert_called_once_with()
+        self.assertEqual(self.pool.run_pending(), 3)
+        self.assertEqual(len(self.received), 2)
+
+    def test_database_outage_is_logged_once(self):
+        """
+        A worker that cannot reach the job table warns once, without a traceback, until it can again.
+        """
+        pool = tasks.WorkerPool(workers=0, poll_interval=0.001)
+        outcomes = [OperationalError('database table is locked')] * 3 + [False, OperationalError('gone')]
+
+        def run_one():
+            outcome = outcomes.pop(0)
+            if not outcomes:
+                pool._stopping = True
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+
+        with mock.patch.object(pool, 'run_one', run_one), mock.patch.object(tasks, 'connection'), \
+                mock.patch.object(tasks, 'close_old_connections'), self.assertLogs('chats.tasks') as logs:
+            pool._work()
+        self.assertEqual([record.levelname for record in logs.records], ['WARNING', 'WARNING'])
+        self.assertTrue(all(record.exc_info is None for record in logs.records))
+
+    def test_unknown_task_is_refused(self):
+        with self.assertRaises(ValueError):
+            tasks.enqueue('chats.tests.missing')
+
+
+class TaskWorkerThreadTest(TransactionTestCase):
+    """
+    A pool's worker threads run jobs committed by other threads.
+    """
+    def test_workers_deliver_committed_jobs(self):
+        cache.clear()
+        alice = User.objects.create_user(username='alice', password='password123')
+        bob = User.objects.create_user(username='bob', password='password123')
+        conversation = Conversation.objects.create(name='Threads')
+        conversation.participants.add(alice, bob)
+        delivered = threading.Event()
+
+        def receive(sender, recipient_id, messages, **kwargs):
+            if recipient_id == str(bob.pk):
+                delivered.set()
+
+        notifications.message_received.connect(receive, sender=Message)
+        self.addCleanup(notifications.message_received.disconnect, receive, sender=Message)
+        Message.objects.create(conversation=conversation, sender=alice, message_body='Hi')
+        # One thread, started once the job is committed, so it never competes for the
+        # (shared-cache SQLite) job table with this thread or another worker
+        pool = tasks.WorkerPool(workers=1, poll_interval=0.05)
+        pool.start()
+        self.addCleanup(pool.stop, timeout=5)
+        self.assertTrue(delivered.wait(10))
+
+
+class MessageArchiveTest(TestCase):
+    """
+    chats.archive moves old messages out of the hot table in batched jobs, and the
+    messages list keeps returning them, page for page, without querying the archive
+    for recent pages.
+    """
+    def setUp(self):
+        """
+        Create a conversation with 45 messages sent 45 to 5 days ago, five at a time.
+        """
+        cache.clear()
+        self.user = User.objects.create_user(username='alice', password='password123')
+        self.conversation = Conversation.objects.create(name='Archive')
+        self.conversation.participants.add(self.user)
+        messages = Message.objects.bulk_create([
+            Message(conversation=self.conversation, sender=self.user, message_body=f'Message {i}')
+            for i in range(45)
+        ])
+        base = timezone.now() - timedelta(days=45)
+        for i, message in enumerate(messages):
+            message.sent_at = base + timedelta(days=i // 5 * 5)
+        Message.objects.bulk_update(messages, ['sent_at'])
+        inbox.record_messages(messages)
+        # Archives the 25 messages sent 45 to 25 days ago; readers skip the archive for
+        # pages of messages younger than 21 days
+        archive_after = mock.patch.object(archive, 'ARCHIVE_AFTER_DAYS', 21)
+        archive_after.start()
+        self.addCleanup(archive_after.stop)
+        self.cutoff = timezone.now() - timedelta(days=22)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('conversation-messages-list', kwargs={'conversation_pk': self.conversation.pk})
+
+    def walk(self, url, link):
+        """
+        Follow `link` ('next' or 'previous') from url, returning every page's messages and the last page's URL.
+        """
+        pages = []
+        while url:
+            data = self.client.get(url).data
+            pages.append([(message['message_id'], message['sent_at']) for message in data['results']])
+            last, url = url, data[link]
+        return pages, last
+
+    def test_background_archiving_runs_in_batches(self):
+        """
+        One scheduled job moves a batch and queues the next until no old message is left.
+        """
+        archive.schedule(self.cutoff, batch_size=10)
+        self.assertEqual(tasks.WorkerPool(workers=0).run_pending(), 3)
+        self.assertEqual(ArchivedMessage.objects.count(), 25)
+        self.assertEqual(Message.objects.filter(conversation=self.conversation).count(), 20)
+        self.assertFalse(Message.objects.filter(sent_at__lt=self.cutoff).exists())
+        self.assertLess(ArchivedMessage.objects.order_by('-sent_at')[0].sent_at, archive.high_water())
+
+    def test_cutoff_cannot_pass_the_archive_age(self):
+        """
+        Messages younger than CHATS_ARCHIVE_AFTER_DAYS stay in the hot table.
+        """
+        with self.assertRaises(ValueError):
+            archive.schedule(timezone.now() - timedelta(days=10))
+        with self.assertRaises(ValueError):
+            archive.archive(timezone.now() - timedelta(days=10))
+        self.assertFalse(ArchivedMessage.objects.exists())
+
+    def test_archiving_in_another_process_is_seen(self):
+        """
+        Messages archived by a process with its own cache (e.g. chats_worker with the
+        default local-memory cache) stay in this process's pages.
+        """
+        url = self.url + '?page_size=10'
+        before, _ = self.walk(url, 'next')
+        archive.archive(timezone.now() - timedelta(days=40))
+        self.assertEqual(self.walk(url, 'next')[0], before)
+        worker_cache = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'worker'}}
+        with override_settings(CACHES=worker_cache):
+            archive.archive(self.cutoff)
+        self.assertEqual(ArchivedMessage.objects.count(), 25)
+        self.assertEqual(self.walk(url, 'next')[0], before)
+
+    def test_last_message_is_not_archived(self):
+        """
+        A conversation's last message stays in the hot table however old it is.
+        """
+        quiet = Conversation.objects.create(name='Quiet')
+        quiet.participants.add(self.user)
+        message = Message.objects.create(conversation=quiet, sender=self.user, message_body='Long ago')
+        Message.objects.filter(pk=message.pk).update(sent_at=timezone.now() - timedelta(days=400))
+        archive.archive(self.cutoff)
+        self.assertTrue(Message.objects.filter(pk=message.pk).exists())
+        quiet.refresh_from_db()
+        self.assertEqual(quiet.last_message_id, message.pk)
+
+    def test_pages_are_unchanged_by_archiving(self):
+        """
+        Walking forwards and backwards returns the same pages and count before and
+        after archiving, on the fast and the model serialization paths.
+        """
+        url = self.url + '?page_size=10'
+        before, last = self.walk(url, 'next')
+        backward_before, _ = self.walk(last, 'previous')
+        total_before = self.client.get(url).data['total_count']
+        archive.archive(self.cutoff, batch_size=7)
+        cache.clear()
+        self.assertEqual(ArchivedMessage.objects.count(), 25)
+        for fast in (True, False):
+            with override_settings(CHATS_FAST_SERIALIZATION=fast):
+                self.assertEqual(self.walk(url, 'next')[0], before)
+                self.assertEqual(self.walk(last, 'previous')[0], backward_before)
+                self.assertEqual(self.client.get(url).data['total_count'], total_before)
+
+    def test_recent_pages_do_not_query_the_archive(self):
+        """
+        Pages of messages newer than the newest archived one read only the hot table.
+        """
+        archive.archive(self.cutoff)
+        first = self.client.get(self.url + '?page_size=10').data
+        third = self.client.get(self.client.get(first['next']).data['next']).data
+        fourth = self.client.get(third['next']).data
+        # Forwards from the third page's end, and back from the last page
+        recent = [third['next'], self.client.get(fourth['next']).data['previous']]
+        archive_table = ArchivedMessage._meta.db_table
+        for url in recent:
+            self.client.get(url)
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(url)
+            self.assertFalse(any(archive_table in query['sql'] for query in queries.captured_queries), url)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(first['next'])
+        self.assertTrue(any(archive_table in query['sql'] for query in queries.captured_queries))
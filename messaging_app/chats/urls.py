@@ -15,6 +15,13 @@ conversations_router = nested_routers.NestedDefaultRouter(router, r'conversation
 conversations_router.register(r'messages', MessageViewSet, basename='conversation-messages')
 
 urlpatterns = [
+    # Full-text search across all of the user's conversations
+    # (the nested route /conversations/{conversation_pk}/messages/search/ searches one)
+    path('messages/search/', MessageViewSet.as_view({'get': 'search'}), name='message-search'),
+    # New messages in all of the user's conversations, by long-poll or server-sent events
+    # (the nested route /conversations/{conversation_pk}/messages/stream/ follows one)
+    # (the action's kwargs carry its renderers, which the router would otherwise apply)
+    path('messages/stream/', MessageViewSet.as_view({'get': 'stream'}, **MessageViewSet.stream.kwargs), name='message-stream'),
     # Include the URLs from the top-level router
     path('', include(router.urls)),
     # Include the URLs from the nested router
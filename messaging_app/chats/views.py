@@ -1,34 +1,139 @@
 # messaging_app/chats/views.py
 
-from rest_framework import viewsets, status
-from rest_framework.permissions import IsAuthenticated
+import time
+import uuid
+
+from rest_framework import renderers, serializers, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.exceptions import PermissionDenied, ValidationError
 from rest_framework.response import Response
-from django.shortcuts import get_object_or_404
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Prefetch, Q
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.db.models.functions import Coalesce
+from django_filters.rest_framework import DjangoFilterBackend
 
-from .models import Message, Conversation
-from .serializers import MessageSerializer, ConversationSerializer
+from .models import User, ArchivedMessage, Message, Conversation, ConversationParticipant
+from .serializers import MessageSerializer, ConversationSerializer, ConversationListSerializer, BulkMessageSerializer
 from .permissions import IsParticipantOfConversation # Import your custom permission
+from .pagination import MessageCursorPagination, decode_position, encode_position, merge_rows
+from .renderers import EventStreamRenderer, FastJSONRenderer
+from .membership import conversation_ids, is_participant
+from .filters import MessageFilter
+from . import broker, fast_serializers, inbox, list_cache
+from . import search as message_search
+
+def with_conversation_relations(queryset, embedded_messages=None):
+    """
+    Loads everything ConversationSerializer renders in a fixed number of queries,
+    however many conversations the queryset returns:
+    one for the conversations joined with their last message and its sender,
+    one for all their participants and, unless `embedded_messages` is 0, one for the
+    latest `embedded_messages` messages of each conversation joined with their senders
+    (StringRelatedField needs sender.username).
+    message_count and last_activity come from the denormalized columns on the
+    conversation, so the payload size stays the same however long the history grows.
+    The serializer's get_participant_usernames and the participant permission
+    check then read the prefetched participants instead of querying again.
+    """
+    if embedded_messages is None:
+        embedded_messages = ConversationSerializer.get_embedded_messages()
+    # Participants in username order, which chats.fast_serializers reproduces
+    prefetches = [Prefetch('participants', queryset=User.objects.order_by('username'))]
+    if embedded_messages:
+        # A sliced Prefetch is limited per conversation (ROW_NUMBER() over each conversation)
+        recent_messages = Message.objects.select_related('sender').order_by('-sent_at')[:embedded_messages]
+        prefetches.append(Prefetch('messages', queryset=recent_messages, to_attr='recent_messages'))
+    return queryset.select_related('last_message__sender').annotate(
+        # Conversations without messages fall back to their creation time
+        last_activity=Coalesce('last_message_at', 'created_at'),
+    ).prefetch_related(*prefetches)
+
+
+class FastListMixin:
+    """
+    Serves the list action through chats.fast_serializers and renders it with
+    FastJSONRenderer, byte for byte the same JSON as the model serializers.
+    Set CHATS_FAST_SERIALIZATION = False in settings to use the model serializers;
+    it is read per request, so override_settings and runtime configuration apply.
+    """
+    @property
+    def fast_serialization(self):
+        return getattr(settings, 'CHATS_FAST_SERIALIZATION', True)
+
+    def get_renderers(self):
+        available = super().get_renderers()
+        if self.action == 'list' and self.fast_serialization:
+            available = [
+                FastJSONRenderer() if type(renderer) is renderers.JSONRenderer else renderer for renderer in available
+            ]
+        return available
+
 
-class ConversationViewSet(viewsets.ModelViewSet):
+class ConversationViewSet(FastListMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing Conversation objects.
     Ensures only authenticated users who are participants can access conversations.
+    The list is an inbox: most recent activity first, each conversation with its last
+    message and the user's unread count, served without reading the messages table.
+    Serialized lists are cached per user (chats.list_cache) until something in them changes.
     """
     queryset = Conversation.objects.all()
     serializer_class = ConversationSerializer
     # IsAuthenticated is applied here as part of the permission_classes
     permission_classes = [IsAuthenticated, IsParticipantOfConversation] 
 
+    def get_serializer_class(self):
+        """
+        The list renders inbox entries; single conversations also embed their latest messages.
+        """
+        if self.action == 'list':
+            return ConversationListSerializer
+        return super().get_serializer_class()
+
     def get_queryset(self):
         """
         Restricts the returned conversations to only those the
         current user is a participant of.
         """
-        # Filter conversations to only include those where the requesting user is a participant
+        # Filter conversations to only include those where the requesting user is a participant.
+        # Going through the user's own participant row (one per conversation, so no
+        # distinct() is needed) also gives their unread counter.
+        # Only retrieve prefetches the embedded messages; other actions either render
+        # no messages or a single conversation, which the serializer loads itself.
         if self.request.user.is_authenticated:
-            return self.queryset.filter(participants=self.request.user).distinct()
+            queryset = self.queryset.filter(memberships__user=self.request.user).annotate(
+                unread_count=F('memberships__unread_count'),
+            )
+            return with_conversation_relations(
+                queryset, embedded_messages=None if self.action == 'retrieve' else 0
+            ).order_by('-last_activity', '-created_at')
         return self.queryset.none() # Return an empty queryset if user is not authenticated
 
+    def list(self, request, *args, **kwargs):
+        """
+        Serves the user's list from the cache when it is still valid.
+        The X-Cache header tells whether it was a HIT or a MISS.
+        """
+        def build():
+            if self.fast_serialization:
+                return fast_serializers.conversation_list(self.filter_queryset(self.get_queryset()), request)
+            return super(ConversationViewSet, self).list(request, *args, **kwargs).data
+
+        data, hit = list_cache.cached_list(request, build)
+        return Response(data, headers={'X-Cache': 'HIT' if hit else 'MISS'})
+
+    @action(detail=False, methods=['get'], url_path='cache-stats', permission_classes=[IsAdminUser])
+    def cache_stats(self, request):
+        """
+        Hit, miss and invalidation counts of the conversation list cache, for staff users.
+        """
+        stats = list_cache.stats()
+        return Response(dict(stats._asdict(), hit_rate=stats.hit_rate))
+
     def perform_create(self, serializer):
         """
         When creating a new conversation, automatically add the creator as a participant.
@@ -41,7 +146,16 @@ class ConversationViewSet(viewsets.ModelViewSet):
         # This assumes the 'participants' field is a ManyToManyField to User
         # and it's not set in the serializer's create method, allowing us to add it here.
 
-class MessageViewSet(viewsets.ModelViewSet):
+    @action(detail=True, methods=['post'])
+    def read(self, request, pk=None):
+        """
+        Marks the conversation as read: resets the user's unread counter.
+        """
+        conversation = self.get_object()
+        inbox.mark_read(conversation, request.user)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+class MessageViewSet(FastListMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing Message objects.
     Ensures only authenticated users who are participants of the message's conversation
@@ -49,43 +163,338 @@ class MessageViewSet(viewsets.ModelViewSet):
     """
     queryset = Message.objects.all()
     serializer_class = MessageSerializer
+    # Conversations only embed their latest messages; the history is paged here,
+    # by (sent_at, message_id) cursor so deep pages cost the same as the first
+    pagination_class = MessageCursorPagination
     # IsAuthenticated is applied here as part of the permission_classes
     permission_classes = [IsAuthenticated, IsParticipantOfConversation]
+    # ?sender_username=...&timestamp_after=...&timestamp_before=...
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = MessageFilter
+    # Results per search request by default and at most
+    search_limit = 20
+    search_max_limit = 100
+    # Message stream: seconds a long-poll request waits (by default and at most), seconds
+    # an event stream stays open before the client reconnects, seconds between keep-alive
+    # comments, and messages read per query.
+    stream_timeout = 25
+    stream_max_timeout = 60
+    stream_sse_duration = 300
+    stream_heartbeat = 15
+    stream_batch_size = 100
+
+    # Most messages accepted by one bulk request, and rows per INSERT.
+    # Override with CHATS_BULK_MAX_MESSAGES and CHATS_BULK_BATCH_SIZE in settings;
+    # they are read per request, so override_settings and runtime configuration apply.
+    @property
+    def bulk_max_messages(self):
+        return getattr(settings, 'CHATS_BULK_MAX_MESSAGES', 10000)
+
+    @property
+    def bulk_batch_size(self):
+        return getattr(settings, 'CHATS_BULK_BATCH_SIZE', 500)
 
     def get_queryset(self):
         """
         Restricts the returned messages to only those within conversations
         the current user is a participant of.
         """
+        return self.visible_messages(self.queryset)
+
+    def get_archived_queryset(self):
+        """
+        The archived messages (chats.archive) the list reads after the hot table's,
+        with the same visibility rules and filters.
+        """
+        archived = self.visible_messages(ArchivedMessage.objects.all())
+        # DjangoFilterBackend only accepts querysets of the FilterSet's model
+        return MessageFilter(self.request.query_params, queryset=archived, request=self.request).qs
+
+    def visible_messages(self, queryset):
+        """
+        Restricts a Message or ArchivedMessage queryset to the current user's conversations.
+        """
         if self.request.user.is_authenticated:
-            # Get all conversations the current user is a participant of
-            user_conversations = Conversation.objects.filter(participants=self.request.user)
-            # Filter messages that belong to these conversations
-            # self.queryset is Message.objects.all(), so this is effectively Message.objects.filter(...)
-            return self.queryset.filter(conversation__in=user_conversations) 
-        return self.queryset.none() # Return an empty queryset if user is not authenticated
+            # A message is visible when the user has a row in the participants table for its
+            # conversation: an EXISTS answered by the (conversation_id, user_id) unique index,
+            # rather than first collecting all of the user's conversations.
+            participant_rows = ConversationParticipant.objects.filter(user_id=self.request.user.pk)
+            # On the nested route (/conversations/{conversation_pk}/messages/) only that
+            # conversation's messages are listed; this is where the full history is read.
+            # The membership check then no longer depends on the message row, so the
+            # database evaluates it once instead of once per message.
+            conversation_pk = self.kwargs.get('conversation_pk')
+            if conversation_pk is not None:
+                try:
+                    conversation_pk = uuid.UUID(str(conversation_pk))
+                except ValueError:
+                    return queryset.none()
+                queryset = queryset.filter(conversation_id=conversation_pk)
+                participant_rows = participant_rows.filter(conversation_id=conversation_pk)
+            else:
+                participant_rows = participant_rows.filter(conversation_id=OuterRef('conversation_id'))
+            # The sender is joined for MessageSerializer's StringRelatedField (its username),
+            # and only the serialized columns are loaded.
+            return queryset.filter(Exists(participant_rows)).select_related('sender').only(
+                'message_id', 'conversation', 'message_body', 'sent_at', 'sender__user_id', 'sender__username',
+            )
+        return queryset.none() # Return an empty queryset if user is not authenticated
+
+    def list(self, request, *args, **kwargs):
+        """
+        Pages through the messages, archived history included, as values_list() rows
+        serialized by chats.fast_serializers.MESSAGE, or as model instances through
+        MessageSerializer when fast serialization is turned off.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        archived = self.get_archived_queryset()
+        if self.fast_serialization:
+            queryset, archived = fast_serializers.MESSAGE.rows(queryset), fast_serializers.MESSAGE.rows(archived)
+            serialize = fast_serializers.MESSAGE.many
+        else:
+            serialize = lambda rows: self.get_serializer(rows, many=True).data
+        page = self.paginate_queryset(queryset, archived)
+        if page is not None:
+            return self.get_paginated_response(serialize(page))
+        return Response(serialize(merge_rows(
+            queryset.order_by('sent_at', 'message_id'), archived.order_by('sent_at', 'message_id'),
+        )))
+
+    def paginate_queryset(self, queryset, archived=None):
+        """
+        Hands the archived messages to MessageCursorPagination, which merges them in.
+        Other paginators page through the hot table only.
+        """
+        if archived is None or not isinstance(self.paginator, MessageCursorPagination):
+            return super().paginate_queryset(queryset)
+        return self.paginator.paginate_queryset(queryset, self.request, view=self, archived=archived)
 
     def perform_create(self, serializer):
         """
         When creating a message, ensure the user is a participant of the target conversation.
         """
-        conversation_id = self.request.data.get('conversation')
-        if not conversation_id:
-            return Response({"detail": "Conversation ID is required."}, status=status.HTTP_400_BAD_REQUEST)
-
-        try:
-            # This uses Conversation.objects.filter internally via get_object_or_404
-            conversation = get_object_or_404(Conversation, pk=conversation_id)
-        except Exception:
-            return Response({"detail": "Conversation not found."}, status=status.HTTP_404_NOT_FOUND)
+        # The serializer has already resolved and validated the 'conversation' field
+        conversation = serializer.validated_data['conversation']
 
         # Check if the requesting user is a participant of the conversation
-        if self.request.user not in conversation.participants.all():
-            return Response(
-                {"detail": "You are not a participant of this conversation."},
-                status=status.HTTP_403_FORBIDDEN
+        if not is_participant(self.request.user, conversation, self.request):
+            raise PermissionDenied("You are not a participant of this conversation.")
+
+        # Save the message, linking it to the conversation and the sender.
+        # The post_save signal updates the conversation's inbox columns.
+        serializer.save(sender=self.request.user)
+
+    def perform_destroy(self, instance):
+        """
+        Deletes the message and updates its conversation's inbox columns.
+        """
+        instance.delete()
+        inbox.forget_message(instance)
+
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request, conversation_pk=None):
+        """
+        Creates a list of messages in one request, for integrations replaying history:
+        POST /conversations/{conversation_pk}/messages/bulk/ with
+        [{"message_body": "...", "conversation": "<optional uuid>"}, ...].
+        Items without a conversation go to the one in the URL.
+
+        Membership of every item is checked against the user's conversation id set
+        (chats.membership, at most one query), and the valid items are inserted with
+        bulk_create in batches of `bulk_batch_size` inside one transaction, followed by
+        one inbox update per conversation. Invalid items are skipped.
+
+        The response lists one result per item, in request order: status 201 with the
+        new message_id and sent_at, or 400/403 with the errors. The request succeeds
+        with 201 when every item was created and 207 otherwise.
+        """
+        items = request.data
+        if not isinstance(items, list):
+            raise ValidationError({'non_field_errors': ['Expected a list of messages.']})
+        if len(items) > self.bulk_max_messages:
+            raise ValidationError({'non_field_errors': [f'At most {self.bulk_max_messages} messages per request.']})
+
+        member_of = conversation_ids(request.user, request)
+        results = []
+        messages = []
+        for index, item in enumerate(items):
+            serializer = BulkMessageSerializer(data=item)
+            if not serializer.is_valid():
+                results.append({'index': index, 'status': status.HTTP_400_BAD_REQUEST, 'errors': serializer.errors})
+                continue
+            conversation_id = serializer.validated_data.get('conversation') or conversation_pk
+            try:
+                conversation_id = str(uuid.UUID(str(conversation_id)))
+            except ValueError:
+                conversation_id = None
+            if conversation_id not in member_of:
+                results.append({
+                    'index': index,
+                    'status': status.HTTP_403_FORBIDDEN,
+                    'errors': {'conversation': ['You are not a participant of this conversation.']},
+                })
+                continue
+            message = Message(
+                conversation_id=conversation_id,
+                sender=request.user,
+                message_body=serializer.validated_data['message_body'],
             )
-        
-        # Save the message, linking it to the conversation and the sender
-        serializer.save(sender=self.request.user, conversation=conversation)
+            messages.append(message)
+            results.append({'index': index, 'status': status.HTTP_201_CREATED, 'message': message})
+
+        # bulk_create sends no post_save, so the inbox columns are updated here
+        with transaction.atomic():
+            Message.objects.bulk_create(messages, batch_size=self.bulk_batch_size)
+            inbox.record_messages(messages)
+
+        sent_at = serializers.DateTimeField()
+        for result in results:
+            message = result.pop('message', None)
+            if message is not None:
+                result.update(
+                    message_id=str(message.message_id),
+                    conversation=str(message.conversation_id),
+                    sent_at=sent_at.to_representation(message.sent_at),
+                )
+        created = len(messages)
+        return Response(
+            {'created': created, 'failed': len(items) - created, 'results': results},
+            status=status.HTTP_201_CREATED if created == len(items) else status.HTTP_207_MULTI_STATUS,
+        )
+
+    @action(detail=False, methods=['get'])
+    def search(self, request, conversation_pk=None):
+        """
+        Ranked full-text search over message bodies (chats.search), among the
+        conversations the user participates in:
+        GET /messages/search/?q=... searches all of them and
+        GET /conversations/{conversation_pk}/messages/search/?q=... only that one.
+        `limit` (default 20, at most 100) and `offset` page through the ranked results.
+        """
+        try:
+            limit = min(int(request.query_params.get('limit', self.search_limit)), self.search_max_limit)
+            offset = int(request.query_params.get('offset', 0))
+        except ValueError:
+            raise ValidationError({'limit': ['limit and offset must be integers.']})
+        if limit < 1 or offset < 0:
+            raise ValidationError({'limit': ['limit must be positive and offset not negative.']})
+
+        scope = None
+        if conversation_pk is not None:
+            try:
+                scope = uuid.UUID(str(conversation_pk))
+            except ValueError:
+                return Response({'results': []})
+
+        hits = message_search.search(
+            request.user, request.query_params.get('q', ''), conversation_id=scope, limit=limit, offset=offset
+        )
+        # Load the hits through get_queryset, which applies the visibility rules once more
+        messages = self.get_queryset().in_bulk([message_id for message_id, _ in hits])
+        context = self.get_serializer_context()
+        results = [
+            dict(MessageSerializer(messages[message_id], context=context).data, rank=rank)
+            for message_id, rank in hits if message_id in messages
+        ]
+        return Response({'results': results})
+
+    def stream_messages_after(self, position):
+        """
+        The next visible messages after `position` (sent_at, message_id), oldest first.
+        """
+        sent_at, message_id = position
+        return list(self.get_queryset().filter(
+            Q(sent_at__gt=sent_at) | Q(sent_at=sent_at, message_id__gt=message_id)
+        ).order_by('sent_at', 'message_id')[:self.stream_batch_size])
+
+    @action(
+        detail=False, methods=['get'],
+        renderer_classes=[renderers.JSONRenderer, renderers.BrowsableAPIRenderer, EventStreamRenderer],
+    )
+    def stream(self, request, conversation_pk=None):
+        """
+        New messages in the user's conversations, pushed as they are posted:
+        GET /messages/stream/ covers all of them (those the user is in when the request
+        starts) and GET /conversations/{conversation_pk}/messages/stream/ only that one.
+
+        `cursor` is the position to continue from, as returned by the previous call (or a
+        message list page's `next` cursor); without one the stream starts now.
+
+        - Long-poll (default): returns {"results": [...], "cursor": "..."} as soon as there
+          are messages after the cursor, or with no results after `timeout` seconds
+          (default 25, at most 60). Call again with the returned cursor.
+        - Server-sent events (Accept: text/event-stream or ?format=sse): one `message`
+          event per message, whose id is the cursor after it, so a reconnecting
+          EventSource resumes from Last-Event-ID. The response ends after `timeout`
+          seconds (default and at most 300) and sends keep-alive comments meanwhile.
+
+        Waiting runs no queries: the request sleeps on a chats.broker subscription and
+        only reads the database when a message is announced in one of its conversations.
+        Each open request does hold a server thread, so serve this from a threaded or
+        async worker.
+        """
+        sse = request.accepted_renderer.format == EventStreamRenderer.format
+        try:
+            token = request.query_params.get('cursor') or (request.META.get('HTTP_LAST_EVENT_ID') if sse else None)
+            position = decode_position(token)[1:] if token else (timezone.now(), uuid.UUID(int=0))
+        except ValueError:
+            raise ValidationError({'cursor': ['Invalid cursor.']})
+        max_timeout = self.stream_sse_duration if sse else self.stream_max_timeout
+        try:
+            timeout = min(float(request.query_params.get('timeout', max_timeout if sse else self.stream_timeout)), max_timeout)
+        except ValueError:
+            raise ValidationError({'timeout': ['timeout must be a number of seconds.']})
+
+        channels = conversation_ids(request.user, request)
+        if conversation_pk is not None:
+            try:
+                conversation = str(uuid.UUID(str(conversation_pk)))
+            except ValueError:
+                conversation = None
+            if conversation not in channels:
+                raise PermissionDenied("You are not a participant of this conversation.")
+            channels = {conversation}
+        context = self.get_serializer_context()
+        deadline = time.monotonic() + max(timeout, 0)
+
+        if not sse:
+            # Subscribe before reading, so a message committed in between still wakes us up
+            with broker.get_broker().subscribe(channels) as subscription:
+                messages = self.stream_messages_after(position)
+                while not messages:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or not subscription.wait(remaining):
+                        break
+                    messages = self.stream_messages_after(position)
+            if messages:
+                position = (messages[-1].sent_at, messages[-1].message_id)
+            return Response({
+                'results': MessageSerializer(messages, many=True, context=context).data,
+                'cursor': encode_position('next', *position),
+            })
+
+        json_renderer = renderers.JSONRenderer()
+
+        def events(position):
+            with broker.get_broker().subscribe(channels) as subscription:
+                yield 'retry: 3000\n\n'
+                while True:
+                    messages = self.stream_messages_after(position)
+                    for message in messages:
+                        position = (message.sent_at, message.message_id)
+                        data = json_renderer.render(MessageSerializer(message, context=context).data).decode()
+                        yield f'id: {encode_position("next", *position)}\nevent: message\ndata: {data}\n\n'
+                    if len(messages) == self.stream_batch_size:
+                        continue
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return
+                    if not subscription.wait(min(remaining, self.stream_heartbeat)):
+                        yield ': keep-alive\n\n'
 
+        response = StreamingHttpResponse(events(position), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        # Stops nginx from buffering the stream
+        response['X-Accel-Buffering'] = 'no'
+        return response
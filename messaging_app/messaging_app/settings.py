@@ -14,7 +14,8 @@ INSTALLED_APPS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # simplejwt's JWTAuthentication with the token -> user lookup cached (chats/auth.py)
+        'chats.auth.CachedJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication', 
         'rest_framework.authentication.BasicAuthentication',    
     ),
@@ -23,6 +24,25 @@ REST_FRAMEWORK = {
     ),
 }
 
+# --- Cache ---
+# chats keeps users' conversation id sets (chats/membership.py) and serialized
+# conversation lists (chats/list_cache.py) in the default cache. In production point
+# DJANGO_REDIS_URL at a shared Redis so every worker sees the same entries and
+# invalidations; without it each process falls back to its own local memory cache.
+if os.environ.get('DJANGO_REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['DJANGO_REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
 # --- JWT Authentication Settings ---
 # IMPORTANT: For production, generate a strong, random key and store it securely
 # (e.g., in an environment variable) instead of hardcoding it.
@@ -48,7 +68,7 @@ SIMPLE_JWT = {
 
     'AUTH_HEADER_TYPES': ('Bearer',), # The type of header used for authentication (e.g., "Bearer <token>")
     'AUTH_HEADER_NAME': 'HTTP_AUTHORIZATION', # The name of the HTTP header
-    'USER_ID_FIELD': 'id', # The field in the User model that uniquely identifies the user
+    'USER_ID_FIELD': 'user_id', # The field in the User model that uniquely identifies the user (chats.User's primary key)
     'USER_ID_CLAIM': 'user_id', # The claim in the token that holds the user ID
     'USER_AUTHENTICATION_RULE': 'rest_framework_simplejwt.authentication.default_user_authentication_rule',
 
@@ -80,78 +80,80 @@ def setup_database():
     conn.close()
     print("Database 'users.db' and table 'users' ensured to exist with dummy data.")
 
-# Set up the database before using the context manager
-setup_database()
-
-print("\n--- Using DatabaseConnection context manager to fetch users ---")
-try:
+# Run the demo only when executed as a script, never on import
+if __name__ == "__main__":
+    # Set up the database before using the context manager
+    setup_database()
+
+    print("\n--- Using DatabaseConnection context manager to fetch users ---")
+    try:
+        with DatabaseConnection('users.db') as conn:
+            cursor = conn.cursor()
+            query = "SELECT * FROM users"
+            print(f"Executing query: {query}")
+            cursor.execute(query)
+            results = cursor.fetchall()
+            print("Query Results:", results)
+    except Exception as e:
+        print(f"An error occurred during database operation: {e}")
+
+    print("\n--- Using DatabaseConnection context manager to update and commit ---")
+    try:
+        with DatabaseConnection('users.db') as conn:
+            cursor = conn.cursor()
+            user_id_to_update = 1
+            new_email = "alice.smith.new@example.com"
+            update_query = "UPDATE users SET email = ? WHERE id = ?"
+            print(f"Updating user ID {user_id_to_update} email to {new_email}")
+            cursor.execute(update_query, (new_email, user_id_to_update))
+            # No explicit commit needed here, __exit__ will handle it
+    except Exception as e:
+        print(f"An error occurred during update operation: {e}")
+
+    # Verify the update
+    print("\n--- Verifying the updated email ---")
     with DatabaseConnection('users.db') as conn:
         cursor = conn.cursor()
-        query = "SELECT * FROM users"
-        print(f"Executing query: {query}")
-        cursor.execute(query)
-        results = cursor.fetchall()
-        print("Query Results:", results)
-except Exception as e:
-    print(f"An error occurred during database operation: {e}")
-
-print("\n--- Using DatabaseConnection context manager to update and commit ---")
-try:
+        cursor.execute("SELECT email FROM users WHERE id = ?", (1,))
+        updated_email = cursor.fetchone()
+        print(f"Email for user ID 1 after update: {updated_email[0] if updated_email else 'Not Found'}")
+
+
+    print("\n--- Using DatabaseConnection context manager to update and rollback (simulated error) ---")
+    try:
+        with DatabaseConnection('users.db') as conn:
+            cursor = conn.cursor()
+            user_id_to_update_rollback = 2
+            original_email_2 = None
+            # First, get original email to verify rollback
+            cursor.execute("SELECT email FROM users WHERE id = ?", (user_id_to_update_rollback,))
+            original_email_2 = cursor.fetchone()[0]
+            print(f"Original email for user ID {user_id_to_update_rollback}: {original_email_2}")
+
+            new_email_rollback = "bob.rollback@example.com"
+            update_query_rollback = "UPDATE users SET email = ? WHERE id = ?"
+            print(f"Attempting to update user ID {user_id_to_update_rollback} email to {new_email_rollback}")
+            cursor.execute(update_query_rollback, (new_email_rollback, user_id_to_update_rollback))
+
+            print("Simulating an error to trigger rollback...")
+            raise ValueError("Simulated error during transaction!") # This will cause a rollback
+
+    except ValueError as e:
+        print(f"Caught expected error: {e}. Transaction should have rolled back.")
+    except Exception as e:
+        print(f"An unexpected error occurred: {e}")
+
+    # Verify the rollback
+    print("\n--- Verifying the email after simulated rollback ---")
     with DatabaseConnection('users.db') as conn:
         cursor = conn.cursor()
-        user_id_to_update = 1
-        new_email = "alice.smith.new@example.com"
-        update_query = "UPDATE users SET email = ? WHERE id = ?"
-        print(f"Updating user ID {user_id_to_update} email to {new_email}")
-        cursor.execute(update_query, (new_email, user_id_to_update))
-        # No explicit commit needed here, __exit__ will handle it
-except Exception as e:
-    print(f"An error occurred during update operation: {e}")
-
-# Verify the update
-print("\n--- Verifying the updated email ---")
-with DatabaseConnection('users.db') as conn:
-    cursor = conn.cursor()
-    cursor.execute("SELECT email FROM users WHERE id = ?", (1,))
-    updated_email = cursor.fetchone()
-    print(f"Email for user ID 1 after update: {updated_email[0] if updated_email else 'Not Found'}")
-
-
-print("\n--- Using DatabaseConnection context manager to update and rollback (simulated error) ---")
-try:
-    with DatabaseConnection('users.db') as conn:
-        cursor = conn.cursor()
-        user_id_to_update_rollback = 2
-        original_email_2 = None
-        # First, get original email to verify rollback
-        cursor.execute("SELECT email FROM users WHERE id = ?", (user_id_to_update_rollback,))
-        original_email_2 = cursor.fetchone()[0]
-        print(f"Original email for user ID {user_id_to_update_rollback}: {original_email_2}")
-
-        new_email_rollback = "bob.rollback@example.com"
-        update_query_rollback = "UPDATE users SET email = ? WHERE id = ?"
-        print(f"Attempting to update user ID {user_id_to_update_rollback} email to {new_email_rollback}")
-        cursor.execute(update_query_rollback, (new_email_rollback, user_id_to_update_rollback))
-
-        print("Simulating an error to trigger rollback...")
-        raise ValueError("Simulated error during transaction!") # This will cause a rollback
-
-except ValueError as e:
-    print(f"Caught expected error: {e}. Transaction should have rolled back.")
-except Exception as e:
-    print(f"An unexpected error occurred: {e}")
-
-# Verify the rollback
-print("\n--- Verifying the email after simulated rollback ---")
-with DatabaseConnection('users.db') as conn:
-    cursor = conn.cursor()
-    cursor.execute("SELECT email FROM users WHERE id = ?", (2,))
-    email_after_rollback = cursor.fetchone()
-    print(f"Email for user ID 2 after rollback attempt: {email_after_rollback[0] if email_after_rollback else 'Not Found'}")
-    # Assert that the email is still the original one
-    # Note: original_email_2 is captured outside the try block for comparison
-    print(f"Original email for comparison: {original_email_2}")
-    if original_email_2 and email_after_rollback and email_after_rollback[0] == original_email_2:
-        print("Rollback successful: Email remained unchanged.")
-    else:
-        print("Rollback failed or email changed unexpectedly.")
+        cursor.execute("SELECT email FROM users WHERE id = ?", (2,))
+        email_after_rollback = cursor.fetchone()
+        print(f"Email for user ID 2 after rollback attempt: {email_after_rollback[0] if email_after_rollback else 'Not Found'}")
+        # Assert that the email is still the original one
+        # Note: original_email_2 is captured outside the try block for comparison
+        print(f"Original email for comparison: {original_email_2}")
+        if original_email_2 and email_after_rollback and email_after_rollback[0] == original_email_2:
+            print("Rollback successful: Email remained unchanged.")
+        else:
+            print("Rollback failed or email changed unexpectedly.")
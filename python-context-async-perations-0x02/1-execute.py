@@ -94,74 +94,76 @@ def setup_database():
     conn.close()
     print("Database 'users.db' and table 'users' ensured to exist with dummy data (including age).")
 
-# Set up the database before using the context manager
-setup_database()
-
-print("\n--- Using ExecuteQuery context manager to fetch users older than 25 ---")
-try:
-    query_str = "SELECT * FROM users WHERE age > ?"
-    param_val = 25
-    with ExecuteQuery(query=query_str, params=(param_val,)) as users_over_25:
-        print(f"Users older than {param_val}:")
-        for user in users_over_25:
-            print(user)
-except Exception as e:
-    print(f"An error occurred: {e}")
-
-print("\n--- Using ExecuteQuery context manager to fetch all users ---")
-try:
-    with ExecuteQuery(query="SELECT * FROM users") as all_users:
-        print("All Users:")
-        for user in all_users:
-            print(user)
-except Exception as e:
-    print(f"An error occurred: {e}")
-
-print("\n--- Using ExecuteQuery context manager to update an email (and commit) ---")
-try:
-    update_query_str = "UPDATE users SET email = ? WHERE id = ?"
-    update_params = ("charlie.new@example.com", 3)
-    with ExecuteQuery(query=update_query_str, params=update_params) as result:
-        print(f"Update operation completed. Result: {result}") # result will be empty for UPDATE
-except Exception as e:
-    print(f"An error occurred during update: {e}")
-
-# Verify the update
-print("\n--- Verifying updated email for Charlie Brown ---")
-try:
-    with ExecuteQuery(query="SELECT email FROM users WHERE id = ?", params=(3,)) as email_result:
-        print(f"Email for user ID 3: {email_result[0][0] if email_result else 'Not Found'}")
-except Exception as e:
-    print(f"An error occurred during verification: {e}")
-
-
-print("\n--- Using ExecuteQuery context manager with a simulated error (should rollback) ---")
-try:
-    # First, get original email for user ID 4 to verify rollback
-    original_email_4 = None
-    with ExecuteQuery(query="SELECT email FROM users WHERE id = ?", params=(4,)) as email_res:
-        original_email_4 = email_res[0][0] if email_res else None
-    print(f"Original email for user ID 4: {original_email_4}")
-
-    # Attempt to update with a simulated error
-    faulty_query = "UPDATE users SET email = ? WHERE id = ?"
-    faulty_params = ("faulty.diana@example.com", 4)
-    with ExecuteQuery(query=faulty_query, params=faulty_params) as result:
-        print("Simulating an error after execution...")
-        raise ValueError("Simulated error after query execution!") # This will trigger rollback
-except ValueError as e:
-    print(f"Caught expected error: {e}. Transaction should have rolled back.")
-except Exception as e:
-    print(f"An unexpected error occurred: {e}")
-
-# Verify the rollback
-print("\n--- Verifying email for user ID 4 after simulated rollback ---")
-try:
-    with ExecuteQuery(query="SELECT email FROM users WHERE id = ?", params=(4,)) as email_after_rollback:
-        print(f"Email for user ID 4 after rollback attempt: {email_after_rollback[0][0] if email_after_rollback else 'Not Found'}")
-        if original_email_4 and email_after_rollback and email_after_rollback[0][0] == original_email_4:
-            print("Rollback successful: Email remained unchanged.")
-        else:
-            print("Rollback failed or email changed unexpectedly.")
-except Exception as e:
-    print(f"An error occurred during verification after rollback: {e}")
+# Run the demo only when executed as a script, never on import
+if __name__ == "__main__":
+    # Set up the database before using the context manager
+    setup_database()
+
+    print("\n--- Using ExecuteQuery context manager to fetch users older than 25 ---")
+    try:
+        query_str = "SELECT * FROM users WHERE age > ?"
+        param_val = 25
+        with ExecuteQuery(query=query_str, params=(param_val,)) as users_over_25:
+            print(f"Users older than {param_val}:")
+            for user in users_over_25:
+                print(user)
+    except Exception as e:
+        print(f"An error occurred: {e}")
+
+    print("\n--- Using ExecuteQuery context manager to fetch all users ---")
+    try:
+        with ExecuteQuery(query="SELECT * FROM users") as all_users:
+            print("All Users:")
+            for user in all_users:
+                print(user)
+    except Exception as e:
+        print(f"An error occurred: {e}")
+
+    print("\n--- Using ExecuteQuery context manager to update an email (and commit) ---")
+    try:
+        update_query_str = "UPDATE users SET email = ? WHERE id = ?"
+        update_params = ("charlie.new@example.com", 3)
+        with ExecuteQuery(query=update_query_str, params=update_params) as result:
+            print(f"Update operation completed. Result: {result}") # result will be empty for UPDATE
+    except Exception as e:
+        print(f"An error occurred during update: {e}")
+
+    # Verify the update
+    print("\n--- Verifying updated email for Charlie Brown ---")
+    try:
+        with ExecuteQuery(query="SELECT email FROM users WHERE id = ?", params=(3,)) as email_result:
+            print(f"Email for user ID 3: {email_result[0][0] if email_result else 'Not Found'}")
+    except Exception as e:
+        print(f"An error occurred during verification: {e}")
+
+
+    print("\n--- Using ExecuteQuery context manager with a simulated error (should rollback) ---")
+    try:
+        # First, get original email for user ID 4 to verify rollback
+        original_email_4 = None
+        with ExecuteQuery(query="SELECT email FROM users WHERE id = ?", params=(4,)) as email_res:
+            original_email_4 = email_res[0][0] if email_res else None
+        print(f"Original email for user ID 4: {original_email_4}")
+
+        # Attempt to update with a simulated error
+        faulty_query = "UPDATE users SET email = ? WHERE id = ?"
+        faulty_params = ("faulty.diana@example.com", 4)
+        with ExecuteQuery(query=faulty_query, params=faulty_params) as result:
+            print("Simulating an error after execution...")
+            raise ValueError("Simulated error after query execution!") # This will trigger rollback
+    except ValueError as e:
+        print(f"Caught expected error: {e}. Transaction should have rolled back.")
+    except Exception as e:
+        print(f"An unexpected error occurred: {e}")
+
+    # Verify the rollback
+    print("\n--- Verifying email for user ID 4 after simulated rollback ---")
+    try:
+        with ExecuteQuery(query="SELECT email FROM users WHERE id = ?", params=(4,)) as email_after_rollback:
+            print(f"Email for user ID 4 after rollback attempt: {email_after_rollback[0][0] if email_after_rollback else 'Not Found'}")
+            if original_email_4 and email_after_rollback and email_after_rollback[0][0] == original_email_4:
+                print("Rollback successful: Email remained unchanged.")
+            else:
+                print("Rollback failed or email changed unexpectedly.")
+    except Exception as e:
+        print(f"An error occurred during verification after rollback: {e}")
@@ -1,4 +1,5 @@
 import asyncio
+import sqlite3
 import aiosqlite
 import time
 
@@ -56,18 +56,20 @@ def setup_database():
     conn.close()
     print("Database 'users.db' and table 'users' ensured to exist with dummy data.")
 
-# Set up the database before fetching
-setup_database()
+# Run the demo only when executed as a script, never on import
+if __name__ == "__main__":
+    # Set up the database before fetching
+    setup_database()
 
-# Fetch users while logging the query
-print("\n--- Fetching all users ---")
-users = fetch_all_users(query="SELECT * FROM users")
-print("Fetched Users:", users)
+    # Fetch users while logging the query
+    print("\n--- Fetching all users ---")
+    users = fetch_all_users(query="SELECT * FROM users")
+    print("Fetched Users:", users)
 
-print("\n--- Fetching a specific user ---")
-specific_user = fetch_all_users(query="SELECT * FROM users WHERE name = 'Alice Smith'")
-print("Fetched Specific User:", specific_user)
+    print("\n--- Fetching a specific user ---")
+    specific_user = fetch_all_users(query="SELECT * FROM users WHERE name = 'Alice Smith'")
+    print("Fetched Specific User:", specific_user)
 
-print("\n--- Fetching with a non-existent query (still logs) ---")
-no_users = fetch_all_users(query="SELECT * FROM users WHERE id = 999")
-print("Fetched No Users:", no_users)
+    print("\n--- Fetching with a non-existent query (still logs) ---")
+    no_users = fetch_all_users(query="SELECT * FROM users WHERE id = 999")
+    print("Fetched No Users:", no_users)
@@ -51,9 +51,6 @@ def setup_database():
     conn.close()
     print("Database 'users.db' and table 'users' ensured to exist with dummy data.")
 
-# Set up the database before defining and using the decorated function
-setup_database()
-
 @with_db_connection
 def get_user_by_id(conn, user_id):
     """
@@ -64,15 +61,19 @@ def get_user_by_id(conn, user_id):
     cursor.execute("SELECT * FROM users WHERE id = ?", (user_id,))
     return cursor.fetchone()
 
-# Fetch user by ID with automatic connection handling
-print("\n--- Fetching user with ID 1 ---")
-user = get_user_by_id(user_id=1)
-print("Fetched User:", user)
+# Run the demo only when executed as a script, never on import
+if __name__ == "__main__":
+    setup_database()
+
+    # Fetch user by ID with automatic connection handling
+    print("\n--- Fetching user with ID 1 ---")
+    user = get_user_by_id(user_id=1)
+    print("Fetched User:", user)
 
-print("\n--- Fetching user with ID 2 ---")
-user2 = get_user_by_id(user_id=2)
-print("Fetched User:", user2)
+    print("\n--- Fetching user with ID 2 ---")
+    user2 = get_user_by_id(user_id=2)
+    print("Fetched User:", user2)
 
-print("\n--- Attempting to fetch non-existent user with ID 99 ---")
-user_none = get_user_by_id(user_id=99)
-print("Fetched User (non-existent):", user_none)
+    print("\n--- Attempting to fetch non-existent user with ID 99 ---")
+    user_none = get_user_by_id(user_id=99)
+    print("Fetched User (non-existent):", user_none)
@@ -75,9 +75,6 @@ def setup_database():
     conn.close()
     print("Database 'users.db' and table 'users' ensured to exist with dummy data.")
 
-# Set up the database before defining and using the decorated function
-setup_database()
-
 # Helper function to check user email (for verification)
 @with_db_connection
 def get_user_email(conn, user_id):
@@ -101,34 +98,37 @@ def update_user_email(conn, user_id, new_email):
         print("Simulating an error for user ID 2 to test rollback.")
         raise ValueError("Simulated error during update for user ID 2")
 
-# --- Test Cases ---
+# Run the demo only when executed as a script, never on import
+if __name__ == "__main__":
+    setup_database()
 
-# Test 1: Successful update
-print("\n--- Test Case 1: Successful Email Update ---")
-original_email_1 = get_user_email(user_id=1)
-print(f"Original email for user ID 1: {original_email_1}")
-try:
-    update_user_email(user_id=1, new_email='Crawford_Cartwright@hotmail.com')
-    updated_email_1 = get_user_email(user_id=1)
-    print(f"New email for user ID 1: {updated_email_1}")
-    assert updated_email_1 == 'Crawford_Cartwright@hotmail.com'
-    print("Test 1 Passed: Email updated and committed.")
-except Exception as e:
-    print(f"Test 1 Failed: An unexpected error occurred: {e}")
+    # --- Test Cases ---
 
+    # Test 1: Successful update
+    print("\n--- Test Case 1: Successful Email Update ---")
+    original_email_1 = get_user_email(user_id=1)
+    print(f"Original email for user ID 1: {original_email_1}")
+    try:
+        update_user_email(user_id=1, new_email='Crawford_Cartwright@hotmail.com')
+        updated_email_1 = get_user_email(user_id=1)
+        print(f"New email for user ID 1: {updated_email_1}")
+        assert updated_email_1 == 'Crawford_Cartwright@hotmail.com'
+        print("Test 1 Passed: Email updated and committed.")
+    except Exception as e:
+        print(f"Test 1 Failed: An unexpected error occurred: {e}")
 
-# Test 2: Update with simulated error (should rollback)
-print("\n--- Test Case 2: Email Update with Simulated Error (Rollback) ---")
-original_email_2 = get_user_email(user_id=2)
-print(f"Original email for user ID 2: {original_email_2}")
-try:
-    update_user_email(user_id=2, new_email='error_test@example.com')
-except ValueError as e:
-    print(f"Caught expected error: {e}")
-    updated_email_2 = get_user_email(user_id=2)
-    print(f"Email for user ID 2 after rollback attempt: {updated_email_2}")
-    assert updated_email_2 == original_email_2 # Email should remain unchanged
-    print("Test 2 Passed: Email update rolled back successfully.")
-except Exception as e:
-    print(f"Test 2 Failed: An unexpected error occurred: {e}")
 
+    # Test 2: Update with simulated error (should rollback)
+    print("\n--- Test Case 2: Email Update with Simulated Error (Rollback) ---")
+    original_email_2 = get_user_email(user_id=2)
+    print(f"Original email for user ID 2: {original_email_2}")
+    try:
+        update_user_email(user_id=2, new_email='error_test@example.com')
+    except ValueError as e:
+        print(f"Caught expected error: {e}")
+        updated_email_2 = get_user_email(user_id=2)
+        print(f"Email for user ID 2 after rollback attempt: {updated_email_2}")
+        assert updated_email_2 == original_email_2 # Email should remain unchanged
+        print("Test 2 Passed: Email update rolled back successfully.")
+    except Exception as e:
+        print(f"Test 2 Failed: An unexpected error occurred: {e}")
@@ -80,9 +80,6 @@ def setup_database():
     conn.close()
     print("Database 'users.db' and table 'users' ensured to exist with dummy data.")
 
-# Set up the database before defining and using the decorated function
-setup_database()
-
 # Global counter to simulate transient failures
 failure_count = 0
 MAX_FAILURES = 2 # Simulate failure for the first 2 calls
@@ -104,30 +101,33 @@ def fetch_users_with_retry(conn):
     cursor.execute("SELECT * FROM users")
     return cursor.fetchall()
 
-# Attempt to fetch users with automatic retry on failure
-print("\n--- Attempting to fetch users with retry logic ---")
-try:
-    users = fetch_users_with_retry()
-    print("Fetched Users:", users)
-except Exception as e:
-    print(f"Failed to fetch users after multiple retries: {e}")
+# Run the demo only when executed as a script, never on import
+if __name__ == "__main__":
+    setup_database()
 
-# Reset failure count for another test
-failure_count = 0
-print("\n--- Attempting to fetch users again (should succeed after retries) ---")
-try:
-    users_again = fetch_users_with_retry()
-    print("Fetched Users Again:", users_again)
-except Exception as e:
-    print(f"Failed to fetch users again after multiple retries: {e}")
+    # Attempt to fetch users with automatic retry on failure
+    print("\n--- Attempting to fetch users with retry logic ---")
+    try:
+        users = fetch_users_with_retry()
+        print("Fetched Users:", users)
+    except Exception as e:
+        print(f"Failed to fetch users after multiple retries: {e}")
 
-# Test case that will always fail (retries exhausted)
-failure_count = 0 # Reset for this test
-MAX_FAILURES = 5 # Set failures higher than retries
-print("\n--- Attempting to fetch users with too many failures (should ultimately fail) ---")
-try:
-    users_fail = fetch_users_with_retry()
-    print("Fetched Users (unexpected success):", users_fail)
-except Exception as e:
-    print(f"Successfully failed to fetch users after exhausting retries: {e}")
+    # Reset failure count for another test
+    failure_count = 0
+    print("\n--- Attempting to fetch users again (should succeed after retries) ---")
+    try:
+        users_again = fetch_users_with_retry()
+        print("Fetched Users Again:", users_again)
+    except Exception as e:
+        print(f"Failed to fetch users again after multiple retries: {e}")
 
+    # Test case that will always fail (retries exhausted)
+    failure_count = 0 # Reset for this test
+    MAX_FAILURES = 5 # Set failures higher than retries
+    print("\n--- Attempting to fetch users with too many failures (should ultimately fail) ---")
+    try:
+        users_fail = fetch_users_with_retry()
+        print("Fetched Users (unexpected success):", users_fail)
+    except Exception as e:
+        print(f"Successfully failed to fetch users after exhausting retries: {e}")
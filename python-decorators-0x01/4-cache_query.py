@@ -87,9 +87,6 @@ def setup_database():
     conn.close()
     print("Database 'users.db' and table 'users' ensured to exist with dummy data.")
 
-# Set up the database before defining and using the decorated function
-setup_database()
-
 @with_db_connection
 @cache_query
 def fetch_users_with_cache(conn, query):
@@ -104,31 +101,35 @@ def fetch_users_with_cache(conn, query):
     time.sleep(0.5)
     return cursor.fetchall()
 
-# First call will execute the query and cache the result
-print("\n--- First call: Fetching all users ---")
-users = fetch_users_with_cache(query="SELECT * FROM users")
-print("Users from first call:", users)
-
-# Second call with the same query will use the cached result
-print("\n--- Second call: Fetching all users again (should be cached) ---")
-users_again = fetch_users_with_cache(query="SELECT * FROM users")
-print("Users from second call:", users_again)
-
-# Third call with a different query will execute and cache a new result
-print("\n--- Third call: Fetching user with ID 1 (new query) ---")
-user_id_1 = fetch_users_with_cache(query="SELECT * FROM users WHERE id = 1")
-print("User with ID 1:", user_id_1)
-
-# Fourth call with the same new query will use the cached result
-print("\n--- Fourth call: Fetching user with ID 1 again (should be cached) ---")
-user_id_1_again = fetch_users_with_cache(query="SELECT * FROM users WHERE id = 1")
-print("User with ID 1 again:", user_id_1_again)
-
-# Clear the cache for demonstration purposes
-print("\n--- Clearing cache and re-fetching ---")
-query_cache.clear()
-print("Cache cleared.")
-
-print("\n--- Fifth call: Fetching all users after cache clear (should execute again) ---")
-users_after_clear = fetch_users_with_cache(query="SELECT * FROM users")
-print("Users after cache clear:", users_after_clear)
+# Run the demo only when executed as a script, never on import
+if __name__ == "__main__":
+    setup_database()
+
+    # First call will execute the query and cache the result
+    print("\n--- First call: Fetching all users ---")
+    users = fetch_users_with_cache(query="SELECT * FROM users")
+    print("Users from first call:", users)
+
+    # Second call with the same query will use the cached result
+    print("\n--- Second call: Fetching all users again (should be cached) ---")
+    users_again = fetch_users_with_cache(query="SELECT * FROM users")
+    print("Users from second call:", users_again)
+
+    # Third call with a different query will execute and cache a new result
+    print("\n--- Third call: Fetching user with ID 1 (new query) ---")
+    user_id_1 = fetch_users_with_cache(query="SELECT * FROM users WHERE id = 1")
+    print("User with ID 1:", user_id_1)
+
+    # Fourth call with the same new query will use the cached result
+    print("\n--- Fourth call: Fetching user with ID 1 again (should be cached) ---")
+    user_id_1_again = fetch_users_with_cache(query="SELECT * FROM users WHERE id = 1")
+    print("User with ID 1 again:", user_id_1_again)
+
+    # Clear the cache for demonstration purposes
+    print("\n--- Clearing cache and re-fetching ---")
+    query_cache.clear()
+    print("Cache cleared.")
+
+    print("\n--- Fifth call: Fetching all users after cache clear (should execute again) ---")
+    users_after_clear = fetch_users_with_cache(query="SELECT * FROM users")
+    print("Users after cache clear:", users_after_clear)
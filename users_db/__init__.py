@@ -0,0 +1,44 @@
+"""
+Importable helpers for the 'users' SQLite database used by the
+python-decorators-0x01 and python-context-async-perations-0x02 tasks.
+
+Importing this package has no side effects: no database file is created
+and nothing is printed. Submodules are loaded on first attribute access,
+and the schema is only created when `ensure_database()` or
+`setup_database()` is called. Run `python -m users_db` for the demo.
+"""
+
+_EXPORTS = {
+    'DEFAULT_DB': 'schema',
+    'SEED_USERS': 'schema',
+    'setup_database': 'schema',
+    'ensure_database': 'schema',
+    'populate_users': 'schema',
+    'log_queries': 'decorators',
+    'with_db_connection': 'decorators',
+    'transactional': 'decorators',
+    'retry_on_failure': 'decorators',
+    'cache_query': 'decorators',
+    'query_cache': 'decorators',
+    'DatabaseConnection': 'context',
+    'ExecuteQuery': 'context',
+    'QueryRecorder': 'advisor',
+    'IndexAdvisor': 'advisor',
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    """Loads the submodule that defines `name` on first access."""
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from importlib import import_module
+    value = getattr(import_module(f'.{module_name}', __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
@@ -0,0 +1,54 @@
+"""
+Demo for the users_db helpers: `python -m users_db [db_name]`.
+
+This is the only place that creates and seeds the database as a side effect.
+"""
+import logging
+import sys
+
+from .context import DatabaseConnection, ExecuteQuery
+from .decorators import cache_query, log_queries, transactional, with_db_connection
+from .schema import DEFAULT_DB, ensure_database
+
+
+def main(db_name=DEFAULT_DB):
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    ensure_database(db_name)
+
+    @log_queries
+    @with_db_connection(db_name=db_name)
+    def fetch_all(conn, query, params=()):
+        return conn.execute(query, params).fetchall()
+
+    @with_db_connection(db_name=db_name)
+    @transactional
+    def update_user_email(conn, user_id, new_email):
+        conn.execute("UPDATE users SET email = ? WHERE id = ?", (new_email, user_id))
+
+    @with_db_connection(db_name=db_name)
+    @cache_query
+    def fetch_users_with_cache(conn, query):
+        return conn.execute(query).fetchall()
+
+    print("\n--- Fetching all users ---")
+    print("Fetched Users:", fetch_all("SELECT * FROM users"))
+
+    print("\n--- Updating user 1's email in a transaction ---")
+    update_user_email(user_id=1, new_email='alice@example.com')
+
+    print("\n--- Cached query (second call is served from the cache) ---")
+    fetch_users_with_cache(query="SELECT * FROM users")
+    print("Users:", fetch_users_with_cache(query="SELECT * FROM users"))
+
+    print("\n--- DatabaseConnection context manager ---")
+    with DatabaseConnection(db_name) as conn:
+        print("User count:", conn.execute("SELECT COUNT(*) FROM users").fetchone()[0])
+
+    print("\n--- ExecuteQuery context manager: users older than 25 ---")
+    with ExecuteQuery(db_name, "SELECT * FROM users WHERE age > ?", (25,)) as users:
+        for user in users:
+            print(user)
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:2])
@@ -0,0 +1,231 @@
+"""
+Index advisor for queries against the users database.
+
+Queries that pass through `log_queries` or `ExecuteQuery` are handed to
+every active `QueryRecorder`. `IndexAdvisor` runs `EXPLAIN QUERY PLAN` on
+the recorded queries, flags full table scans and proposes an index for
+each one that filters on columns which are not indexed yet.
+
+    with QueryRecorder() as recorder:
+        run_workload()
+    advisor = IndexAdvisor('users.db')
+    findings = advisor.analyze(recorder.queries)
+    advisor.apply(findings)
+"""
+import re
+import sqlite3
+import threading
+from collections import namedtuple
+
+_recorders = []
+_recorders_lock = threading.Lock()
+
+# A single recorded query with the parameters it was first seen with
+RecordedQuery = namedtuple('RecordedQuery', 'query params')
+
+# Result of analysing one query: the plan rows, whether any step is a full
+# table scan, and the CREATE INDEX statement proposed for it (or None)
+Finding = namedtuple('Finding', 'query plan full_scan table columns suggestion')
+
+_FROM_RE = re.compile(r'\bFROM\s+([A-Za-z_]\w*)', re.IGNORECASE)
+_SELECT_RE = re.compile(r'^\s*SELECT\s+(.*?)\s+FROM\b', re.IGNORECASE | re.DOTALL)
+_WHERE_RE = re.compile(r'\bWHERE\s+(.*?)(?:\bGROUP\s+BY\b|\bORDER\s+BY\b|\bLIMIT\b|$)',
+                       re.IGNORECASE | re.DOTALL)
+_PREDICATE_RE = re.compile(r'([A-Za-z_]\w*)\s*(=|==|<=|>=|<|>|\bLIKE\b|\bIN\b|\bBETWEEN\b)',
+                           re.IGNORECASE)
+_ORDER_RE = re.compile(r'\bORDER\s+BY\s+([A-Za-z_]\w*)', re.IGNORECASE)
+
+
+def record_query(query, params=()):
+    """Passes a query about to be executed to every active recorder."""
+    if _recorders and query:
+        for recorder in list(_recorders):
+            recorder.add(query, params)
+
+
+class QueryRecorder:
+    """
+    Context manager that collects the distinct queries executed through
+    `log_queries` and `ExecuteQuery` while it is active.
+    """
+    def __init__(self):
+        self._queries = {}
+        self._lock = threading.Lock()
+
+    def add(self, query, params=()):
+        """Records `query`; only the first set of parameters is kept."""
+        with self._lock:
+            self._queries.setdefault(query, RecordedQuery(query, tuple(params or ())))
+
+    @property
+    def queries(self):
+        """list: The distinct RecordedQuery objects, in first-seen order."""
+        with self._lock:
+            return list(self._queries.values())
+
+    def __enter__(self):
+        with _recorders_lock:
+            _recorders.append(self)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        with _recorders_lock:
+            _recorders.remove(self)
+        return False
+
+
+class IndexAdvisor:
+    """
+    Explains queries against a SQLite database and proposes indexes for
+    the ones that scan a whole table.
+    """
+    def __init__(self, db_name):
+        self.db_name = db_name
+
+    def explain(self, query, params=()):
+        """
+        Returns:
+            list: The `detail` column of EXPLAIN QUERY PLAN for the query.
+        """
+        conn = sqlite3.connect(self.db_name)
+        try:
+            if not params:
+                params = (None,) * query.count('?')
+            rows = conn.execute(f"EXPLAIN QUERY PLAN {query}", params).fetchall()
+        finally:
+            conn.close()
+        return [row[-1] for row in rows]
+
+    def table_columns(self, table):
+        """
+        Returns:
+            tuple: (column names in declaration order, name of the column
+            aliasing the rowid or None). Every index already contains the
+            rowid, so that column never needs to be added to one.
+        """
+        conn = sqlite3.connect(self.db_name)
+        try:
+            info = conn.execute(f"PRAGMA table_info({table})").fetchall()
+        finally:
+            conn.close()
+        primary = [row for row in info if row[5]]
+        rowid = None
+        if len(primary) == 1 and primary[0][2].upper() == 'INTEGER':
+            rowid = primary[0][1]
+        return [row[1] for row in info], rowid
+
+    def analyze(self, queries):
+        """
+        Explains each query and proposes an index for each full scan.
+
+        Args:
+            queries (iterable): RecordedQuery objects or plain SQL strings.
+
+        Returns:
+            list: One Finding per query.
+        """
+        findings = []
+        for item in queries:
+            query, params = (item, ()) if isinstance(item, str) else item
+            plan = self.explain(query, params)
+            full_scan = any(_is_full_scan(step) for step in plan)
+            table, columns = self.index_columns(query)
+            suggestion = None
+            if full_scan and table and columns:
+                suggestion = _create_index_sql(table, columns)
+            findings.append(Finding(query, plan, full_scan, table, columns, suggestion))
+        return _merge_prefixes(findings)
+
+    def index_columns(self, query):
+        """
+        Works out which columns an index for `query` should contain:
+        equality predicates first, then at most one range predicate, then
+        the ORDER BY column. When the query selects explicit columns the
+        remaining ones are appended so the index covers the query.
+
+        Returns:
+            tuple: (table name or None, tuple of column names)
+        """
+        match = _FROM_RE.search(query)
+        if not match or not query.lstrip().upper().startswith('SELECT'):
+            return None, ()
+        table = match.group(1)
+        known, rowid = self.table_columns(table)
+        if not known:
+            return table, ()
+
+        equality, ranges = [], []
+        where = _WHERE_RE.search(query)
+        if where:
+            for column, op in _PREDICATE_RE.findall(where.group(1)):
+                if column not in known:
+                    continue
+                target = equality if op in ('=', '==') or op.upper() == 'IN' else ranges
+                if column not in equality and column not in ranges:
+                    target.append(column)
+        columns = equality + ranges[:1]
+        order = _ORDER_RE.search(query)
+        if order and order.group(1) in known and not ranges and order.group(1) not in columns:
+            columns.append(order.group(1))
+        if not columns:
+            return table, ()
+
+        selected = _SELECT_RE.search(query)
+        if selected and selected.group(1).strip() != '*':
+            for column in re.split(r'\s*,\s*', selected.group(1).strip()):
+                if column in known and column not in columns and column != rowid:
+                    columns.append(column)
+        return table, tuple(columns)
+
+    def apply(self, findings):
+        """
+        Creates the suggested indexes and refreshes the planner statistics.
+
+        Returns:
+            list: The distinct CREATE INDEX statements that were executed.
+        """
+        statements = []
+        for finding in findings:
+            if finding.suggestion and finding.suggestion not in statements:
+                statements.append(finding.suggestion)
+        if not statements:
+            return statements
+        conn = sqlite3.connect(self.db_name)
+        try:
+            for statement in statements:
+                conn.execute(statement)
+            conn.execute("ANALYZE")
+            conn.commit()
+        finally:
+            conn.close()
+        return statements
+
+
+def _is_full_scan(step):
+    """True for plan steps like 'SCAN users' (but not index scans)."""
+    return step.startswith('SCAN') and 'INDEX' not in step
+
+
+def _merge_prefixes(findings):
+    """
+    Points a suggestion at a wider index on the same table when its columns
+    are a prefix of that index, so one index serves both queries.
+    """
+    merged = []
+    for finding in findings:
+        wider = [
+            other for other in findings
+            if other.suggestion and finding.suggestion and other.table == finding.table
+            and len(other.columns) > len(finding.columns)
+            and other.columns[:len(finding.columns)] == finding.columns
+        ]
+        if wider:
+            widest = max(wider, key=lambda other: len(other.columns))
+            finding = finding._replace(suggestion=widest.suggestion)
+        merged.append(finding)
+    return merged
+
+
+def _create_index_sql(table, columns):
+    name = f"idx_{table}_{'_'.join(columns)}"
+    return f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)})"
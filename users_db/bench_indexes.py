@@ -0,0 +1,77 @@
+"""
+Index advisor benchmark: `python -m users_db.bench_indexes [rows] [--apply]`.
+
+Seeds a temporary users database with `rows` generated users, runs the
+demo queries (age range, name lookup, email lookup) through ExecuteQuery
+while a QueryRecorder is active, prints the advisor's findings and, with
+--apply, creates the suggested indexes and prints before/after timings.
+"""
+import os
+import sys
+import tempfile
+import time
+
+from .advisor import IndexAdvisor, QueryRecorder
+from .context import ExecuteQuery
+from .schema import populate_users, setup_database
+
+WORKLOAD = (
+    ("SELECT * FROM users WHERE age > ?", (85,)),
+    ("SELECT * FROM users WHERE name = ?", ('User 4242',)),
+    ("SELECT id, name FROM users WHERE age > ? ORDER BY age", (85,)),
+    ("SELECT * FROM users WHERE email = ?", ('user4242@example.com',)),
+)
+
+
+def run_workload(db_name, repeat=1):
+    """Runs every WORKLOAD query `repeat` times through ExecuteQuery."""
+    for _ in range(repeat):
+        for query, params in WORKLOAD:
+            with ExecuteQuery(db_name, query, params):
+                pass
+
+
+def time_query(db_name, query, params, repeat=20):
+    """float: Mean seconds per execution of `query` over `repeat` runs."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        with ExecuteQuery(db_name, query, params):
+            pass
+    return (time.perf_counter() - start) / repeat
+
+
+def main(rows=200000, apply=False):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_name = os.path.join(tmp, 'users.db')
+        setup_database(db_name)
+        populate_users(db_name, rows)
+
+        with QueryRecorder() as recorder:
+            run_workload(db_name)
+
+        advisor = IndexAdvisor(db_name)
+        findings = advisor.analyze(recorder.queries)
+        for finding in findings:
+            flag = 'FULL SCAN' if finding.full_scan else 'ok'
+            print(f"[{flag}] {finding.query}")
+            for step in finding.plan:
+                print(f"    plan: {step}")
+            if finding.suggestion:
+                print(f"    suggest: {finding.suggestion}")
+
+        if not apply:
+            return findings
+
+        before = {q.query: time_query(db_name, *q) for q in recorder.queries}
+        for statement in advisor.apply(findings):
+            print(f"applied: {statement}")
+        print(f"\n{'query':<60} {'before ms':>10} {'after ms':>10}")
+        for recorded in recorder.queries:
+            after = time_query(db_name, *recorded)
+            print(f"{recorded.query:<60} {before[recorded.query] * 1000:>10.3f} {after * 1000:>10.3f}")
+        return findings
+
+
+if __name__ == '__main__':
+    args = [arg for arg in sys.argv[1:] if arg != '--apply']
+    main(int(args[0]) if args else 200000, apply='--apply' in sys.argv)
@@ -0,0 +1,81 @@
+"""
+Startup-time benchmark: `python -m users_db.bench_startup [runs]`.
+
+Each import is timed in a fresh interpreter running in an empty temporary
+directory, so the numbers include module loading but not interpreter
+startup. For every target it reports the median import time, whether a
+'users.db' file was created and how many lines were printed.
+"""
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+LEGACY_SCRIPTS = (
+    'python-decorators-0x01/0-log_queries.py',
+    'python-decorators-0x01/1-with_db_connection.py',
+    'python-decorators-0x01/2-transactional.py',
+    'python-decorators-0x01/3-retry_on_failure.py',
+    'python-decorators-0x01/4-cache_query.py',
+    'python-context-async-perations-0x02/0-databaseconnection.py',
+    'python-context-async-perations-0x02/1-execute.py',
+)
+
+_TIMER = '''
+import sys, time
+sys.path.insert(0, {root!r})
+t0 = time.perf_counter()
+{body}
+sys.__stdout__.write("\\n@elapsed %f\\n" % (time.perf_counter() - t0))
+'''
+
+_LOAD_SCRIPT = '''
+import importlib.util
+spec = importlib.util.spec_from_file_location("legacy", {path!r})
+spec.loader.exec_module(importlib.util.module_from_spec(spec))
+'''
+
+
+def _targets():
+    yield 'import users_db', 'import users_db'
+    yield 'users_db.with_db_connection', 'import users_db; users_db.with_db_connection'
+    yield 'users_db.ExecuteQuery', 'import users_db; users_db.ExecuteQuery'
+    for rel in LEGACY_SCRIPTS:
+        yield rel, _LOAD_SCRIPT.format(path=os.path.join(REPO_ROOT, rel))
+
+
+def measure(body, runs=5):
+    """
+    Times `body` in `runs` fresh interpreters.
+
+    Returns:
+        tuple: (median seconds, created users.db?, printed line count)
+    """
+    timings = []
+    created = False
+    printed = 0
+    for _ in range(runs):
+        with tempfile.TemporaryDirectory() as tmp:
+            out = subprocess.run(
+                [sys.executable, '-c', _TIMER.format(root=REPO_ROOT, body=body)],
+                cwd=tmp, capture_output=True, text=True, check=True,
+            ).stdout
+            created = created or os.path.exists(os.path.join(tmp, 'users.db'))
+        lines = [line for line in out.splitlines() if line.strip()]
+        timings.append(float(lines[-1].split()[1]))
+        printed = max(printed, len(lines) - 1)
+    return statistics.median(timings), created, printed
+
+
+def main(runs=5):
+    print(f"{'target':<62} {'import ms':>10} {'users.db':>9} {'lines':>6}")
+    for label, body in _targets():
+        elapsed, created, printed = measure(body, runs)
+        print(f"{label:<62} {elapsed * 1000:>10.2f} {str(created):>9} {printed:>6}")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
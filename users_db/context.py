@@ -0,0 +1,111 @@
+"""
+Class-based context managers for SQLite connections and one-shot queries.
+"""
+import logging
+import sqlite3
+
+from .advisor import record_query
+from .schema import DEFAULT_DB
+
+logger = logging.getLogger(__name__)
+
+
+class DatabaseConnection:
+    """
+    A class-based context manager for handling SQLite database connections.
+    It opens a connection upon entering the 'with' block and, on exit,
+    commits (or rolls back if an exception was raised) and closes it.
+    """
+    def __init__(self, db_name=DEFAULT_DB):
+        """
+        Args:
+            db_name (str): The name of the SQLite database file.
+        """
+        self.db_name = db_name
+        self.conn = None
+
+    def __enter__(self):
+        """
+        Opens the database connection.
+
+        Returns:
+            sqlite3.Connection: The database connection object.
+        """
+        self.conn = sqlite3.connect(self.db_name)
+        logger.debug("Database connection to '%s' opened.", self.db_name)
+        return self.conn
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """
+        Commits or rolls back depending on whether an exception occurred,
+        then closes the connection. Exceptions are always propagated.
+        """
+        if self.conn:
+            if exc_type:
+                logger.warning("An exception occurred: %s. Rolling back changes.", exc_val)
+                self.conn.rollback()
+            else:
+                self.conn.commit()
+            self.conn.close()
+            logger.debug("Database connection to '%s' closed.", self.db_name)
+        return False
+
+
+class ExecuteQuery:
+    """
+    A class-based context manager that executes a single query on entry and
+    returns its fetched rows. It commits on success and rolls back on error.
+    """
+    def __init__(self, db_name=DEFAULT_DB, query=None, params=None):
+        """
+        Args:
+            db_name (str): The name of the SQLite database file.
+            query (str): The SQL query string to execute.
+            params (tuple or list, optional): Parameters for the SQL query.
+        """
+        self.db_name = db_name
+        self.query = query
+        self.params = params if params is not None else ()
+        self.conn = None
+        self.results = None
+
+    def __enter__(self):
+        """
+        Opens the connection, executes the query and stores the results.
+
+        Returns:
+            list: The fetched results from the executed query.
+        """
+        if not self.query:
+            raise ValueError("A SQL query must be provided to ExecuteQuery.")
+
+        try:
+            self.conn = sqlite3.connect(self.db_name)
+            logger.info("Executing query: '%s' with params: %s", self.query, self.params)
+            record_query(self.query, self.params)
+            cursor = self.conn.execute(self.query, self.params)
+            self.results = cursor.fetchall()
+            return self.results
+        except sqlite3.Error as e:
+            logger.error("Error during query execution: %s", e)
+            if self.conn:
+                self.conn.rollback()
+                self.conn.close()
+                self.conn = None
+            raise
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """
+        Commits or rolls back depending on whether an exception occurred,
+        then closes the connection. Exceptions are always propagated.
+        """
+        if self.conn:
+            if exc_type:
+                logger.warning("An exception of type %s occurred: %s. Rolling back changes.",
+                               exc_type.__name__, exc_val)
+                self.conn.rollback()
+            else:
+                self.conn.commit()
+            self.conn.close()
+            self.conn = None
+        return False
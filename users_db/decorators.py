@@ -0,0 +1,139 @@
+"""
+Database decorators: query logging, connection handling, transactions,
+retries and query result caching.
+"""
+import functools
+import logging
+import sqlite3
+import time
+from datetime import datetime
+
+from .advisor import record_query
+from .schema import DEFAULT_DB
+
+logger = logging.getLogger(__name__)
+
+# Global cache for query results used by cache_query
+query_cache = {}
+
+
+def log_queries(func):
+    """
+    A decorator that logs the SQL query before executing the decorated function.
+    It assumes the SQL query is the first argument passed to the decorated function
+    (or a keyword argument named 'query'). The query is also passed to any
+    active advisor.QueryRecorder.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        query = args[0] if args else kwargs.get('query')
+        if query is not None:
+            logger.info("[%s] Executing SQL Query: %s", timestamp, query)
+            record_query(query)
+        else:
+            logger.info("[%s] Executing a database function, but no query argument found.", timestamp)
+        return func(*args, **kwargs)
+    return wrapper
+
+
+def with_db_connection(func=None, *, db_name=DEFAULT_DB):
+    """
+    A decorator that opens a SQLite database connection, passes it as the
+    first argument to the decorated function, and ensures the connection is
+    closed afterwards, even if errors occur.
+
+    Can be used bare (`@with_db_connection`) or with a database name
+    (`@with_db_connection(db_name='other.db')`).
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            conn = None
+            try:
+                conn = sqlite3.connect(db_name)
+                logger.debug("Database connection opened.")
+                return func(conn, *args, **kwargs)
+            except sqlite3.Error as e:
+                logger.error("Database error occurred: %s", e)
+                raise
+            finally:
+                if conn:
+                    conn.close()
+                    logger.debug("Database connection closed.")
+        return wrapper
+
+    if func is not None:
+        return decorator(func)
+    return decorator
+
+
+def transactional(func):
+    """
+    A decorator that manages database transactions. It assumes the decorated
+    function receives a database connection object as its first argument.
+    If the decorated function executes successfully, the transaction is committed.
+    If an error occurs, the transaction is rolled back.
+    """
+    @functools.wraps(func)
+    def wrapper(conn, *args, **kwargs):
+        try:
+            logger.debug("Transaction started.")
+            result = func(conn, *args, **kwargs)
+            conn.commit()
+            logger.debug("Transaction committed.")
+            return result
+        except Exception as e:
+            conn.rollback()
+            logger.warning("Transaction rolled back due to error: %s", e)
+            raise
+    return wrapper
+
+
+def retry_on_failure(retries=3, delay=2):
+    """
+    A decorator factory that retries the decorated function a specified number
+    of times if it raises an exception.
+
+    Args:
+        retries (int): The maximum number of times to retry the function.
+        delay (int): The delay in seconds between retries.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            for i in range(retries + 1):  # +1 to include the initial attempt
+                try:
+                    return func(*args, **kwargs)
+                except Exception as e:
+                    if i < retries:
+                        logger.warning("Attempt %d failed: %s. Retrying in %s seconds...", i + 1, e, delay)
+                        time.sleep(delay)
+                    else:
+                        logger.error("All %d attempts failed. Last error: %s", retries + 1, e)
+                        raise
+        return wrapper
+    return decorator
+
+
+def cache_query(func):
+    """
+    A decorator that caches the results of a database query in `query_cache`.
+    It assumes the SQL query string is passed as a keyword argument named 'query'
+    or as the second positional argument (after 'conn').
+    """
+    @functools.wraps(func)
+    def wrapper(conn, *args, **kwargs):
+        query = kwargs.get('query', args[0] if args else None)
+        if query is None:
+            logger.warning("No 'query' argument found for caching. Executing without caching.")
+            return func(conn, *args, **kwargs)
+
+        if query in query_cache:
+            logger.debug("Cache hit for query: '%s'", query)
+            return query_cache[query]
+        logger.debug("Cache miss for query: '%s'", query)
+        result = func(conn, *args, **kwargs)
+        query_cache[query] = result
+        return result
+    return wrapper
@@ -0,0 +1,106 @@
+"""
+Schema bootstrap for the 'users' SQLite database.
+
+Nothing in this module touches the filesystem at import time. Call
+`ensure_database()` (idempotent, once per database path) or
+`setup_database()` (always runs) when the database is actually needed.
+"""
+import logging
+import os
+import sqlite3
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Default database file used by the decorators and context managers
+DEFAULT_DB = 'users.db'
+
+# Seed rows inserted by setup_database(); ids are fixed so re-runs are no-ops
+SEED_USERS = (
+    (1, 'Alice Smith', 'alice@example.com', 30),
+    (2, 'Bob Johnson', 'bob@example.com', 22),
+    (3, 'Charlie Brown', 'charlie@example.com', 45),
+    (4, 'Diana Prince', 'diana@example.com', 28),
+    (5, 'Eve Adams', 'eve@example.com', 50),
+    (6, 'Frank White', 'frank@example.com', 38),
+    (7, 'Grace Green', 'grace@example.com', 60),
+)
+
+_initialized = set()
+_init_lock = threading.Lock()
+
+
+def setup_database(db_name=DEFAULT_DB, seed=True):
+    """
+    Creates the 'users' table if it does not exist and, optionally,
+    inserts the seed rows.
+
+    Args:
+        db_name (str): The name of the SQLite database file.
+        seed (bool): Whether to insert the SEED_USERS rows.
+
+    Returns:
+        str: The database name that was set up.
+    """
+    conn = sqlite3.connect(db_name)
+    try:
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS users (
+                id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                email TEXT UNIQUE NOT NULL,
+                age INTEGER
+            )
+        ''')
+        if seed:
+            conn.executemany(
+                "INSERT OR IGNORE INTO users (id, name, email, age) VALUES (?, ?, ?, ?)",
+                SEED_USERS,
+            )
+        conn.commit()
+    finally:
+        conn.close()
+    logger.info("Database '%s' and table 'users' ensured to exist.", db_name)
+    return db_name
+
+
+def populate_users(db_name=DEFAULT_DB, count=100000, batch_size=10000):
+    """
+    Appends `count` generated users (deterministic names, emails and ages)
+    after the current highest id. Used to benchmark queries on a large table.
+
+    Returns:
+        int: The number of rows inserted.
+    """
+    conn = sqlite3.connect(db_name)
+    try:
+        start = conn.execute("SELECT COALESCE(MAX(id), 0) FROM users").fetchone()[0] + 1
+        for offset in range(0, count, batch_size):
+            rows = [
+                (i, f'User {i}', f'user{i}@example.com', 18 + (i * 7919) % 70)
+                for i in range(start + offset, start + min(offset + batch_size, count))
+            ]
+            conn.executemany(
+                "INSERT INTO users (id, name, email, age) VALUES (?, ?, ?, ?)", rows)
+        conn.commit()
+    finally:
+        conn.close()
+    return count
+
+
+def ensure_database(db_name=DEFAULT_DB, seed=True):
+    """
+    Runs setup_database() the first time it is called for a given database
+    path in this process; later calls return immediately.
+
+    Returns:
+        str: The database name.
+    """
+    key = db_name if db_name == ':memory:' else os.path.abspath(db_name)
+    if key in _initialized:
+        return db_name
+    with _init_lock:
+        if key not in _initialized:
+            setup_database(db_name, seed=seed)
+            _initialized.add(key)
+    return db_name
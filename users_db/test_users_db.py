@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""Unit tests for the users_db package"""
+
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import unittest
+
+import users_db
+from users_db import schema
+from users_db.advisor import IndexAdvisor, QueryRecorder
+from users_db.bench_startup import LEGACY_SCRIPTS, REPO_ROOT, measure
+
+
+class TestImportSideEffects(unittest.TestCase):
+    """importing the package or the task scripts must not touch users.db"""
+
+    def test_package_import_is_lazy(self):
+        """a bare import loads no submodule, creates no file, prints nothing"""
+        code = ("import sys; import users_db; "
+                "print(sorted(m for m in sys.modules if m.startswith('users_db.')))")
+        with tempfile.TemporaryDirectory() as tmp:
+            out = subprocess.run(
+                [sys.executable, '-c', code], cwd=tmp, check=True,
+                capture_output=True, text=True,
+                env=dict(os.environ, PYTHONPATH=REPO_ROOT)).stdout
+            self.assertFalse(os.path.exists(os.path.join(tmp, 'users.db')))
+        self.assertEqual(out.strip(), '[]')
+
+    def test_legacy_scripts_import_cleanly(self):
+        """the numbered task modules only define things on import"""
+        for rel in LEGACY_SCRIPTS:
+            with self.subTest(script=rel):
+                body = ("import importlib.util\n"
+                        f"spec = importlib.util.spec_from_file_location('m', {os.path.join(REPO_ROOT, rel)!r})\n"
+                        "spec.loader.exec_module(importlib.util.module_from_spec(spec))")
+                _, created, printed = measure(body, runs=1)
+                self.assertFalse(created)
+                self.assertEqual(printed, 0)
+
+
+class TestSchema(unittest.TestCase):
+    """setup_database / ensure_database"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = os.path.join(self.tmp.name, 'users.db')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_ensure_database_runs_once(self):
+        """the second ensure_database call does not recreate deleted rows"""
+        users_db.ensure_database(self.db)
+        with users_db.DatabaseConnection(self.db) as conn:
+            conn.execute("DELETE FROM users")
+        users_db.ensure_database(self.db)
+        with users_db.DatabaseConnection(self.db) as conn:
+            count = conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+        self.assertEqual(count, 0)
+
+    def test_setup_database_seeds(self):
+        """setup_database always (re)inserts the seed rows"""
+        schema.setup_database(self.db)
+        with users_db.ExecuteQuery(self.db, "SELECT COUNT(*) FROM users") as rows:
+            self.assertEqual(rows[0][0], len(schema.SEED_USERS))
+
+
+class TestDecorators(unittest.TestCase):
+    """decorators and context managers against a temporary database"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = schema.setup_database(os.path.join(self.tmp.name, 'users.db'))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_transactional_rolls_back(self):
+        """an exception inside a transactional function leaves no change"""
+        @users_db.with_db_connection(db_name=self.db)
+        @users_db.transactional
+        def update(conn, email):
+            conn.execute("UPDATE users SET email = ? WHERE id = 1", (email,))
+            raise ValueError("boom")
+
+        with self.assertRaises(ValueError):
+            update('new@example.com')
+        with users_db.ExecuteQuery(self.db, "SELECT email FROM users WHERE id = 1") as rows:
+            self.assertEqual(rows[0][0], 'alice@example.com')
+
+    def test_cache_query(self):
+        """the second identical query is served from query_cache"""
+        calls = []
+
+        @users_db.with_db_connection(db_name=self.db)
+        @users_db.cache_query
+        def fetch(conn, query):
+            calls.append(query)
+            return conn.execute(query).fetchall()
+
+        users_db.query_cache.clear()
+        first = fetch(query="SELECT id FROM users")
+        second = fetch(query="SELECT id FROM users")
+        self.assertEqual(first, second)
+        self.assertEqual(len(calls), 1)
+
+    def test_database_connection_rolls_back(self):
+        """DatabaseConnection rolls back when the block raises"""
+        with self.assertRaises(RuntimeError):
+            with users_db.DatabaseConnection(self.db) as conn:
+                conn.execute("DELETE FROM users")
+                raise RuntimeError
+        conn = sqlite3.connect(self.db)
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM users").fetchone()[0],
+                         len(schema.SEED_USERS))
+        conn.close()
+
+
+class TestIndexAdvisor(unittest.TestCase):
+    """QueryRecorder and IndexAdvisor"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = schema.setup_database(os.path.join(self.tmp.name, 'users.db'))
+        schema.populate_users(self.db, 2000)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_recorder_sees_decorated_and_context_queries(self):
+        """log_queries and ExecuteQuery both feed an active recorder"""
+        @users_db.log_queries
+        def run(query):
+            return query
+
+        with QueryRecorder() as recorder:
+            run("SELECT * FROM users WHERE name = 'x'")
+            with users_db.ExecuteQuery(self.db, "SELECT * FROM users WHERE age > ?", (40,)):
+                pass
+        run("SELECT 1")
+        self.assertEqual([q.query for q in recorder.queries], [
+            "SELECT * FROM users WHERE name = 'x'",
+            "SELECT * FROM users WHERE age > ?",
+        ])
+        self.assertEqual(recorder.queries[1].params, (40,))
+
+    def test_full_scans_get_index_suggestions(self):
+        """filters on unindexed columns are flagged, email is not"""
+        advisor = IndexAdvisor(self.db)
+        age, email, covered = advisor.analyze([
+            "SELECT * FROM users WHERE age > ?",
+            "SELECT * FROM users WHERE email = ?",
+            "SELECT id, name FROM users WHERE age > ? ORDER BY age",
+        ])
+        self.assertTrue(age.full_scan)
+        self.assertFalse(email.full_scan)
+        self.assertIsNone(email.suggestion)
+        self.assertEqual(covered.columns, ('age', 'name'))
+        # the single-column age index is folded into the covering one
+        self.assertEqual(age.suggestion, covered.suggestion)
+
+    def test_apply_removes_full_scans(self):
+        """after apply() the same queries use an index"""
+        advisor = IndexAdvisor(self.db)
+        queries = ["SELECT * FROM users WHERE name = ?",
+                   "SELECT id, name FROM users WHERE age > ? ORDER BY age"]
+        applied = advisor.apply(advisor.analyze(queries))
+        self.assertEqual(len(applied), 2)
+        self.assertFalse(any(f.full_scan for f in advisor.analyze(queries)))
+
+
+if __name__ == '__main__':
+    unittest.main()